@@ -0,0 +1,79 @@
+""" Local database of the benchmarks: schema and migrations """
+import os
+import pymysql
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), 'migrations')
+
+DB_NAME = 'dududb'
+
+
+def connect(host, user, password, db=None, port=3306):
+    """ This function opens a connection to the local database server
+
+    Args:
+        host (str): The host of the server
+        user (str): The user
+        password (str): The password
+        db (str): The database, None to connect to the server only
+        port (int): The port of the server
+
+    Returns:
+        pymysql.connections.Connection: The connection
+    """
+    # local_infile lets dataset.py load its rows with LOAD DATA LOCAL INFILE
+    return pymysql.connect(host=host, user=user, password=password, db=db, port=port, local_infile=True)
+
+
+def create_database(connection):
+    """ This function drops and creates the benchmarks database, applying the base schema and every SQL
+    migration in order
+
+    Args:
+        connection (pymysql.connections.Connection): A connection to the server
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS {DB_NAME}")
+        cursor.execute(f"CREATE DATABASE {DB_NAME} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+        cursor.execute(f"USE {DB_NAME}")
+
+        scripts = [os.path.join(BENCHMARKS_DIR, 'schema.sql')]
+        scripts += sorted(os.path.join(MIGRATIONS_DIR, name) for name in os.listdir(MIGRATIONS_DIR)
+                          if name.endswith('.sql'))
+        for script in scripts:
+            for statement in read_statements(script):
+                cursor.execute(statement)
+    connection.commit()
+
+
+def read_statements(path):
+    """ This function splits a SQL script into its statements, dropping the comments
+
+    Args:
+        path (str): The path of the script
+
+    Returns:
+        list: The statements
+    """
+    with open(path, encoding='utf-8') as script:
+        lines = [line for line in script if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in ''.join(lines).split(';') if statement.strip()]
+
+
+def get_pending_missions(connection, limit):
+    """ This function returns pending missions for the completion and cancellation scenarios
+
+    Args:
+        connection (pymysql.connections.Connection): A connection to the benchmarks database
+        limit (int): The maximum number of missions
+
+    Returns:
+        list: The (id_mission, id_user) pairs
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id_mission, id_user FROM missions "
+                       "WHERE status = 'pending' AND due_date >= CURRENT_DATE ORDER BY RAND(7) LIMIT %s", (limit,))
+        missions = list(cursor.fetchall())
+    # End the read transaction so the harness does not hold a snapshot during the run
+    connection.commit()
+    return missions
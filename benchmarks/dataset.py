@@ -0,0 +1,332 @@
+""" Synthetic dataset of users, missions and rewards at production scale
+
+The data is deterministic by seed, so two runs with the same options load exactly the same rows and their benchmarks
+can be compared. Missions per user follow a log-normal distribution (most users have a few missions, a long tail
+has hundreds), due dates are spread over the past year and the next three months, the status of every mission
+depends on whether its due date has passed, and the descriptions are Spanish tasks built from templates.
+
+Rows are written to tab-separated files and loaded with LOAD DATA LOCAL INFILE (the server needs local_infile=ON),
+or inserted with executemany when it is not available:
+
+    PYTHONPATH=layers/dudu_common python -m benchmarks.dataset --users 500000 --mean-missions 20
+
+creates the benchmarks database again and loads about 10M missions.
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import tempfile
+import time
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+from . import database
+
+User = namedtuple('User', ['id_user', 'cognito_username', 'email', 'password'])
+
+# Password of every generated user in the fake user pool
+PASSWORD = 'Benchmark1!'
+
+# Rewards of the rewards table, one every REWARD_LEVEL_INTERVAL levels
+REWARD_TITLES = [
+    'Aprendiz de magia', 'Iniciado de las runas', 'Hechicero novato', 'Alquimista errante', 'Conjurador del alba',
+    'Guardián del grimorio', 'Mago de batalla', 'Archimago del gremio', 'Señor de los elementos',
+    'Sabio de la torre', 'Gran hechicero de Dudu'
+]
+
+STATUSES = ['pending', 'in_progress', 'completed', 'cancelled', 'failed']
+
+# Status weights of the missions whose due date has passed and of the ones still open. Overdue pending missions
+# are the ones mission_expiration has not swept yet
+PAST_STATUS_WEIGHTS = [5, 0, 60, 10, 25]
+OPEN_STATUS_WEIGHTS = [60, 20, 15, 5, 0]
+PAST_STATUS_CUM_WEIGHTS = list(itertools.accumulate(PAST_STATUS_WEIGHTS))
+OPEN_STATUS_CUM_WEIGHTS = list(itertools.accumulate(OPEN_STATUS_WEIGHTS))
+
+# Days around today where due dates fall
+DUE_DATE_PAST_DAYS = 365
+DUE_DATE_FUTURE_DAYS = 90
+
+# Fraction of missions still waiting for their fantasy description (insert_mission with async_description)
+PENDING_DESCRIPTION_RATE = 0.01
+
+# Spread of the missions per user, higher means a longer tail
+MISSIONS_SIGMA = 1.2
+
+# Missions of the most active user
+MAX_MISSIONS_PER_USER = 5000
+
+VERBS = ['lavar', 'estudiar', 'revisar', 'comprar', 'limpiar', 'preparar', 'terminar', 'llamar a', 'pagar',
+         'organizar', 'arreglar', 'entregar', 'leer', 'escribir', 'cocinar', 'visitar a', 'responder', 'sacar a']
+OBJECTS = ['los platos', 'el examen de cálculo', 'los apuntes de mi compa', 'la despensa', 'mi cuarto',
+           'la presentación', 'el reporte del trabajo', 'mi mamá', 'la renta', 'el closet', 'la bicicleta',
+           'la tarea de física', 'un capítulo del libro', 'el ensayo de historia', 'la cena', 'mi abuela',
+           'los correos', 'pasear al perro', 'la basura', 'las plantas', 'el recibo de la luz', 'el proyecto final']
+COMPLEMENTS = ['', '', '', ' antes del viernes', ' en la mañana', ' con mis amigos', ' para mañana',
+               ' después de la escuela', ' el fin de semana', ' antes de la junta', ' sin falta', ' en la noche']
+
+EPIC_VERBS = ['Emprender la búsqueda de', 'Descifrar', 'Conquistar', 'Proteger', 'Invocar', 'Purificar',
+              'Custodiar', 'Forjar']
+EPIC_OBJECTS = ['el grimorio ancestral', 'la torre del hechicero', 'el tesoro del dragón', 'las runas perdidas',
+                'el reino de las sombras', 'la poción del alba', 'el bosque encantado', 'la corona del gremio']
+
+USERS_COLUMNS = ['id_user', 'username', 'cognito_username', 'gender', 'level', 'current_xp', 'xp_limit']
+USER_REWARDS_COLUMNS = ['id_user', 'id_reward']
+MISSIONS_COLUMNS = ['original_description', 'fantasy_description', 'creation_date', 'due_date', 'status',
+                    'id_user', 'description_status']
+STATS_COLUMNS = ['id_user', 'pending_missions', 'in_progress_missions', 'completed_missions',
+                 'cancelled_missions', 'failed_missions']
+
+
+def random_description(rng):
+    """ This function builds the Spanish description of a task
+
+    Args:
+        rng (random.Random): The random generator
+
+    Returns:
+        str: The description
+    """
+    return f'{rng.choice(VERBS)} {rng.choice(OBJECTS)}{rng.choice(COMPLEMENTS)}'
+
+
+def random_fantasy_description(rng):
+    return f'{rng.choice(EPIC_VERBS)} {rng.choice(EPIC_OBJECTS)}'
+
+
+def missions_count(rng, mean_missions):
+    """ This function returns the number of missions of a user, log-normal around mean_missions
+
+    Args:
+        rng (random.Random): The random generator
+        mean_missions (float): The mean missions per user
+
+    Returns:
+        int: The number of missions
+    """
+    mu = math.log(mean_missions) - MISSIONS_SIGMA ** 2 / 2
+    return min(MAX_MISSIONS_PER_USER, int(rng.lognormvariate(mu, MISSIONS_SIGMA)))
+
+
+def generate(users, mean_missions, seed, today=None):
+    """ This function generates the rows of every user: its users, user_rewards and user_mission_stats rows and its
+    missions
+
+    Args:
+        users (int): The number of users
+        mean_missions (float): The mean missions per user
+        seed (int): The seed, the same seed always generates the same rows
+        today (date): The day the due dates are spread around, today by default
+
+    Yields:
+        tuple: The User, its users row, its user_rewards row, its missions rows and its user_mission_stats row
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    status_indexes = range(len(STATUSES))
+
+    for index in range(users):
+        id_user = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        username = f'bench{index}'
+        level = min(50, 1 + int(rng.expovariate(1 / 8)))
+        xp_limit = 100 + (level - 1) * 10
+        user = User(id_user, username, f'{username}@example.com', PASSWORD)
+
+        counts = [0] * len(STATUSES)
+        missions = []
+        for _ in range(missions_count(rng, mean_missions)):
+            due_date = today + timedelta(days=rng.randint(-DUE_DATE_PAST_DAYS, DUE_DATE_FUTURE_DAYS))
+            creation_date = min(today, due_date - timedelta(days=rng.randint(0, 60)))
+            cum_weights = PAST_STATUS_CUM_WEIGHTS if due_date < today else OPEN_STATUS_CUM_WEIGHTS
+            status = rng.choices(status_indexes, cum_weights=cum_weights)[0]
+            counts[status] += 1
+
+            if rng.random() < PENDING_DESCRIPTION_RATE:
+                fantasy_description, description_status = None, 'pending'
+            else:
+                fantasy_description, description_status = random_fantasy_description(rng), 'ready'
+            missions.append((random_description(rng), fantasy_description, creation_date, due_date,
+                             STATUSES[status], id_user, description_status))
+
+        yield (user,
+               (id_user, username, username, rng.choice('MF'), level, rng.randrange(xp_limit), xp_limit),
+               (id_user, min(len(REWARD_TITLES), level // 5 + 1)),
+               missions,
+               (id_user, *counts))
+
+
+def reward_rows():
+    return [(index + 1, max(1, index * 5), title) for index, title in enumerate(REWARD_TITLES)]
+
+
+def format_value(value):
+    """ This function writes a value as LOAD DATA reads it by default: tab separated, backslash escaped, \\N is NULL
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, str):
+        return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+    return str(value)
+
+
+class TableFile:
+    """ Tab-separated file of the rows of a table, loaded with LOAD DATA LOCAL INFILE every chunk_size rows
+
+    Args:
+        connection (pymysql.connections.Connection): A connection to the benchmarks database, with local_infile
+        table (str): The table
+        columns (list): The columns of the rows
+        directory (str): The directory of the file
+        chunk_size (int): Rows written before loading the file
+    """
+
+    def __init__(self, connection, table, columns, directory, chunk_size):
+        self.connection = connection
+        self.table = table
+        self.columns = columns
+        self.path = os.path.join(directory, f'{table}.tsv')
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.loaded = 0
+        self.file = open(self.path, 'w', encoding='utf-8', newline='\n')
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write('\t'.join(format_value(value) for value in row))
+            self.file.write('\n')
+        self.rows += len(rows)
+        if self.rows >= self.chunk_size:
+            self.load()
+
+    def load(self):
+        self.file.close()
+        if self.rows:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} CHARACTER SET utf8mb4 "
+                               f"({', '.join(self.columns)})", (self.path,))
+            self.connection.commit()
+            self.loaded += self.rows
+        self.rows = 0
+        self.file = open(self.path, 'w', encoding='utf-8', newline='\n')
+
+    def close(self):
+        self.load()
+        self.file.close()
+        os.remove(self.path)
+
+
+class TableInserts:
+    """ Rows of a table inserted with executemany every chunk_size rows, for servers without local_infile
+
+    Args:
+        connection (pymysql.connections.Connection): A connection to the benchmarks database
+        table (str): The table
+        columns (list): The columns of the rows
+        chunk_size (int): Rows kept before inserting them
+    """
+
+    def __init__(self, connection, table, columns, chunk_size):
+        self.connection = connection
+        self.sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join(['%s'] * len(columns))})")
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.loaded = 0
+
+    def write(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= self.chunk_size:
+            self.load()
+
+    def load(self):
+        if self.pending:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(self.sql, self.pending)
+            self.connection.commit()
+            self.loaded += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.load()
+
+
+def load_dataset(connection, users, mean_missions=20, seed=42, method='load_data', chunk_size=200000):
+    """ This function generates the dataset and loads it into the benchmarks database
+
+    The rewards table is filled first, then every user with its reward, its missions and its mission counters.
+    Foreign and unique checks are disabled while loading, the generated rows are consistent by construction.
+
+    Args:
+        connection (pymysql.connections.Connection): A connection to the benchmarks database
+        users (int): The number of users
+        mean_missions (float): The mean missions per user
+        seed (int): The seed of the data
+        method (str): load_data for LOAD DATA LOCAL INFILE, executemany otherwise
+        chunk_size (int): Rows of a table sent to the server at once
+
+    Returns:
+        list: The generated users as User tuples
+    """
+    tables = [('users', USERS_COLUMNS), ('user_rewards', USER_REWARDS_COLUMNS), ('missions', MISSIONS_COLUMNS),
+              ('user_mission_stats', STATS_COLUMNS)]
+    generated = []
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET foreign_key_checks = 0, unique_checks = 0")
+        cursor.executemany("INSERT INTO rewards (id_reward, unlock_level, wizard_title) VALUES (%s, %s, %s)",
+                           reward_rows())
+    connection.commit()
+
+    with tempfile.TemporaryDirectory(prefix='dudu-dataset-') as directory:
+        if method == 'load_data':
+            writers = [TableFile(connection, table, columns, directory, chunk_size) for table, columns in tables]
+        else:
+            writers = [TableInserts(connection, table, columns, chunk_size) for table, columns in tables]
+
+        users_writer, rewards_writer, missions_writer, stats_writer = writers
+        for user, user_row, reward_row, missions, stats_row in generate(users, mean_missions, seed):
+            generated.append(user)
+            users_writer.write([user_row])
+            rewards_writer.write([reward_row])
+            missions_writer.write(missions)
+            stats_writer.write([stats_row])
+
+        # Load the rows left, parents first
+        for writer in writers:
+            writer.close()
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET foreign_key_checks = 1, unique_checks = 1")
+    return generated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Create the benchmarks database and load a synthetic dataset')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='benchmark')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--mean-missions', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--method', choices=['load_data', 'executemany'], default='load_data')
+    parser.add_argument('--chunk-size', type=int, default=200000, help='Rows of a table sent to the server at once')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    connection = database.connect(args.db_host, args.db_user, args.db_password, port=args.db_port)
+    try:
+        database.create_database(connection)
+        users = load_dataset(connection, args.users, args.mean_missions, args.seed, args.method, args.chunk_size)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM missions")
+            missions = cursor.fetchone()[0]
+    finally:
+        connection.close()
+    print(f"{len(users)} users and {missions} missions loaded in {time.perf_counter() - start:.0f} s")
+
+
+if __name__ == '__main__':
+    main()
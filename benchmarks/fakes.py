@@ -0,0 +1,302 @@
+""" In-process stand-ins for Secrets Manager, Cognito and OpenAI used by the benchmarks
+
+The AWS fakes answer with the same shapes and error codes as the real services, after a configurable latency, and
+count every call so the runner can report the round trips of each invocation. The OpenAI fake is a real HTTP
+server, so the openai SDK, httpx and the connection handling are measured too.
+"""
+import json
+import time
+import uuid
+import base64
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+
+
+def client_error(code, operation_name, message=''):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation_name)
+
+
+class FakeService:
+    """ Base of the AWS fakes: sleeps the configured latency and counts the calls of every operation
+
+    Args:
+        latency (float): Seconds every call takes
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeSecretsManager(FakeService):
+    """ Secrets Manager holding the secrets read by the handlers
+
+    Args:
+        secrets (dict): Secret name -> secret dict
+        latency (float): Seconds every call takes
+    """
+
+    def __init__(self, secrets, latency=0.0):
+        super().__init__(latency)
+        self.secrets = secrets
+
+    def get_secret_value(self, SecretId, **_):
+        self._call()
+        if SecretId not in self.secrets:
+            raise client_error('ResourceNotFoundException', 'GetSecretValue')
+        return {'Name': SecretId, 'SecretString': json.dumps(self.secrets[SecretId])}
+
+
+class FakeCognito(FakeService):
+    """ Cognito user pool kept in memory
+
+    Args:
+        latency (float): Seconds every call takes
+    """
+
+    def __init__(self, latency=0.0):
+        super().__init__(latency)
+        self.users = {}
+
+    def add_user(self, username, email, password, sub=None, status='CONFIRMED'):
+        """ This function adds a user to the pool without counting it as a call
+
+        Returns:
+            dict: The user
+        """
+        user = {
+            'Username': username,
+            'sub': sub or str(uuid.uuid4()),
+            'email': email,
+            'email_verified': 'true' if status == 'CONFIRMED' else 'false',
+            'password': password,
+            'UserStatus': status
+        }
+        self.users[username] = user
+        return user
+
+    def _get_user(self, username, operation_name):
+        user = self.users.get(username)
+        if user is None:
+            raise client_error('UserNotFoundException', operation_name, 'User does not exist.')
+        return user
+
+    @staticmethod
+    def _attributes(user, names=('sub', 'email_verified', 'email')):
+        # Some handlers still read the attributes by position, so every operation keeps the order they expect
+        return [{'Name': name, 'Value': user[name]} for name in names]
+
+    def _tokens(self, user):
+        claims = {'sub': user['sub'], 'cognito:username': user['Username'], 'email': user['email'],
+                  'email_verified': user['email_verified'] == 'true'}
+        payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+        return {'AuthenticationResult': {
+            'IdToken': f'eyJhbGciOiJub25lIn0.{payload}.signature',
+            'AccessToken': f'access-{uuid.uuid4()}',
+            'RefreshToken': f'refresh-{uuid.uuid4()}',
+            'ExpiresIn': 3600,
+            'TokenType': 'Bearer'
+        }}
+
+    def _authenticate(self, parameters, operation_name):
+        user = self.users.get(parameters['USERNAME'])
+        if user is None or user['password'] != parameters['PASSWORD']:
+            raise client_error('NotAuthorizedException', operation_name, 'Incorrect username or password.')
+        if user['UserStatus'] == 'FORCE_CHANGE_PASSWORD':
+            return {'ChallengeName': 'NEW_PASSWORD_REQUIRED', 'Session': user['Username'], 'ChallengeParameters': {}}
+        return self._tokens(user)
+
+    def initiate_auth(self, AuthFlow, AuthParameters, ClientId, **_):
+        self._call()
+        return self._authenticate(AuthParameters, 'InitiateAuth')
+
+    def admin_initiate_auth(self, UserPoolId, ClientId, AuthFlow, AuthParameters, **_):
+        self._call()
+        return self._authenticate(AuthParameters, 'AdminInitiateAuth')
+
+    def respond_to_auth_challenge(self, ClientId, ChallengeName, Session, ChallengeResponses, **_):
+        self._call()
+        user = self._get_user(Session, 'RespondToAuthChallenge')
+        user['password'] = ChallengeResponses['NEW_PASSWORD']
+        user['UserStatus'] = 'CONFIRMED'
+        return self._tokens(user)
+
+    def admin_create_user(self, UserPoolId, Username, UserAttributes, TemporaryPassword, **_):
+        self._call()
+        if Username in self.users:
+            raise client_error('UsernameExistsException', 'AdminCreateUser', 'User account already exists')
+        email = next(attribute['Value'] for attribute in UserAttributes if attribute['Name'] == 'email')
+        user = self.add_user(Username, email, TemporaryPassword, status='FORCE_CHANGE_PASSWORD')
+        return {'User': {'Username': Username, 'Attributes': self._attributes(user, ('email', 'sub')),
+                         'UserStatus': user['UserStatus'], 'Enabled': True}}
+
+    def admin_get_user(self, UserPoolId, Username, **_):
+        self._call()
+        user = self._get_user(Username, 'AdminGetUser')
+        return {'Username': Username, 'UserAttributes': self._attributes(user), 'UserStatus': user['UserStatus'],
+                'Enabled': True}
+
+    def list_users(self, UserPoolId, Filter='', **_):
+        self._call()
+        sub = Filter.split('"')[1] if '"' in Filter else None
+        users = [user for user in self.users.values() if sub is None or user['sub'] == sub]
+        return {'Users': [{'Username': user['Username'], 'Attributes': self._attributes(user),
+                           'UserStatus': user['UserStatus'], 'Enabled': True} for user in users]}
+
+    def admin_update_user_attributes(self, UserPoolId, Username, UserAttributes, **_):
+        self._call()
+        user = self._get_user(Username, 'AdminUpdateUserAttributes')
+        for attribute in UserAttributes:
+            if attribute['Name'] in ('email', 'email_verified'):
+                user[attribute['Name']] = attribute['Value']
+        return {}
+
+    def admin_delete_user(self, UserPoolId, Username, **_):
+        self._call()
+        self._get_user(Username, 'AdminDeleteUser')
+        del self.users[Username]
+        return {}
+
+    def forgot_password(self, ClientId, Username, **_):
+        self._call()
+        user = self._get_user(Username, 'ForgotPassword')
+        return {'CodeDeliveryDetails': {'Destination': user['email'], 'DeliveryMedium': 'EMAIL',
+                                        'AttributeName': 'email'}}
+
+    def confirm_forgot_password(self, ClientId, Username, ConfirmationCode, Password, **_):
+        self._call()
+        user = self._get_user(Username, 'ConfirmForgotPassword')
+        user['password'] = Password
+        return {}
+
+
+class FakeSession:
+    """ boto3 Session whose clients are the fakes """
+
+    def __init__(self, services):
+        self.services = services
+
+    def client(self, service_name, region_name=None, **_):
+        return self.services[service_name]
+
+
+class FakeOpenAIServer:
+    """ HTTP server answering the chat completions API of OpenAI after a configurable latency
+
+    The batch prompts of bulk_insert_missions get a JSON object with one description per numbered original
+    description, every other prompt gets a single description.
+
+    Args:
+        latency (float): Seconds every completion takes
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def complete(self, prompt):
+        """ This function returns the content of the completion of a prompt
+
+        Args:
+            prompt (str): The prompt sent by openai_connection
+
+        Returns:
+            str: The content
+        """
+        start = prompt.rfind(': {')
+        if start != -1:
+            try:
+                descriptions = json.loads(prompt[start + 2:])
+                return json.dumps({index: f'Emprender la misión épica de {description}'
+                                   for index, description in descriptions.items()}, ensure_ascii=False)
+            except ValueError:
+                pass
+        return f"Emprender la misión épica de {prompt.rsplit(': ', 1)[-1]}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                with fake._lock:
+                    fake.calls += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                content = fake.complete(request['messages'][-1]['content'])
+                body = json.dumps({
+                    'id': f'chatcmpl-{uuid.uuid4().hex}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'gpt-3.5-turbo'),
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                                 'finish_reason': 'stop'}],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                }).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@contextmanager
+def fake_services(secrets, aws_latency=0.0, openai_latency=0.0):
+    """ This context manager replaces Secrets Manager, Cognito and OpenAI with the fakes
+
+    Args:
+        secrets (dict): Secret name -> secret dict of the fake Secrets Manager
+        aws_latency (float): Seconds every Secrets Manager and Cognito call takes
+        openai_latency (float): Seconds every OpenAI completion takes
+
+    Yields:
+        dict: The fakes by service name: secretsmanager, cognito-idp and openai
+    """
+    services = {
+        'secretsmanager': FakeSecretsManager(secrets, aws_latency),
+        'cognito-idp': FakeCognito(aws_latency)
+    }
+    openai_server = FakeOpenAIServer(openai_latency)
+    openai_server.start()
+
+    try:
+        with patch('boto3.session.Session', lambda *args, **kwargs: FakeSession(services)), \
+                patch('boto3.client', lambda service_name, *args, **kwargs: services[service_name]), \
+                patch.dict('os.environ', {'OPENAI_BASE_URL': openai_server.base_url}):
+            yield dict(services, openai=openai_server)
+    finally:
+        openai_server.stop()
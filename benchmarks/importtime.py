@@ -0,0 +1,224 @@
+""" Cold-start import profile of the Lambda functions
+
+Every function is imported the way Lambda does it, `import app` from its own directory with the layer on the path
+(`import api.app` from modules/ for the consolidated router), in a fresh interpreter under `python -X importtime`.
+The import time and the dependencies imported by each function are compared with the budgets of
+benchmarks/import_budgets.json, so the run fails when a function becomes slower to import or starts loading a
+package at the cold start (openai in insert_mission, for instance). Only the packages declared in the
+requirements.txt files of the repository are compared, what they pull in depends on the environment.
+
+    python -m benchmarks.importtime            # check the budgets, exit code 1 on a regression
+    python -m benchmarks.importtime --update   # record the current profile as the budgets
+
+Run it from the root of the repository. Import times depend on the machine, record the budgets where they are
+checked. The budgets hold the median of the runs and the check takes the fastest one, so machine noise rarely fails
+it while a slower import shifts every run.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+import statistics
+import sys
+from collections import defaultdict, namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAYER_PATH = os.path.join(ROOT, 'layers', 'dudu_common')
+
+BUDGETS_PATH = os.path.join(ROOT, 'benchmarks', 'import_budgets.json')
+
+# Written to stderr right before the handler is imported, the interpreter startup imports come before it
+MARKER = '-- lambda handler --'
+
+# Requirements of the functions and of the layer, the dependencies the package check looks at
+REQUIREMENTS_PATTERNS = [os.path.join(ROOT, 'modules', '**', 'requirements.txt'),
+                         os.path.join(ROOT, 'layers', '*', 'requirements.txt')]
+
+# Start of the version specifier, extras, markers or comment of a requirement line
+REQUIREMENT_NAME_END = re.compile(r'[\s\[<>=!~;@#]')
+
+Function = namedtuple('Function', ['directory', 'module'])
+
+Profile = namedtuple('Profile', ['name', 'import_ms', 'median_ms', 'packages'])
+
+
+def find_functions():
+    """ This function returns the code directory and the handler module of every Lambda function by function name
+
+    The functions of modules/<group>/<name>/ are deployed with their own directory as CodeUri, the consolidated
+    router modules/api/ with the whole modules/ directory.
+
+    Returns:
+        dict: Function name -> Function
+    """
+    modules = os.path.join(ROOT, 'modules')
+    functions = {os.path.basename(os.path.dirname(path)): Function(os.path.dirname(path), 'app')
+                 for path in sorted(glob.glob(os.path.join(modules, '*', '*', 'app.py')))}
+    for path in sorted(glob.glob(os.path.join(modules, '*', 'app.py'))):
+        package = os.path.basename(os.path.dirname(path))
+        functions[package] = Function(modules, f'{package}.app')
+    return functions
+
+
+def find_requirements():
+    """ This function returns the packages declared in the requirements.txt files of the repository
+
+    Their distribution names are also their import names (boto3, openai, pymysql...), compared in lower case.
+
+    Returns:
+        set: The declared package names
+    """
+    requirements = set()
+    for pattern in REQUIREMENTS_PATTERNS:
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, encoding='utf-8') as requirements_file:
+                for line in requirements_file:
+                    name = REQUIREMENT_NAME_END.split(line.strip(), 1)[0]
+                    if name and not name.startswith('-'):
+                        requirements.add(name.lower().replace('-', '_'))
+    return requirements
+
+
+def parse_importtime(output):
+    """ This function reads the -X importtime report of the handler import
+
+    Args:
+        output (str): The stderr of the interpreter
+
+    Returns:
+        tuple: The import time in milliseconds and the cumulative milliseconds of every top-level package
+    """
+    lines = output.split(MARKER, 1)[-1].splitlines()
+    total_us = 0
+    packages = defaultdict(int)
+
+    for line in lines:
+        if not line.startswith('import time:') or line.count('|') != 2:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue
+
+        # -X importtime indents the nested imports, the unindented ones are what the handler import paid for
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative_us)
+        packages[name.strip().split('.')[0]] += int(self_us)
+
+    return total_us / 1000, {package: self_us / 1000 for package, self_us in packages.items()}
+
+
+def profile_function(name, function, repeat, requirements):
+    """ This function imports a function in fresh interpreters, keeping the fastest run and the median time
+
+    The fastest run is checked against the budgets and the median is recorded as the budget, so a single lucky run
+    on --update does not turn every later check into a false regression.
+
+    Args:
+        name (str): The function name
+        function (Function): Its code directory and handler module
+        repeat (int): Interpreters started, the fastest one is the least disturbed by the machine
+        requirements (set): The declared packages, the only ones listed in the profile
+
+    Returns:
+        tuple: The Profile of the function and the milliseconds spent in every package by the fastest run
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([function.directory, LAYER_PATH]), PYTHONDONTWRITEBYTECODE='')
+    code = f"import sys; sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush(); import {function.module}"
+
+    best = None
+    times = []
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=function.directory, env=env,
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            raise RuntimeError(f"{name} failed to import:\n{process.stderr[-2000:]}")
+        import_ms, packages = parse_importtime(process.stderr)
+        times.append(import_ms)
+        if best is None or import_ms < best[0]:
+            best = import_ms, packages
+
+    import_ms, packages = best
+    dependencies = sorted(package for package in packages if package.lower() in requirements)
+    return Profile(name, round(import_ms, 1), round(statistics.median(times), 1), dependencies), packages
+
+
+def load_budgets(path=BUDGETS_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as budgets_file:
+        return json.load(budgets_file)
+
+
+def check_profile(profile, budget, tolerance):
+    """ This function compares a profile with the budget of its function
+
+    Args:
+        profile (Profile): The measured profile
+        budget (dict): import_ms and packages recorded for the function, None if it has no budget
+        tolerance (float): Fraction over the recorded import time still accepted, cold imports are noisy
+
+    Returns:
+        list: The regressions found, empty if the function is within its budget
+    """
+    if budget is None:
+        return [f"{profile.name} has no budget, record it with --update"]
+
+    regressions = []
+    limit = budget['import_ms'] * (1 + tolerance)
+    if profile.import_ms > limit:
+        regressions.append(f"{profile.name} imports in {profile.import_ms:.1f} ms, over its budget of "
+                           f"{budget['import_ms']:.1f} ms (+{tolerance:.0%})")
+
+    new_packages = sorted(set(profile.packages) - set(budget['packages']))
+    if new_packages:
+        regressions.append(f"{profile.name} now imports {', '.join(new_packages)} at the cold start")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the cold-start imports of the Lambda functions')
+    parser.add_argument('--functions', nargs='*', help='Functions to profile, all of them by default')
+    parser.add_argument('--repeat', type=int, default=5, help='Interpreters started per function')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction over the recorded import time still accepted')
+    parser.add_argument('--top', type=int, default=3, help='Slowest packages shown per function')
+    parser.add_argument('--update', action='store_true', help='Record the current profile as the budgets')
+    parser.add_argument('--budgets', default=BUDGETS_PATH, help='The budgets file')
+    args = parser.parse_args(argv)
+
+    functions = find_functions()
+    requirements = find_requirements()
+    names = args.functions or list(functions)
+    budgets = load_budgets(args.budgets)
+    regressions = []
+
+    for name in names:
+        profile, packages = profile_function(name, functions[name], args.repeat, requirements)
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        budget = budgets.get(name)
+        print(f"{name:<28} {profile.import_ms:>8.1f} ms  budget "
+              f"{budget['import_ms'] if budget else '-':>8} ms  "
+              + ', '.join(f'{package} {milliseconds:.0f} ms' for package, milliseconds in slowest))
+
+        if args.update:
+            budgets[name] = {'import_ms': profile.median_ms, 'packages': profile.packages}
+        else:
+            regressions.extend(check_profile(profile, budget, args.tolerance))
+
+    if args.update:
+        with open(args.budgets, 'w', encoding='utf-8') as budgets_file:
+            json.dump(dict(sorted(budgets.items())), budgets_file, indent=2)
+            budgets_file.write('\n')
+        print(f"Budgets written to {os.path.relpath(args.budgets)}")
+        return 0
+
+    for regression in regressions:
+        print(regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
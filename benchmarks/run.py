@@ -0,0 +1,266 @@
+""" Local end-to-end benchmark of the Lambda handlers
+
+Every handler is invoked in-process with API Gateway events against a local MySQL seeded with synthetic data and
+fakes of Secrets Manager, Cognito and OpenAI. The runner reports per endpoint the latency percentiles, the round
+trips to every dependency and the memory allocated by each invocation.
+
+    docker compose -f benchmarks/docker-compose.yml up -d
+    PYTHONPATH=layers/dudu_common python -m benchmarks.run --iterations 200
+
+Run it from the root of the repository. The benchmarks database is dropped and created again on every run.
+"""
+import argparse
+import functools
+import importlib
+import json
+import random
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest.mock import patch
+import pymysql
+from pymysql.connections import Connection
+from dudu_common import db_connection
+from dudu_common.aws_clients import clear_clients
+from dudu_common.cognito import forget_username
+from dudu_common.description_cache import clear_description_cache
+from dudu_common.profile_cache import clear_profile_cache
+from dudu_common.progression import clear_reward_titles
+from dudu_common.secrets_cache import invalidate_secret
+from . import database
+from .dataset import load_dataset
+from .fakes import fake_services
+from .scenarios import SCENARIOS, BenchmarkContext
+
+# Round trips counted per invocation, in the order of the report
+ROUND_TRIPS = ['db_connects', 'db_commands', 'db_rollbacks', 'secretsmanager', 'cognito-idp', 'openai']
+
+Result = namedtuple('Result', ['name', 'invocations', 'errors', 'p50', 'p95', 'p99', 'round_trips',
+                               'allocated_kib'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local end-to-end benchmark of the Lambda handlers')
+    parser.add_argument('--db-host', default='127.0.0.1')
+    parser.add_argument('--db-port', type=int, default=3306)
+    parser.add_argument('--db-user', default='root')
+    parser.add_argument('--db-password', default='benchmark')
+    parser.add_argument('--users', type=int, default=1000, help='Users loaded in the database')
+    parser.add_argument('--mean-missions', type=float, default=20, help='Mean missions per user')
+    parser.add_argument('--load-method', choices=['load_data', 'executemany'], default='load_data')
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the data and of the events')
+    parser.add_argument('--iterations', type=int, default=100, help='Measured invocations of every endpoint')
+    parser.add_argument('--warmup', type=int, default=5, help='Invocations of every endpoint before measuring')
+    parser.add_argument('--allocation-iterations', type=int, default=10,
+                        help='Invocations traced with tracemalloc, apart from the timed ones')
+    parser.add_argument('--aws-latency', type=float, default=0.015,
+                        help='Seconds every Secrets Manager and Cognito call takes')
+    parser.add_argument('--openai-latency', type=float, default=0.8, help='Seconds every OpenAI completion takes')
+    parser.add_argument('--cold', action='store_true',
+                        help='Drop the container caches, clients and connection before every invocation')
+    parser.add_argument('--router', action='store_true',
+                        help='Invoke the API endpoints through the consolidated api function')
+    parser.add_argument('--endpoints', nargs='*', help='Endpoints to run, all of them by default')
+    parser.add_argument('--json', dest='json_path', help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+@contextmanager
+def count_database_round_trips(counters):
+    """ This context manager counts the connections opened and the commands sent to MySQL (queries, commits,
+    rollbacks and pings), every command is one round trip to the server
+
+    The rollbacks are also counted apart: read-only invocations pay one when the pooled connection is released to
+    drop their snapshot.
+
+    Args:
+        counters (dict): The counters, db_connects, db_commands and db_rollbacks are incremented
+    """
+    connect = Connection.connect
+    execute_command = Connection._execute_command
+
+    def counted_connect(self, *args, **kwargs):
+        counters['db_connects'] += 1
+        return connect(self, *args, **kwargs)
+
+    def counted_execute_command(self, command, sql):
+        counters['db_commands'] += 1
+        if sql == 'ROLLBACK':
+            counters['db_rollbacks'] += 1
+        return execute_command(self, command, sql)
+
+    with patch.object(Connection, 'connect', counted_connect), \
+            patch.object(Connection, '_execute_command', counted_execute_command):
+        yield
+
+
+def reset_container():
+    """ This function drops everything a warm container keeps between invocations, so the next one runs cold """
+    db_connection.discard_db_connection()
+    invalidate_secret()
+    clear_clients()
+    clear_reward_titles()
+    clear_profile_cache()
+    clear_description_cache()
+    forget_username()
+
+
+def percentile(samples, fraction):
+    """ This function returns a percentile of the samples, interpolating between the closest ranks
+
+    Args:
+        samples (list): The sorted samples
+        fraction (float): The percentile between 0 and 1
+
+    Returns:
+        float: The percentile
+    """
+    if not samples:
+        return 0.0
+    position = (len(samples) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(samples) - 1)
+    return samples[lower] + (samples[upper] - samples[lower]) * (position - lower)
+
+
+def is_error(response):
+    return not isinstance(response, dict) or response.get('statusCode', 500) >= 400
+
+
+def run_scenario(scenario, context, read_counters, args):
+    """ This function benchmarks one endpoint
+
+    Args:
+        scenario (Scenario): The endpoint
+        context (BenchmarkContext): The state shared by the scenarios
+        read_counters (callable): Returns a snapshot of the round trip counters
+        args (argparse.Namespace): The options of the run
+
+    Returns:
+        Result: The latencies, round trips and allocations of the endpoint
+    """
+    module = 'modules.api.app' if args.router and scenario.path else scenario.module
+    handler = importlib.import_module(module).lambda_handler
+
+    def invoke():
+        if args.cold:
+            reset_container()
+        event = scenario.build(context)
+        before = read_counters()
+        start = time.perf_counter()
+        response = handler(event, None)
+        elapsed = time.perf_counter() - start
+        after = read_counters()
+        return response, elapsed, {name: after[name] - before[name] for name in ROUND_TRIPS}
+
+    for _ in range(args.warmup):
+        invoke()
+
+    latencies = []
+    errors = 0
+    round_trips = dict.fromkeys(ROUND_TRIPS, 0)
+    for _ in range(args.iterations):
+        response, elapsed, trips = invoke()
+        latencies.append(elapsed)
+        for name in ROUND_TRIPS:
+            round_trips[name] += trips[name]
+        if is_error(response):
+            if not errors:
+                print(f"{scenario.name}: {json.dumps(response, default=str)[:500]}", file=sys.stderr)
+            errors += 1
+
+    # Allocations are traced apart, tracemalloc slows down every allocation and would skew the latencies
+    allocated = []
+    tracemalloc.start()
+    try:
+        for _ in range(args.allocation_iterations):
+            if args.cold:
+                reset_container()
+            event = scenario.build(context)
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            handler(event, None)
+            allocated.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    allocated.sort()
+    invocations = max(args.iterations, 1)
+    return Result(
+        name=scenario.name,
+        invocations=args.iterations,
+        errors=errors,
+        p50=percentile(latencies, 0.50) * 1000,
+        p95=percentile(latencies, 0.95) * 1000,
+        p99=percentile(latencies, 0.99) * 1000,
+        round_trips={name: count / invocations for name, count in round_trips.items()},
+        allocated_kib=percentile(allocated, 0.50) / 1024
+    )
+
+
+def print_report(results, file=sys.stdout):
+    """ This function prints the results as a table, latencies in milliseconds, round trips per invocation and
+    the median peak allocation in KiB
+    """
+    header = ['endpoint', 'n', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', *ROUND_TRIPS, 'alloc KiB']
+    rows = [[result.name, str(result.invocations), str(result.errors), f'{result.p50:.1f}', f'{result.p95:.1f}',
+             f'{result.p99:.1f}', *(f'{result.round_trips[name]:.2f}' for name in ROUND_TRIPS),
+             f'{result.allocated_kib:.0f}'] for result in results]
+    widths = [max(len(row[column]) for row in [header, *rows]) for column in range(len(header))]
+
+    for row in [header, *rows]:
+        print('  '.join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                        for column, (cell, width) in enumerate(zip(row, widths))), file=file)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [scenario for scenario in SCENARIOS if not args.endpoints or scenario.name in args.endpoints]
+    rng = random.Random(args.seed)
+
+    connection = database.connect(args.db_host, args.db_user, args.db_password, port=args.db_port)
+    try:
+        database.create_database(connection)
+        users = load_dataset(connection, args.users, args.mean_missions, args.seed, args.load_method)
+        invocations = args.warmup + args.iterations + args.allocation_iterations
+        pending_missions = database.get_pending_missions(connection, invocations * 2)
+
+        secrets = {
+            'dudu/db/connection2': {'username': args.db_user, 'password': args.db_password},
+            'users_pool/client_secret2': {'USER_POOL_ID': 'us-east-2_benchmark', 'ID_CLIENT': 'benchmark-client',
+                                          'SECRET_CLIENT': 'benchmark-secret'},
+            'secret/openai/key2': {'OPENAI_KEY': 'sk-benchmark'}
+        }
+        counters = dict.fromkeys(ROUND_TRIPS[:3], 0)
+
+        reset_container()
+        with fake_services(secrets, args.aws_latency, args.openai_latency) as services, \
+                count_database_round_trips(counters), \
+                patch.object(db_connection, 'DB_HOST', args.db_host), \
+                patch.object(db_connection, 'DB_NAME', database.DB_NAME), \
+                patch('pymysql.connect', functools.partial(pymysql.connect, port=args.db_port)):
+            for user in users:
+                services['cognito-idp'].add_user(user.cognito_username, user.email, user.password,
+                                                 sub=user.id_user)
+
+            def read_counters():
+                return dict(counters, **{name: services[name].calls for name in ROUND_TRIPS[3:]})
+
+            context = BenchmarkContext(users, pending_missions, services['cognito-idp'], connection, rng)
+            results = [run_scenario(scenario, context, read_counters, args) for scenario in scenarios]
+        reset_container()
+    finally:
+        connection.close()
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as json_file:
+            json.dump([result._asdict() for result in results], json_file, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
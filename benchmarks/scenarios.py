@@ -0,0 +1,255 @@
+""" Benchmark scenarios: the API Gateway event of every endpoint
+
+Every scenario builds a fresh event per invocation from events/event.json, so writes (completions, cancellations,
+registrations, deletions) always act on a row that is still in the state the handler expects.
+"""
+import copy
+import json
+import os
+import uuid
+from collections import namedtuple
+from datetime import date, timedelta
+from .dataset import PASSWORD, random_description
+
+EVENT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'events', 'event.json')
+
+Scenario = namedtuple('Scenario', ['name', 'module', 'method', 'path', 'build'])
+
+with open(EVENT_PATH, encoding='utf-8') as event_file:
+    BASE_EVENT = json.load(event_file)
+
+
+def build_event(method, path, body=None, headers=None):
+    """ This function builds an API Gateway proxy event over events/event.json
+
+    Args:
+        method (str): The HTTP method
+        path (str): The resource path
+        body (dict): The JSON body, None for an event without body
+        headers (dict): Headers added to the ones of the sample event
+
+    Returns:
+        dict: The event
+    """
+    event = copy.deepcopy(BASE_EVENT)
+    event['httpMethod'] = method
+    event['path'] = path
+    event['resource'] = path
+    event['requestContext']['httpMethod'] = method
+    event['requestContext']['resourcePath'] = path
+    event['requestContext']['path'] = f"/{event['requestContext']['stage']}{path}"
+    event['requestContext']['requestId'] = str(uuid.uuid4())
+    event['queryStringParameters'] = None
+    event['pathParameters'] = None
+    event['headers'] = dict(event['headers'], **{'Content-Type': 'application/json'}, **(headers or {}))
+    event['body'] = json.dumps(body) if body is not None else None
+    return event
+
+
+def scheduled_event():
+    """ This function builds the EventBridge event of the scheduled functions
+
+    Returns:
+        dict: The event
+    """
+    return {
+        'version': '0',
+        'id': str(uuid.uuid4()),
+        'detail-type': 'Scheduled Event',
+        'source': 'aws.events',
+        'account': '123456789012',
+        'region': 'us-east-2',
+        'resources': [],
+        'detail': {}
+    }
+
+
+class BenchmarkContext:
+    """ State shared by the scenarios of a run: the generated users, the pending missions left and the fakes
+
+    Args:
+        users (list): The generated users as dataset.User tuples
+        pending_missions (list): (id_mission, id_user) pairs of pending missions
+        cognito (FakeCognito): The fake user pool
+        connection (pymysql.connections.Connection): A connection of the harness, not the pooled one of the handlers
+        rng (random.Random): The random generator of the run
+    """
+
+    def __init__(self, users, pending_missions, cognito, connection, rng):
+        self.users = users
+        self.pending_missions = list(pending_missions)
+        self.cognito = cognito
+        self.connection = connection
+        self.rng = rng
+        self.sequence = 0
+
+    def next_id(self):
+        self.sequence += 1
+        return self.sequence
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def pending_mission(self):
+        if not self.pending_missions:
+            raise RuntimeError('No pending missions left, load more missions or run fewer iterations')
+        return self.pending_missions.pop()
+
+    def mission(self, status='pending'):
+        today = date.today()
+        return {
+            'original_description': random_description(self.rng),
+            'creation_date': today.isoformat(),
+            'due_date': (today + timedelta(days=self.rng.randint(1, 30))).isoformat(),
+            'status': status
+        }
+
+
+def search_mission(context):
+    return build_event('POST', '/search_mission', {
+        'id_user': context.user().id_user,
+        'search_query': context.rng.choice(['', 'perro', 'examen', 'renta', 'cena']),
+        'order_by': 'due_date',
+        'order': 'asc',
+        'status': 'pending',
+        'page': 1,
+        'limit': 10
+    })
+
+
+def get_profile(context):
+    return build_event('POST', '/get_profile', {'id_user': context.user().id_user})
+
+
+def complete_mission(context):
+    id_mission, id_user = context.pending_mission()
+    return build_event('PUT', '/complete_mission', {'id_mission': id_mission, 'id_user': id_user},
+                       {'Idempotency-Key': str(uuid.uuid4())})
+
+
+def cancel_mission(context):
+    id_mission, id_user = context.pending_mission()
+    return build_event('PUT', '/cancel_mission', {'id_mission': id_mission, 'id_user': id_user})
+
+
+def insert_mission(context):
+    return build_event('POST', '/insert_mission', dict(context.mission(), id_user=context.user().id_user),
+                       {'Idempotency-Key': str(uuid.uuid4())})
+
+
+def bulk_insert_missions(context):
+    return build_event('POST', '/bulk_insert_missions', {
+        'id_user': context.user().id_user,
+        'missions': [context.mission() for _ in range(5)]
+    })
+
+
+def login(context):
+    user = context.user()
+    return build_event('POST', '/login', {'username': user.cognito_username, 'password': user.password})
+
+
+def recover_password(context):
+    return build_event('POST', '/recover_password/', {'username': context.user().cognito_username})
+
+
+def change_password(context):
+    user = context.user()
+    return build_event('POST', '/change_password/', {
+        'username': user.cognito_username,
+        'confirmation_code': '123456',
+        'new_password': user.password,
+        'confirm_new_password': user.password
+    })
+
+
+def set_password(context):
+    username = f'temp{context.next_id()}'
+    context.cognito.add_user(username, f'{username}@example.com', 'Temporal1!', status='FORCE_CHANGE_PASSWORD')
+    return build_event('POST', '/set_password', {'username': username, 'password': 'Temporal1!',
+                                                 'new_password': PASSWORD})
+
+
+def register_user(context):
+    username = f'new{uuid.uuid4().hex[:12]}'
+    return build_event('POST', '/register_user', {'email': f'{username}@example.com', 'username': username,
+                                                  'gender': context.rng.choice('MF')})
+
+
+def register_alexa_user(context):
+    return build_event('POST', '/register_alexa_user', {'id_user': f'amzn1.ask.account.{uuid.uuid4().hex}',
+                                                        'username': f'alexa{context.next_id()}'})
+
+
+def exist_user(context):
+    return build_event('POST', '/exist_user', {'id_user': context.user().id_user})
+
+
+def update_alexa_user(context):
+    user = context.user()
+    return build_event('POST', '/update_alexa_user', {'id_user': user.id_user,
+                                                      'username': user.cognito_username})
+
+
+def update_profile(context):
+    user = context.user()
+    return build_event('PUT', '/update_profile', {'id_user': user.id_user, 'sub': user.id_user,
+                                                  'email': user.email, 'gender': context.rng.choice('MF')})
+
+
+def delete_user_profile(context):
+    # A throwaway user without missions, created outside the measured invocation
+    username = f'gone{context.next_id()}'
+    user = context.cognito.add_user(username, f'{username}@example.com', PASSWORD)
+    with context.connection.cursor() as cursor:
+        cursor.execute("INSERT INTO users (id_user, username, cognito_username, gender) VALUES (%s, %s, %s, 'M')",
+                       (user['sub'], username, username))
+        cursor.execute("INSERT INTO user_rewards (id_user, id_reward) VALUES (%s, 1)", (user['sub'],))
+    context.connection.commit()
+    return build_event('POST', '/delete_user_profile', {'id_user': user['sub'], 'sub': user['sub']})
+
+
+def mission_expiration(_):
+    return scheduled_event()
+
+
+def fantasy_description_worker(context):
+    # Queue a few missions as insert_mission does with async_description
+    id_user = context.user().id_user
+    missions = [context.mission() for _ in range(5)]
+    with context.connection.cursor() as cursor:
+        cursor.executemany("INSERT INTO missions (original_description, creation_date, due_date, status, id_user, "
+                           "description_status) VALUES (%s, %s, %s, %s, %s, 'pending')",
+                           [(mission['original_description'], mission['creation_date'], mission['due_date'],
+                             mission['status'], id_user) for mission in missions])
+    context.connection.commit()
+    return scheduled_event()
+
+
+SCENARIOS = [
+    Scenario('search_mission', 'modules.missions.search_mission.app', 'POST', '/search_mission', search_mission),
+    Scenario('get_profile', 'modules.profile.get_profile.app', 'POST', '/get_profile', get_profile),
+    Scenario('complete_mission', 'modules.missions.complete_mission.app', 'PUT', '/complete_mission',
+             complete_mission),
+    Scenario('cancel_mission', 'modules.missions.cancel_mission.app', 'PUT', '/cancel_mission', cancel_mission),
+    Scenario('insert_mission', 'modules.missions.insert_mission.app', 'POST', '/insert_mission', insert_mission),
+    Scenario('bulk_insert_missions', 'modules.missions.bulk_insert_missions.app', 'POST', '/bulk_insert_missions',
+             bulk_insert_missions),
+    Scenario('login', 'modules.users.login.app', 'POST', '/login', login),
+    Scenario('recover_password', 'modules.users.recover_password.app', 'POST', '/recover_password/',
+             recover_password),
+    Scenario('change_password', 'modules.users.change_password.app', 'POST', '/change_password/', change_password),
+    Scenario('set_password', 'modules.users.set_password.app', 'POST', '/set_password', set_password),
+    Scenario('register_user', 'modules.users.register_user.app', 'POST', '/register_user', register_user),
+    Scenario('register_alexa_user', 'modules.users.register_alexa_user.app', 'POST', '/register_alexa_user',
+             register_alexa_user),
+    Scenario('exist_user', 'modules.users.exist_user.app', 'POST', '/exist_user', exist_user),
+    Scenario('update_alexa_user', 'modules.users.update_alexa_user.app', 'POST', '/update_alexa_user',
+             update_alexa_user),
+    Scenario('update_profile', 'modules.profile.update_profile.app', 'PUT', '/update_profile', update_profile),
+    Scenario('delete_user_profile', 'modules.users.delete_user_profile.app', 'POST', '/delete_user_profile',
+             delete_user_profile),
+    Scenario('mission_expiration', 'modules.missions.mission_expiration.app', None, None, mission_expiration),
+    Scenario('fantasy_description_worker', 'modules.missions.fantasy_description_worker.app', None, None,
+             fantasy_description_worker),
+]
@@ -0,0 +1,35 @@
+-- Esquema base de dududb, anterior a las migraciones de migrations/.
+-- Lo usa benchmarks/database.py para crear la base local de los benchmarks; después aplica las migraciones
+-- en orden, así la base local queda igual que la de producción.
+CREATE TABLE users (
+    id_user VARCHAR(255) PRIMARY KEY,
+    username VARCHAR(255) NULL,
+    gender CHAR(1) NOT NULL DEFAULT 'M',
+    level INT NOT NULL DEFAULT 1,
+    current_xp INT NOT NULL DEFAULT 0,
+    xp_limit INT NOT NULL DEFAULT 100
+);
+
+CREATE TABLE rewards (
+    id_reward INT PRIMARY KEY,
+    unlock_level INT NOT NULL,
+    wizard_title VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE user_rewards (
+    id_user VARCHAR(255) PRIMARY KEY,
+    id_reward INT NOT NULL,
+    FOREIGN KEY (id_user) REFERENCES users (id_user),
+    FOREIGN KEY (id_reward) REFERENCES rewards (id_reward)
+);
+
+CREATE TABLE missions (
+    id_mission INT AUTO_INCREMENT PRIMARY KEY,
+    original_description TEXT NOT NULL,
+    fantasy_description TEXT NULL,
+    creation_date DATE NOT NULL,
+    due_date DATE NOT NULL,
+    status ENUM('pending', 'in_progress', 'completed', 'cancelled', 'failed') NOT NULL DEFAULT 'pending',
+    id_user VARCHAR(255) NOT NULL,
+    FOREIGN KEY (id_user) REFERENCES users (id_user)
+);
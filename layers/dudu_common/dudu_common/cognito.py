@@ -0,0 +1,222 @@
+import os
+import hmac
+import json
+import base64
+import hashlib
+from collections import OrderedDict
+import pymysql
+from botocore.exceptions import ClientError, NoCredentialsError
+from .aws_clients import get_cognito_client
+from .db_connection import get_db_connection
+from .httpStatusCodeError import HttpStatusCodeError
+from .secrets_cache import get_secret_value
+
+USER_POOL_SECRET_NAME = "users_pool/client_secret2"
+
+# Cognito usernames kept in memory by the warm container, the username of a sub never changes
+USERNAME_CACHE_SIZE = int(os.environ.get('USERNAME_CACHE_SIZE', '1024'))
+
+# LRU of sub -> Cognito username, over the cognito_username column of users
+_usernames = OrderedDict()
+
+
+def get_secret(force_refresh=False):
+    """ This function returns the user pool secret (USER_POOL_ID, ID_CLIENT, SECRET_CLIENT)
+
+    Args:
+        force_refresh (bool): Skip the secrets cache
+
+    Returns:
+        dict: The user pool secret
+    """
+    try:
+        return get_secret_value(USER_POOL_SECRET_NAME, force_refresh)
+    except ClientError as e:
+        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
+    except NoCredentialsError as e:
+        raise HttpStatusCodeError(500, "Error getting secret -> AWS Credentials Error: " + str(e))
+
+
+def get_secret_hash(username, client_id, client_secret):
+    message = username + client_id
+    dig = hmac.new(client_secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
+    return base64.b64encode(dig).decode()
+
+
+def call_with_secret_hash(username, call):
+    """ This function makes a Cognito call with the secret hash of a user, retrying once with a refreshed secret
+    when Cognito rejects the hash
+
+    The client secret may have been rotated while the container kept the old one in the secrets cache. Only the
+    secret hash errors are retried, so a wrong password does not fetch the secret again.
+
+    Args:
+        username (str): The Cognito username the hash is computed for
+        call (function): Makes the Cognito call, receives the user pool secret and the secret hash
+
+    Returns:
+        The answer of the call
+    """
+    for force_refresh in (False, True):
+        secrets = get_secret(force_refresh)
+        secret_hash = get_secret_hash(username, secrets['ID_CLIENT'], secrets['SECRET_CLIENT'])
+        try:
+            return call(secrets, secret_hash)
+        except ClientError as e:
+            if force_refresh or not is_secret_hash_error(e):
+                raise
+
+
+def is_secret_hash_error(error):
+    """ This function tells whether Cognito rejected the secret hash of a call
+
+    Args:
+        error (ClientError): The error of the call
+
+    Returns:
+        bool: True if the error is a NotAuthorizedException about the secret hash
+    """
+    details = error.response.get('Error', {})
+    return details.get('Code') == 'NotAuthorizedException' and 'secret hash' in details.get('Message', '').lower()
+
+
+def get_token_claims(token):
+    """ This function reads the claims of a token returned by Cognito, without verifying its signature since it
+    comes straight from initiate_auth
+
+    Args:
+        token (str): The JWT
+
+    Returns:
+        dict: The claims, empty if the token cannot be read
+    """
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+    except (AttributeError, IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def get_username_from_sub(sub, user_pool_id):
+    """ This function returns the Cognito username of a user
+
+    The username is looked up in the in-memory LRU, then in the cognito_username column of users (id_user is the
+    sub) and only when neither has it with ListUsers, whose answer is stored back in the column.
+
+    Args:
+        sub (str): The sub of the user
+        user_pool_id (str): The user pool id
+
+    Returns:
+        str: The Cognito username
+    """
+    username = _usernames.get(sub)
+    if username is not None:
+        _usernames.move_to_end(sub)
+        return username
+
+    username = get_stored_username(sub)
+    if username is None:
+        username = list_username(sub, user_pool_id)
+        store_username(sub, username)
+
+    remember_username(sub, username)
+    return username
+
+
+def get_stored_username(sub):
+    """ This function reads the Cognito username stored for a user
+
+    Args:
+        sub (str): The sub of the user
+
+    Returns:
+        str: The Cognito username, None if it is not stored or cannot be read
+    """
+    try:
+        connection = get_db_connection()
+    except HttpStatusCodeError:
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT cognito_username FROM users WHERE id_user = %s", (sub,))
+            row = cursor.fetchone()
+    except pymysql.MySQLError:
+        # The column is best effort, ListUsers still knows the username
+        return None
+    finally:
+        connection.close()
+    return row[0] if row else None
+
+
+def store_username(sub, username):
+    """ This function stores the Cognito username of a user that did not have it yet
+
+    Args:
+        sub (str): The sub of the user
+        username (str): The Cognito username
+    """
+    try:
+        connection = get_db_connection()
+    except HttpStatusCodeError:
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE users SET cognito_username = %s WHERE id_user = %s AND cognito_username IS NULL",
+                           (username, sub))
+        connection.commit()
+    except pymysql.MySQLError:
+        connection.rollback()
+    finally:
+        connection.close()
+
+
+def list_username(sub, user_pool_id):
+    """ This function asks Cognito for the username of a sub with ListUsers
+
+    Args:
+        sub (str): The sub of the user
+        user_pool_id (str): The user pool id
+
+    Returns:
+        str: The Cognito username
+    """
+    client = get_cognito_client()
+
+    response = client.list_users(
+        UserPoolId=user_pool_id,
+        Filter=f'sub="{sub}"'
+    )
+
+    if response['Users']:
+        return response['Users'][0]['Username']
+    else:
+        raise Exception("User not found")
+
+
+def remember_username(sub, username):
+    """ This function keeps a username in the in-memory LRU, evicting the least recently used sub
+
+    Args:
+        sub (str): The sub of the user
+        username (str): The Cognito username
+    """
+    _usernames[sub] = username
+    _usernames.move_to_end(sub)
+    while len(_usernames) > USERNAME_CACHE_SIZE:
+        _usernames.popitem(last=False)
+
+
+def forget_username(sub=None):
+    """ This function drops a username (or every username) from the in-memory LRU
+
+    Args:
+        sub (str): The sub of the user, None to clear the whole cache
+    """
+    if sub is None:
+        _usernames.clear()
+    else:
+        _usernames.pop(sub, None)
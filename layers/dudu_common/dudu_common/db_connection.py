@@ -0,0 +1,172 @@
+import time
+import pymysql
+from botocore.exceptions import NoCredentialsError
+from pymysql.constants import ER, SERVER_STATUS
+from .httpStatusCodeError import HttpStatusCodeError
+from .instrumentation import InstrumentedCursor, measure
+from .secrets_cache import get_secret_value
+
+DB_HOST = 'projectdudu-dbinstance-zxd8h1euhjhe.c7gis6w4srg8.us-east-2.rds.amazonaws.com'
+DB_NAME = 'dududb'
+
+
+# Seconds a pooled connection can stay idle before it is pinged again on checkout
+PING_INTERVAL = 5
+
+# Connection kept alive for the whole life of the warm Lambda container
+_pool = {
+    'connection': None,
+    'last_used': 0.0
+}
+
+
+class PooledConnection:
+    """ Proxy over the container-wide connection returned by get_db_connection
+
+    Every attribute is delegated to the underlying pymysql connection except close(),
+    which hands the connection back to the container instead of dropping the socket,
+    so every helper of an invocation (and every warm invocation) reuses the same one.
+    Cursors, commits and rollbacks are timed for the summary line of the invocation.
+
+    Args:
+        connection (pymysql.connections.Connection): The pooled connection
+    """
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs))
+
+    def commit(self):
+        with measure('sql', 'COMMIT'):
+            self._connection.commit()
+
+    def rollback(self):
+        with measure('sql', 'ROLLBACK'):
+            self._connection.rollback()
+
+    def close(self):
+        release_db_connection(self._connection)
+
+
+def get_db_connection():
+    """ This function returns the connection of the warm container, opening a new one
+    only when there is none yet or the previous one is no longer alive
+
+    Returns:
+        PooledConnection: The pooled database connection
+    """
+    with measure('db_checkout'):
+        connection = _pool['connection']
+
+        if connection is not None and not is_connection_alive(connection):
+            discard_db_connection()
+            connection = None
+
+        if connection is None:
+            with measure('db_connect'):
+                connection = open_db_connection()
+            _pool['connection'] = connection
+            _pool['last_used'] = time.monotonic()
+
+    return PooledConnection(connection)
+
+
+def is_connection_alive(connection):
+    """ This function checks the connection liveness, pinging the server only when the
+    connection has been idle longer than PING_INTERVAL (RDS failover, wait_timeout)
+
+    Args:
+        connection (pymysql.connections.Connection): The pooled connection
+
+    Returns:
+        bool: True if the connection can be reused
+    """
+    if not connection.open:
+        return False
+
+    if time.monotonic() - _pool['last_used'] < PING_INTERVAL:
+        return True
+
+    try:
+        connection.ping(reconnect=False)
+    except pymysql.MySQLError:
+        return False
+    return True
+
+
+def release_db_connection(connection):
+    """ This function gives the connection back to the container, rolling back any
+    transaction left open so the next checkout does not read a stale snapshot
+
+    The server only flags a transaction once a statement ran after the last commit, so
+    invocations that commit (or run nothing) release without a round trip. Read-only
+    invocations do pay one ROLLBACK: with autocommit off their first SELECT opened a
+    REPEATABLE READ snapshot that the next warm invocation would otherwise keep reading.
+    It is timed as a sql call of the invocation and counted apart by the benchmarks.
+
+    Args:
+        connection (pymysql.connections.Connection): The pooled connection
+    """
+    if connection is not _pool['connection']:
+        return
+
+    try:
+        if connection.open and connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            with measure('sql', 'ROLLBACK'):
+                connection.rollback()
+    except pymysql.MySQLError:
+        discard_db_connection()
+        return
+
+    _pool['last_used'] = time.monotonic()
+
+
+def discard_db_connection():
+    """ This function closes the pooled connection so the next checkout opens a new one """
+    connection = _pool['connection']
+    _pool['connection'] = None
+
+    if connection is not None and connection.open:
+        try:
+            connection.close()
+        except pymysql.MySQLError:
+            pass
+
+
+def open_db_connection():
+    host = DB_HOST
+    db_name = DB_NAME
+
+    # The cached credentials may be stale after a rotation, so retry once with fresh ones
+    for force_refresh in (False, True):
+        secrets = get_secrets(force_refresh)
+        try:
+            return pymysql.connect(
+                host=host,
+                user=secrets['username'],
+                password=secrets['password'],
+                db=db_name
+            )
+        except pymysql.MySQLError as e:
+            if force_refresh or not e.args or e.args[0] != ER.ACCESS_DENIED_ERROR:
+                raise HttpStatusCodeError(500, "Error connecting to database")
+
+
+def get_secrets(force_refresh=False):
+    secret_name = "dudu/db/connection2"
+
+    try:
+        return get_secret_value(secret_name, force_refresh)
+    except NoCredentialsError:
+        raise HttpStatusCodeError(500, "Error getting secret")
@@ -0,0 +1,233 @@
+import os
+import random
+import hashlib
+import unicodedata
+from collections import OrderedDict
+import pymysql
+from .db_connection import get_db_connection
+from .openai_connection import get_openai_client
+
+# Fantasy descriptions kept per normalized description, so repeated tasks still vary a bit
+MAX_VARIANTS = int(os.environ.get('DESCRIPTION_CACHE_VARIANTS', '3'))
+
+# Normalized descriptions kept in memory by the warm container
+MEMORY_CACHE_SIZE = int(os.environ.get('DESCRIPTION_CACHE_SIZE', '512'))
+
+# LRU of description hash -> fantasy descriptions, over the fantasy_description_cache table
+_variants = OrderedDict()
+
+
+def get_fantasy_description(original_description):
+    """ This function returns a fantasy description for the original description, asking OpenAI only until
+    MAX_VARIANTS descriptions are cached for it
+
+    The cache is keyed on the normalized description, so "Alimentar a mi  perro" and "alimentar a mí perro"
+    share their variants, and a random variant is returned once the cache is full.
+
+    Args:
+        original_description (str): The original description of the mission
+
+    Returns:
+        str: The fantasy description
+    """
+    fantasy_description = get_cached_fantasy_description(original_description)
+    if fantasy_description is not None:
+        return fantasy_description
+
+    fantasy_description = get_openai_client(original_description)
+    store_fantasy_description(original_description, fantasy_description)
+    return fantasy_description
+
+
+def get_cached_fantasy_description(original_description):
+    """ This function returns a random cached variant once MAX_VARIANTS are cached for the description
+
+    Args:
+        original_description (str): The original description of the mission
+
+    Returns:
+        str: The fantasy description, or None if a new variant should be generated
+    """
+    variants = get_variants(hash_description(normalize_description(original_description)))
+    if len(variants) >= MAX_VARIANTS:
+        return random.choice(variants)
+    return None
+
+
+def get_cached_fantasy_descriptions(original_descriptions):
+    """ This function returns get_cached_fantasy_description of several descriptions, reading the variants that
+    are not in memory with a single query
+
+    Args:
+        original_descriptions (list): The original descriptions of the missions
+
+    Returns:
+        list: The fantasy description of every original description, None where a new variant should be generated
+    """
+    hashes = [hash_description(normalize_description(description)) for description in original_descriptions]
+    variants = get_variants_batch(hashes)
+    return [random.choice(variants[description_hash]) if len(variants[description_hash]) >= MAX_VARIANTS else None
+            for description_hash in hashes]
+
+
+def store_fantasy_description(original_description, fantasy_description):
+    """ This function adds a generated fantasy description to the variants of the original description
+
+    Args:
+        original_description (str): The original description of the mission
+        fantasy_description (str): The fantasy description generated by OpenAI
+    """
+    normalized_description = normalize_description(original_description)
+    store_variant(hash_description(normalized_description), normalized_description, fantasy_description)
+
+
+def normalize_description(description):
+    """ This function case-folds the description, strips its accents and collapses its whitespace
+
+    Args:
+        description (str): The description
+
+    Returns:
+        str: The normalized description
+    """
+    decomposed = unicodedata.normalize('NFKD', description)
+    without_accents = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(without_accents.casefold().split())
+
+
+def hash_description(normalized_description):
+    """ This function returns the cache key of a normalized description
+
+    Args:
+        normalized_description (str): The normalized description
+
+    Returns:
+        str: The SHA-256 hex digest of the description
+    """
+    return hashlib.sha256(normalized_description.encode('utf-8')).hexdigest()
+
+
+def get_variants(description_hash):
+    """ This function returns the cached fantasy descriptions of a description, reading the database only
+    when the in-memory LRU does not hold all of them yet
+
+    Args:
+        description_hash (str): The cache key
+
+    Returns:
+        list: The cached fantasy descriptions
+    """
+    variants = _variants.get(description_hash)
+    if variants is not None and len(variants) >= MAX_VARIANTS:
+        _variants.move_to_end(description_hash)
+        return variants
+
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("SELECT fantasy_description FROM fantasy_description_cache "
+                   "WHERE description_hash = %s "
+                   "ORDER BY id_variant "
+                   "LIMIT %s")
+            cursor.execute(sql, (description_hash, MAX_VARIANTS))
+            variants = [row[0] for row in cursor.fetchall()]
+    except pymysql.MySQLError:
+        # The cache is best effort, a failing lookup only costs an OpenAI call
+        return variants or []
+    finally:
+        connection.close()
+
+    remember_variants(description_hash, variants)
+    return variants
+
+
+def get_variants_batch(description_hashes):
+    """ This function returns get_variants of several descriptions with one round trip for all the descriptions
+    the in-memory LRU does not fully hold
+
+    Args:
+        description_hashes (list): The cache keys
+
+    Returns:
+        dict: Cache key -> cached fantasy descriptions
+    """
+    variants = {}
+    missing = []
+    for description_hash in dict.fromkeys(description_hashes):
+        cached = _variants.get(description_hash)
+        if cached is not None and len(cached) >= MAX_VARIANTS:
+            _variants.move_to_end(description_hash)
+            variants[description_hash] = cached
+        else:
+            variants[description_hash] = cached or []
+            missing.append(description_hash)
+
+    if len(missing) == 0:
+        return variants
+
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("SELECT description_hash, fantasy_description FROM fantasy_description_cache "
+                   "WHERE description_hash IN %s "
+                   "ORDER BY description_hash, id_variant")
+            cursor.execute(sql, (missing,))
+            rows = cursor.fetchall()
+    except pymysql.MySQLError:
+        # The cache is best effort, a failing lookup only costs an OpenAI call
+        return variants
+    finally:
+        connection.close()
+
+    loaded = {description_hash: [] for description_hash in missing}
+    for description_hash, fantasy_description in rows:
+        if len(loaded[description_hash]) < MAX_VARIANTS:
+            loaded[description_hash].append(fantasy_description)
+
+    for description_hash, description_variants in loaded.items():
+        remember_variants(description_hash, description_variants)
+        variants[description_hash] = description_variants
+    return variants
+
+
+def store_variant(description_hash, normalized_description, fantasy_description):
+    """ This function adds a fantasy description to the cache of a description
+
+    Args:
+        description_hash (str): The cache key
+        normalized_description (str): The normalized description
+        fantasy_description (str): The fantasy description generated by OpenAI
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("INSERT INTO fantasy_description_cache "
+                   "(description_hash, normalized_description, fantasy_description) "
+                   "VALUES (%s, %s, %s)")
+            cursor.execute(sql, (description_hash, normalized_description, fantasy_description))
+        connection.commit()
+    except pymysql.MySQLError:
+        # The description was generated anyway, it just will not be reused
+        return
+    finally:
+        connection.close()
+
+    remember_variants(description_hash, _variants.get(description_hash, []) + [fantasy_description])
+
+
+def remember_variants(description_hash, variants):
+    """ This function keeps the variants in the in-memory LRU, evicting the least recently used description
+
+    Args:
+        description_hash (str): The cache key
+        variants (list): The cached fantasy descriptions
+    """
+    _variants[description_hash] = variants
+    _variants.move_to_end(description_hash)
+    while len(_variants) > MEMORY_CACHE_SIZE:
+        _variants.popitem(last=False)
+
+
+def clear_description_cache():
+    """ This function empties the in-memory LRU """
+    _variants.clear()
@@ -0,0 +1,245 @@
+import os
+import json
+import hashlib
+from functools import wraps
+import pymysql
+from pymysql.constants import ER
+from .db_connection import get_db_connection
+from .httpStatusCodeError import HttpStatusCodeError
+from .responses import build_response
+
+# Header the clients send with a unique key per logical request, looked up case-insensitively
+IDEMPOTENCY_HEADER = 'idempotency-key'
+
+# Longest key accepted, clients usually send a UUID
+MAX_KEY_LENGTH = 255
+
+# Seconds a stored response is replayed for
+TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL', '86400'))
+
+# Seconds after which a request still in progress is considered dead (above the Lambda timeout)
+IN_PROGRESS_TIMEOUT = int(os.environ.get('IDEMPOTENCY_IN_PROGRESS_TIMEOUT', '150'))
+
+# Header added to the responses that are replayed from the idempotency_keys table
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def idempotent(scope, headers):
+    """ This decorator makes a lambda_handler idempotent for the requests that carry an Idempotency-Key header
+
+    The first request with a key claims it and its response is stored for TTL_SECONDS. Retries with the same key
+    and body get the stored response back without running the handler again, retries that arrive while the first
+    request is still running get a 409 and a key reused with a different body gets a 422. Server errors are not
+    stored, so the retry of a failed request runs again. Requests without the header run as usual. Keys are scoped
+    by endpoint and by caller, so two users sending the same key never see each other's responses.
+
+    Args:
+        scope (str): The name of the endpoint, so the same key can be used on different endpoints
+        headers (dict): The CORS headers of the conflict responses
+
+    Returns:
+        function: The decorator
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(event, context):
+            idempotency_key = get_idempotency_key(event)
+            if idempotency_key is None:
+                return handler(event, context)
+
+            if len(idempotency_key) == 0 or len(idempotency_key) > MAX_KEY_LENGTH:
+                return build_response(400, {"message": f"Idempotency-Key must have between 1 and {MAX_KEY_LENGTH} "
+                                                       "characters"}, headers)
+
+            key_hash = hash_value(f"{scope}:{get_caller_id(event)}:{idempotency_key}")
+            request_hash = hash_value(event.get('body') or '')
+
+            try:
+                stored = claim_key(key_hash, request_hash)
+            except HttpStatusCodeError as e:
+                return build_response(e.status_code, {"message": e.message}, headers)
+
+            if stored is not None:
+                return replay_response(stored, request_hash, headers)
+
+            response = handler(event, context)
+            store_response(key_hash, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_idempotency_key(event):
+    """ This function returns the Idempotency-Key header of the request
+
+    Args:
+        event (dict): The API Gateway event
+
+    Returns:
+        str: The key, None if the request has no Idempotency-Key header
+    """
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == IDEMPOTENCY_HEADER:
+            return value.strip() if isinstance(value, str) else None
+    return None
+
+
+def get_caller_id(event):
+    """ This function returns the user the request belongs to: the sub of the Cognito authorizer, or the id_user
+    of the body on the routes without authorizer
+
+    Args:
+        event (dict): The API Gateway event
+
+    Returns:
+        str: The caller id, empty if the request does not name one
+    """
+    claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+    if claims.get('sub'):
+        return str(claims['sub'])
+
+    try:
+        body = json.loads(event.get('body') or '{}')
+    except (TypeError, ValueError):
+        return ''
+    if isinstance(body, dict) and body.get('id_user') is not None:
+        return str(body['id_user'])
+    return ''
+
+
+def hash_value(value):
+    """ This function returns the SHA-256 digest stored in the idempotency_keys table
+
+    Args:
+        value (str): The scoped key or the request body
+
+    Returns:
+        bytes: The 32 byte digest
+    """
+    return hashlib.sha256(value.encode('utf-8')).digest()
+
+
+def claim_key(key_hash, request_hash):
+    """ This function claims a key for the current request
+
+    The key is inserted first, so two first requests with the same key never wait on each other's gap lock: one
+    inserts it and the other finds it in progress. A key that already existed is locked and (re)claimed if it expired
+    or its request died in progress, otherwise the stored row is returned without claiming it.
+
+    Args:
+        key_hash (bytes): The digest of the scoped key
+        request_hash (bytes): The digest of the request body
+
+    Returns:
+        tuple: The request_hash, status and response of the stored row, None if the key was claimed
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            inserted = cursor.execute("INSERT IGNORE INTO idempotency_keys "
+                                      "(key_hash, request_hash, locked_at, expires_at) "
+                                      "VALUES (%s, %s, NOW(), NOW() + INTERVAL %s SECOND)",
+                                      (key_hash, request_hash, TTL_SECONDS))
+            if not inserted:
+                cursor.execute("SELECT request_hash, status, response, "
+                               "expires_at < NOW() OR "
+                               "(status = 'in_progress' AND locked_at < NOW() - INTERVAL %s SECOND) "
+                               "FROM idempotency_keys WHERE key_hash = %s FOR UPDATE",
+                               (IN_PROGRESS_TIMEOUT, key_hash))
+                row = cursor.fetchone()
+
+                if row is None:
+                    # The request that held the key failed and released it in between, let the client retry
+                    connection.rollback()
+                    return request_hash, 'in_progress', None
+                if not row[3]:
+                    connection.rollback()
+                    return row[:3]
+                cursor.execute("UPDATE idempotency_keys "
+                               "SET request_hash = %s, status = 'in_progress', response = NULL, locked_at = NOW(), "
+                               "expires_at = NOW() + INTERVAL %s SECOND "
+                               "WHERE key_hash = %s",
+                               (request_hash, TTL_SECONDS, key_hash))
+        connection.commit()
+    except pymysql.OperationalError as e:
+        connection.rollback()
+        if e.args and e.args[0] in (ER.LOCK_DEADLOCK, ER.LOCK_WAIT_TIMEOUT):
+            # A concurrent retry holds the key
+            return request_hash, 'in_progress', None
+        raise HttpStatusCodeError(500, "Error checking Idempotency-Key")
+    except pymysql.MySQLError:
+        connection.rollback()
+        raise HttpStatusCodeError(500, "Error checking Idempotency-Key")
+    finally:
+        connection.close()
+    return None
+
+
+def replay_response(stored, request_hash, headers):
+    """ This function answers a retry with the stored response, or with the conflict that prevents replaying it
+
+    Args:
+        stored (tuple): The request_hash, status and response of the stored row
+        request_hash (bytes): The digest of the request body of the retry
+        headers (dict): The CORS headers of the conflict responses
+
+    Returns:
+        dict: The response
+    """
+    stored_request_hash, status, response = stored
+
+    if bytes(stored_request_hash) != request_hash:
+        return build_response(422, {"message": "Idempotency-Key was already used with a different request"}, headers)
+
+    if status != 'completed':
+        return build_response(409, {"message": "A request with this Idempotency-Key is still in progress"}, headers)
+
+    response = json.loads(response)
+    response['headers'] = dict(response.get('headers') or {}, **{REPLAYED_HEADER: 'true'})
+    return response
+
+
+def store_response(key_hash, response):
+    """ This function stores the response of a claimed key, or releases the key when the request failed on the
+    server so that its retry runs again
+
+    Args:
+        key_hash (bytes): The digest of the scoped key
+        response (dict): The response of the handler
+    """
+    try:
+        connection = get_db_connection()
+    except HttpStatusCodeError:
+        # The request already ran, a retry will only get a 409 until IN_PROGRESS_TIMEOUT
+        return
+
+    try:
+        with connection.cursor() as cursor:
+            if response.get('statusCode', 500) >= 500:
+                cursor.execute("DELETE FROM idempotency_keys WHERE key_hash = %s", (key_hash,))
+            else:
+                cursor.execute("UPDATE idempotency_keys "
+                               "SET status = 'completed', response = %s, expires_at = NOW() + INTERVAL %s SECOND "
+                               "WHERE key_hash = %s",
+                               (json.dumps(response), TTL_SECONDS, key_hash))
+        connection.commit()
+    except pymysql.MySQLError:
+        # The request already ran, a retry will only get a 409 until IN_PROGRESS_TIMEOUT
+        connection.rollback()
+    finally:
+        connection.close()
+
+
+def purge_expired_keys(cursor, batch_size):
+    """ This function deletes one chunk of expired keys
+
+    Args:
+        cursor (Cursor): The cursor to delete the keys with
+        batch_size (int): The maximum number of keys deleted
+
+    Returns:
+        int: The number of keys deleted
+    """
+    return cursor.execute("DELETE FROM idempotency_keys WHERE expires_at < NOW() LIMIT %s", (batch_size,))
@@ -0,0 +1,211 @@
+import os
+import json
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# Set METRICS_ENABLED=0 to stop emitting the summary line of every invocation
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+
+# CloudWatch namespace of the metrics extracted from the summary lines (Embedded Metric Format)
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'Dudu')
+
+# Statements slower than this many milliseconds are logged on their own line, 0 disables the slow query log
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))
+
+# Calls kept with their timing in the summary line, the counters keep counting past it
+MAX_RECORDED_CALLS = 50
+
+# Longest SQL written to the summary and the slow query log
+MAX_SQL_LENGTH = 300
+
+# Round trips measured on every invocation: SQL statements, pooled connection checkouts, new database connections
+# and calls to Secrets Manager, Cognito and OpenAI
+KINDS = ('sql', 'db_checkout', 'db_connect', 'secretsmanager', 'cognito', 'openai')
+
+# Invocation being measured, a context variable so background threads (secret refreshes) are not counted
+_invocation = ContextVar('invocation', default=None)
+
+
+def instrumented(function_name):
+    """ This decorator measures every invocation of a lambda_handler and prints one JSON summary line with the
+    number and the time of its SQL statements, database connections and AWS and OpenAI calls
+
+    The line follows the CloudWatch Embedded Metric Format, so the counters become metrics of the function without
+    any PutMetricData call.
+
+    Args:
+        function_name (str): The name of the function, the dimension of the metrics
+
+    Returns:
+        function: The decorator
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(event, context):
+            if not METRICS_ENABLED:
+                return handler(event, context)
+
+            invocation = new_invocation(function_name, getattr(context, 'aws_request_id', None))
+            token = _invocation.set(invocation)
+            response = None
+            try:
+                response = handler(event, context)
+                return response
+            finally:
+                _invocation.reset(token)
+                invocation['duration_ms'] = (time.perf_counter() - invocation['started']) * 1000
+                if isinstance(response, dict):
+                    invocation['status_code'] = response.get('statusCode')
+                print(json.dumps(build_summary(invocation), default=str))
+
+        return wrapper
+
+    return decorator
+
+
+def new_invocation(function_name, request_id=None):
+    invocation = {
+        'function': function_name,
+        'request_id': request_id,
+        'started': time.perf_counter(),
+        'status_code': None,
+        'calls': []
+    }
+    for kind in KINDS:
+        invocation[f'{kind}_count'] = 0
+        invocation[f'{kind}_ms'] = 0.0
+    return invocation
+
+
+def record(kind, elapsed, detail=None):
+    """ This function adds a call to the invocation being measured, if any
+
+    Args:
+        kind (str): One of KINDS
+        elapsed (float): Seconds the call took
+        detail (str): The SQL statement or the operation name
+    """
+    invocation = _invocation.get()
+    elapsed_ms = elapsed * 1000
+
+    if kind == 'sql' and SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+        print(json.dumps({
+            'slow_query': (detail or '')[:MAX_SQL_LENGTH],
+            'ms': round(elapsed_ms, 2),
+            'function': invocation['function'] if invocation else None
+        }))
+
+    if invocation is None:
+        return
+
+    invocation[f'{kind}_count'] += 1
+    invocation[f'{kind}_ms'] += elapsed_ms
+    if len(invocation['calls']) < MAX_RECORDED_CALLS:
+        invocation['calls'].append([kind, (detail or '')[:MAX_SQL_LENGTH], round(elapsed_ms, 2)])
+
+
+@contextmanager
+def measure(kind, detail=None):
+    """ This context manager records the time of the block as a call of the invocation being measured
+
+    Args:
+        kind (str): One of KINDS
+        detail (str): The SQL statement or the operation name
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, time.perf_counter() - started, detail)
+
+
+def build_summary(invocation):
+    """ This function builds the Embedded Metric Format line of an invocation
+
+    Args:
+        invocation (dict): The measured invocation
+
+    Returns:
+        dict: The summary, its counters and times are also the metrics of the function
+    """
+    metrics = [{'Name': 'duration_ms', 'Unit': 'Milliseconds'}]
+    summary = {
+        'function': invocation['function'],
+        'request_id': invocation['request_id'],
+        'status_code': invocation['status_code'],
+        'duration_ms': round(invocation['duration_ms'], 2)
+    }
+
+    for kind in KINDS:
+        metrics.append({'Name': f'{kind}_count', 'Unit': 'Count'})
+        metrics.append({'Name': f'{kind}_ms', 'Unit': 'Milliseconds'})
+        summary[f'{kind}_count'] = invocation[f'{kind}_count']
+        summary[f'{kind}_ms'] = round(invocation[f'{kind}_ms'], 2)
+
+    summary['calls'] = invocation['calls']
+    summary['_aws'] = {
+        'Timestamp': int(time.time() * 1000),
+        'CloudWatchMetrics': [{
+            'Namespace': METRICS_NAMESPACE,
+            'Dimensions': [['function']],
+            'Metrics': metrics
+        }]
+    }
+    return summary
+
+
+class InstrumentedCursor:
+    """ Proxy over a pymysql cursor that records the time of every statement it runs
+
+    Args:
+        cursor (pymysql.cursors.Cursor): The cursor
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._cursor.close()
+
+    def execute(self, query, args=None):
+        with measure('sql', query):
+            return self._cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        with measure('sql', query):
+            return self._cursor.executemany(query, args)
+
+
+def instrument_client(client, kind):
+    """ This function records the time of every API call of a boto3 client, through the botocore event hooks
+
+    Args:
+        client (botocore.client.BaseClient): The client
+        kind (str): One of KINDS
+    """
+    events = getattr(getattr(client, 'meta', None), 'events', None)
+    if events is None:
+        return
+
+    def before_call(context, **_):
+        context['instrumentation_started'] = time.perf_counter()
+
+    def after_call(context, model, **_):
+        started = context.pop('instrumentation_started', None)
+        if started is not None:
+            record(kind, time.perf_counter() - started, model.name)
+
+    # before-parameter-build is emitted to every handler, unlike before-call which stops at the first response
+    events.register_first('before-parameter-build', before_call)
+    events.register('after-call', after_call)
@@ -0,0 +1,54 @@
+from collections import Counter
+
+# Column of user_mission_stats that counts the missions of every status
+STATUS_COLUMNS = {
+    'pending': 'pending_missions',
+    'in_progress': 'in_progress_missions',
+    'completed': 'completed_missions',
+    'failed': 'failed_missions',
+    'cancelled': 'cancelled_missions'
+}
+
+
+def status_deltas(transitions):
+    """ This function turns mission status changes into the change of every counter
+
+    Args:
+        transitions (iterable): (old_status, new_status) pairs, old_status is None for new missions
+
+    Returns:
+        Counter: The change of the count of every status
+    """
+    deltas = Counter()
+    for old_status, new_status in transitions:
+        if old_status == new_status:
+            continue
+        if old_status is not None:
+            deltas[old_status] -= 1
+        deltas[new_status] += 1
+    return deltas
+
+
+def update_mission_stats(cursor, deltas_by_user):
+    """ This function applies the counter changes of several users with a single multi-row upsert, so it has to
+    run in the transaction that changes the missions
+
+    Args:
+        cursor (Cursor): The cursor of the transaction that changes the missions
+        deltas_by_user (dict): The status_deltas of every user id
+
+    Returns:
+        int: The number of users whose counters changed
+    """
+    rows = [(id_user,) + tuple(deltas.get(status, 0) for status in STATUS_COLUMNS)
+            for id_user, deltas in deltas_by_user.items()
+            if any(deltas.get(status, 0) for status in STATUS_COLUMNS)]
+    if not rows:
+        return 0
+
+    columns = list(STATUS_COLUMNS.values())
+    sql = ("INSERT INTO user_mission_stats (id_user, " + ", ".join(columns) + ") "
+           "VALUES (" + ", ".join(["%s"] * (len(columns) + 1)) + ") "
+           "ON DUPLICATE KEY UPDATE " + ", ".join(f"{column} = {column} + VALUES({column})" for column in columns))
+    cursor.executemany(sql, rows)
+    return len(rows)
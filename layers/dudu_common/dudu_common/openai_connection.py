@@ -0,0 +1,122 @@
+import re
+import json
+from botocore.exceptions import ClientError, NoCredentialsError
+from .httpStatusCodeError import HttpStatusCodeError
+from .instrumentation import measure
+from .secrets_cache import get_secret_value
+
+# Markdown code fence the model sometimes wraps its JSON answer in
+CODE_FENCE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*```\s*$', re.DOTALL)
+
+# instructions and examples shared by the single and the batch prompts
+PROMPT = ("Hola, ayudame a convertir unas frases en otras pero en forma epica, Te dare unos ejemplos de lo que "
+          "quiero que hagas. Ejemplo 1 - Original: revizar los apuntes a mi compa - Convertida: Descifrar los "
+          "antiguos jeroglíficos de un grimorio de otro mago ancestral; Ejemplo 2 - Original: jugar Fornite "
+          "con amigos - Convertida: Reunirte con el gremio de magos para emprender una aventura a tierras "
+          "peligrosas en busca de fama y gloria; Ejemplo 3 - Original: Buscar trabajo - Convertida: Emprender "
+          "un viaje hacia nuevos horizontes en busca de aventura y recompenzas; Ejemplo 4 - Original : buscar "
+          "un video de youtube para ver en el almuerzo - Convertida: Decidir quien sera el bufon del a corte "
+          "que te atendera durante el festin real; Ejemplo 5 - Original: alimentar a mi perro - Convertida: "
+          "alimentar a la vestia guardiana del palacio real. Como puedes ver es transformar pendientes en "
+          "misiones epicas principalmente relacionadas con Magos, magia y fantasia. ")
+
+
+# function to get openai client
+def get_openai_client(original_description):
+    secret = get_secret()
+
+    try:
+        # generate prompt
+        prompt = (PROMPT + "Solo quiero que me devuelvas la frase, no que me digas que entendiste u otra cosa, solo "
+                  "la frase convertida... Esta es la oracion que quiero que conviertas ahora: ") + original_description
+
+        return request_completion(prompt, secret)
+    except ClientError:
+        raise HttpStatusCodeError(500, "Error getting openai client")
+    except Exception:
+        raise HttpStatusCodeError(500, "Error getting openai client")
+
+
+# function to get the fantasy descriptions of several missions with a single request
+def get_openai_batch(original_descriptions):
+    secret = get_secret()
+
+    try:
+        # generate prompt with the descriptions as a JSON object keyed by their position
+        prompt = (PROMPT + "Ahora te dare un objeto JSON de oraciones numeradas. Solo quiero que me devuelvas un "
+                  "objeto JSON con las mismas llaves y la frase convertida de cada una, sin nada mas: ") + json.dumps(
+            {str(index): description for index, description in enumerate(original_descriptions)},
+            ensure_ascii=False)
+
+        content = request_completion(prompt, secret)
+    except Exception:
+        raise HttpStatusCodeError(500, "Error getting openai client")
+
+    return parse_batch_response(content, len(original_descriptions))
+
+
+# function to read the JSON object of a batch response, None marks the descriptions that were not converted
+def parse_batch_response(content, size):
+    # A reply whose keys do not match the prompt cannot be paired safely, so the whole batch is discarded
+    if not isinstance(content, str):
+        return [None] * size
+
+    fence = CODE_FENCE.match(content)
+    try:
+        converted = json.loads(fence.group(1) if fence else content)
+    except ValueError:
+        return [None] * size
+
+    if not isinstance(converted, dict) or set(converted) != {str(index) for index in range(size)}:
+        return [None] * size
+
+    descriptions = [converted[str(index)] for index in range(size)]
+    return [description.strip() if isinstance(description, str) and description.strip() else None
+            for description in descriptions]
+
+
+# function to send a prompt with the cached key, retrying once with a fresh one
+def request_completion(prompt, secret):
+    # openai pulls in httpx and pydantic, so it is imported on the first completion instead of on every cold start
+    from openai import AuthenticationError
+
+    try:
+        return create_completion(prompt, secret['OPENAI_KEY'])
+    except AuthenticationError:
+        # The cached key may be stale after a rotation, so retry once with a fresh one
+        secret = get_secret(force_refresh=True)
+        return create_completion(prompt, secret['OPENAI_KEY'])
+
+
+# function to request the fantasy description to openai
+def create_completion(prompt, api_key):
+    from openai import OpenAI
+
+    # create openai client with secret
+    client = OpenAI(
+        api_key=api_key
+    )
+
+    # post request to openai
+    with measure('openai', 'chat.completions.create'):
+        response = client.chat.completions.create(
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            model="gpt-3.5-turbo"
+        )
+
+    return response.choices[0].message.content
+
+
+# function to get secret from secrets manager
+def get_secret(force_refresh=False):
+    secret_name = "secret/openai/key2"
+
+    try:
+        return get_secret_value(secret_name, force_refresh)
+    except NoCredentialsError:
+        raise HttpStatusCodeError(500, "Error getting secret")
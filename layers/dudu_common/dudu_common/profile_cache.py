@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Seconds a profile is served from memory, 0 disables the cache. The writes of the user run in other functions and
+# cannot reach this container, so a cached profile (and the 304 answered from it) can be this many seconds stale
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', '0'))
+
+# Profiles kept in memory by the warm container
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', '1024'))
+
+# LRU of id_user -> profile, ETag and expiration time
+_profiles = OrderedDict()
+_lock = threading.Lock()
+
+
+def get_cached_profile(id_user):
+    """ This function returns the cached profile of a user while it has not expired
+
+    Args:
+        id_user (str): The user id
+
+    Returns:
+        tuple: The profile and its ETag, None if the profile is not cached
+    """
+    with _lock:
+        entry = _profiles.get(id_user)
+        if entry is None:
+            return None
+
+        if time.monotonic() >= entry['expires_at']:
+            del _profiles[id_user]
+            return None
+
+        _profiles.move_to_end(id_user)
+        return entry['profile'], entry['etag']
+
+
+def cache_profile(id_user, profile):
+    """ This function caches the profile of a user for PROFILE_CACHE_TTL seconds, evicting the least recently used
+    profile. Nothing is cached while the cache is disabled
+
+    Args:
+        id_user (str): The user id
+        profile (dict): The profile
+
+    Returns:
+        str: The ETag of the profile
+    """
+    etag = compute_etag(profile)
+    if PROFILE_CACHE_TTL <= 0:
+        return etag
+
+    with _lock:
+        _profiles[id_user] = {
+            'profile': profile,
+            'etag': etag,
+            'expires_at': time.monotonic() + PROFILE_CACHE_TTL
+        }
+        _profiles.move_to_end(id_user)
+        while len(_profiles) > PROFILE_CACHE_SIZE:
+            _profiles.popitem(last=False)
+
+    return etag
+
+
+def compute_etag(profile):
+    """ This function returns a strong ETag of the profile, the same profile always gets the same ETag
+
+    Args:
+        profile (dict): The profile
+
+    Returns:
+        str: The quoted ETag
+    """
+    content = json.dumps(profile, sort_keys=True, default=str)
+    return '"' + hashlib.sha256(content.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def clear_profile_cache():
+    """ This function empties the profile cache """
+    with _lock:
+        _profiles.clear()
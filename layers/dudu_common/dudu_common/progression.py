@@ -0,0 +1,131 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+# Highest level a user can reach
+MAX_LEVEL = 50
+
+# XP added to the limit of the next level on every level up
+XP_LIMIT_STEP = 10
+
+# A new reward is unlocked every REWARD_LEVEL_INTERVAL levels
+REWARD_LEVEL_INTERVAL = 5
+
+# Last reward of the seeded rewards table, used when the table cannot be read
+MAX_REWARD_ID = 11
+
+# Reward given to every new user
+BASIC_REWARD_ID = 1
+
+# Rewards table loaded once per warm container, it only changes with a deployment
+_rewards = {
+    'titles': None,
+    'rewards': None
+}
+
+Progress = namedtuple('Progress', ['level', 'current_xp', 'xp_limit', 'id_reward', 'levels_gained'])
+
+Reward = namedtuple('Reward', ['id_reward', 'unlock_level', 'wizard_title'])
+
+
+def get_reward_titles(cursor):
+    """ This function returns the wizard title of every reward, reading the rewards table only on the first call
+    of the container
+
+    Args:
+        cursor (Cursor): The cursor to read the rewards table with
+
+    Returns:
+        MappingProxyType: A read-only mapping of id_reward to wizard_title
+    """
+    if _rewards['titles'] is None:
+        cursor.execute("SELECT id_reward, wizard_title FROM rewards ORDER BY id_reward")
+        titles = {row[0]: row[1] for row in cursor.fetchall()}
+        # An empty table is not cached so a failed load is retried on the next call
+        if not titles:
+            return MappingProxyType(titles)
+        _rewards['titles'] = MappingProxyType(titles)
+    return _rewards['titles']
+
+
+def get_rewards(cursor):
+    """ This function returns every reward ordered by unlock level, reading the rewards table only on the first
+    call of the container
+
+    Args:
+        cursor (Cursor): The cursor to read the rewards table with
+
+    Returns:
+        tuple: The rewards as Reward tuples
+    """
+    if _rewards['rewards'] is None:
+        cursor.execute("SELECT id_reward, unlock_level, wizard_title FROM rewards ORDER BY unlock_level, id_reward")
+        rewards = tuple(Reward(*row) for row in cursor.fetchall())
+        # An empty table is not cached so a failed load is retried on the next call
+        if not rewards:
+            return rewards
+        _rewards['rewards'] = rewards
+    return _rewards['rewards']
+
+
+def resolve_reward(rewards, level, id_reward=None):
+    """ This function returns the current reward of a user
+
+    The reward stored in user_rewards wins, a user without one gets the highest reward unlocked by its level.
+
+    Args:
+        rewards (tuple): The rewards ordered by unlock level, from get_rewards
+        level (int): The level of the user
+        id_reward (int): The reward of the user in user_rewards, None if the user has no reward
+
+    Returns:
+        Reward: The current reward, None if the user has not unlocked any
+    """
+    if id_reward is not None:
+        reward = next((reward for reward in rewards if reward.id_reward == id_reward), None)
+        if reward is not None:
+            return reward
+
+    return next((reward for reward in reversed(rewards) if reward.unlock_level <= level), None)
+
+
+def clear_reward_titles():
+    """ This function drops the cached rewards table """
+    _rewards['titles'] = None
+    _rewards['rewards'] = None
+
+
+def apply_xp(level, current_xp, xp_limit, id_reward, xp, max_reward_id):
+    """ This function adds XP to a user and applies every level up it causes
+
+    Each level up carries the XP left over to the next level, whose limit is XP_LIMIT_STEP higher, and every
+    REWARD_LEVEL_INTERVAL levels the reward moves to the next one up to max_reward_id. At MAX_LEVEL the XP stays
+    at the limit.
+
+    Args:
+        level (int): The current level of the user
+        current_xp (int): The current XP of the user
+        xp_limit (int): The XP needed to reach the next level
+        id_reward (int): The current reward of the user, None if the user has no reward
+        xp (int): The XP earned
+        max_reward_id (int): The id of the last reward
+
+    Returns:
+        Progress: The new level, current_xp, xp_limit and id_reward, and the number of levels gained
+    """
+    current_xp += xp
+    levels_gained = 0
+
+    while current_xp >= xp_limit:
+        if level >= MAX_LEVEL:
+            current_xp = xp_limit
+            break
+
+        current_xp -= xp_limit
+        xp_limit += XP_LIMIT_STEP
+        level += 1
+        levels_gained += 1
+
+        if level % REWARD_LEVEL_INTERVAL == 0 and id_reward is not None:
+            id_reward = min(id_reward + 1, max_reward_id)
+
+    return Progress(level, current_xp, xp_limit, id_reward, levels_gained)
@@ -0,0 +1,36 @@
+import json
+
+
+def get_cors_headers(methods='OPTIONS,POST', allow_headers='*'):
+    """ This function builds the CORS headers returned by every endpoint
+
+    Args:
+        methods (str): The value of Access-Control-Allow-Methods
+        allow_headers (str): The value of Access-Control-Allow-Headers
+
+    Returns:
+        dict: The CORS headers
+    """
+    return {
+        'Access-Control-Allow-Headers': allow_headers,
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': methods
+    }
+
+
+def build_response(status_code, body, headers):
+    """ This function builds an API Gateway proxy response with a JSON body
+
+    Args:
+        status_code (int): The HTTP status code
+        body (object): The body, dates and decimals coming from the database are serialized as strings
+        headers (dict): The response headers, usually from get_cors_headers
+
+    Returns:
+        dict: A dictionary that contains the status code, the headers and the body
+    """
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': json.dumps(body, default=str)
+    }
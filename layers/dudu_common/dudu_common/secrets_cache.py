@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import threading
+from .aws_clients import get_client
+
+# Seconds a secret is served from memory before it has to be fetched again
+SECRETS_TTL = int(os.environ.get('SECRETS_CACHE_TTL', '300'))
+
+# Fraction of the TTL after which the secret is refreshed in the background
+REFRESH_AHEAD = 0.8
+
+# Secrets cached for the whole life of the warm Lambda container
+_cache = {}
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def get_secret_value(secret_name, force_refresh=False):
+    """ This function returns a secret from the container cache, fetching it from
+    Secrets Manager only when it is missing, expired or a refresh is forced
+
+    Once the secret reaches REFRESH_AHEAD of its TTL the cached value is still returned,
+    but a background refresh is started so no request waits on Secrets Manager.
+
+    Args:
+        secret_name (str): The name of the secret in Secrets Manager
+        force_refresh (bool): Skip the cache, e.g. after an authentication failure
+
+    Returns:
+        dict: The secret
+    """
+    entry = _cache.get(secret_name)
+    now = time.monotonic()
+
+    if force_refresh or entry is None or now >= entry['expires_at']:
+        return refresh_secret(secret_name)
+
+    if now >= entry['refresh_at']:
+        refresh_secret_in_background(secret_name)
+
+    return entry['value']
+
+
+def refresh_secret(secret_name):
+    """ This function fetches a secret and stores it in the cache
+
+    Args:
+        secret_name (str): The name of the secret in Secrets Manager
+
+    Returns:
+        dict: The secret
+    """
+    value = fetch_secret(secret_name)
+    now = time.monotonic()
+
+    with _lock:
+        _cache[secret_name] = {
+            'value': value,
+            'refresh_at': now + SECRETS_TTL * REFRESH_AHEAD,
+            'expires_at': now + SECRETS_TTL
+        }
+
+    return value
+
+
+def refresh_secret_in_background(secret_name):
+    """ This function refreshes a secret in a daemon thread, keeping the cached value
+    until it expires if the refresh fails
+
+    Args:
+        secret_name (str): The name of the secret in Secrets Manager
+    """
+    with _lock:
+        if secret_name in _refreshing:
+            return
+        _refreshing.add(secret_name)
+
+    def refresh():
+        try:
+            refresh_secret(secret_name)
+        except Exception as e:
+            print(f"Background refresh of secret {secret_name} failed: {str(e)}")
+        finally:
+            with _lock:
+                _refreshing.discard(secret_name)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def invalidate_secret(secret_name=None):
+    """ This function drops a secret (or every secret) from the cache
+
+    Args:
+        secret_name (str): The name of the secret, None to clear the whole cache
+    """
+    with _lock:
+        if secret_name is None:
+            _cache.clear()
+        else:
+            _cache.pop(secret_name, None)
+
+
+def fetch_secret(secret_name):
+    """ This function fetches a secret from Secrets Manager with the client shared by the container, its calls are
+    timed by the instrumentation of the client
+
+    Args:
+        secret_name (str): The name of the secret in Secrets Manager
+
+    Returns:
+        dict: The secret
+    """
+    get_secret_value_response = get_client('secretsmanager').get_secret_value(
+        SecretId=secret_name
+    )
+
+    secret = get_secret_value_response['SecretString']
+    return json.loads(secret)
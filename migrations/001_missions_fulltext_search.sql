@@ -0,0 +1,8 @@
+-- Índice FULLTEXT para la búsqueda de misiones (search_mission).
+-- Permite buscar en ambas descripciones sin el LIKE '%...%' que recorre todas las misiones del usuario.
+ALTER TABLE missions
+    ADD FULLTEXT INDEX ft_missions_descriptions (original_description, fantasy_description);
+
+-- Índice para filtrar por usuario y estado, usado también por el fallback con LIKE.
+ALTER TABLE missions
+    ADD INDEX idx_missions_user_status (id_user, status);
@@ -0,0 +1,5 @@
+-- Índices para la paginación con cursor de search_mission.
+-- El orden (columna, id_mission) dentro de cada usuario y estado se lee directo del índice, sin OFFSET.
+ALTER TABLE missions
+    ADD INDEX idx_missions_user_status_due (id_user, status, due_date, id_mission),
+    ADD INDEX idx_missions_user_status_creation (id_user, status, creation_date, id_mission);
@@ -0,0 +1,11 @@
+-- Caché de descripciones fantásticas generadas por OpenAI (insert_mission).
+-- La llave es el SHA-256 de la descripción original normalizada (minúsculas, sin acentos ni espacios repetidos)
+-- y cada descripción guarda varias variantes para que las tareas repetidas no siempre reciban la misma misión.
+CREATE TABLE fantasy_description_cache (
+    id_variant INT AUTO_INCREMENT PRIMARY KEY,
+    description_hash CHAR(64) NOT NULL,
+    normalized_description TEXT NOT NULL,
+    fantasy_description TEXT NOT NULL,
+    creation_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_fantasy_description_cache_hash (description_hash)
+);
@@ -0,0 +1,7 @@
+-- Cola de descripciones fantásticas pendientes (insert_mission con async_description).
+-- La misión se inserta con description_status = 'pending' y fantasy_description_worker la completa después.
+ALTER TABLE missions
+    ADD COLUMN description_status ENUM('pending', 'processing', 'ready', 'failed') NOT NULL DEFAULT 'ready',
+    ADD COLUMN description_attempts TINYINT NOT NULL DEFAULT 0,
+    ADD COLUMN description_claimed_at DATETIME NULL,
+    ADD INDEX idx_missions_description_status (description_status, id_mission);
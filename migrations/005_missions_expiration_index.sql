@@ -0,0 +1,4 @@
+-- Índice para el barrido de mission_expiration: busca las misiones pendientes con due_date vencido
+-- sin recorrer la tabla completa.
+ALTER TABLE missions
+    ADD INDEX idx_missions_status_due (status, due_date);
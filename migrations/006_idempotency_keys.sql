@@ -0,0 +1,13 @@
+-- Llaves de idempotencia de insert_mission y complete_mission (encabezado Idempotency-Key).
+-- key_hash es el SHA-256 de "<endpoint>:<llave>" y request_hash el del body, ambos en binario para que la tabla
+-- sea compacta. La respuesta guardada se repite a los reintentos hasta expires_at y mission_expiration borra las
+-- llaves vencidas.
+CREATE TABLE idempotency_keys (
+    key_hash BINARY(32) PRIMARY KEY,
+    request_hash BINARY(32) NOT NULL,
+    status ENUM('in_progress', 'completed') NOT NULL DEFAULT 'in_progress',
+    response TEXT NULL,
+    locked_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL,
+    INDEX idx_idempotency_keys_expires (expires_at)
+);
@@ -0,0 +1,22 @@
+-- Contadores de misiones por usuario y estado para get_profile, en lugar de agrupar todas sus misiones.
+-- insert_mission, bulk_insert_missions, complete_mission, cancel_mission y mission_expiration los actualizan en la
+-- misma transacción que cambia las misiones. El INSERT final llena los contadores de las misiones existentes.
+CREATE TABLE user_mission_stats (
+    id_user VARCHAR(255) PRIMARY KEY,
+    pending_missions INT NOT NULL DEFAULT 0,
+    in_progress_missions INT NOT NULL DEFAULT 0,
+    completed_missions INT NOT NULL DEFAULT 0,
+    failed_missions INT NOT NULL DEFAULT 0,
+    cancelled_missions INT NOT NULL DEFAULT 0
+);
+
+INSERT INTO user_mission_stats
+    (id_user, pending_missions, in_progress_missions, completed_missions, failed_missions, cancelled_missions)
+SELECT id_user,
+       COUNT(CASE WHEN status = 'pending' THEN 1 END),
+       COUNT(CASE WHEN status = 'in_progress' THEN 1 END),
+       COUNT(CASE WHEN status = 'completed' THEN 1 END),
+       COUNT(CASE WHEN status = 'failed' THEN 1 END),
+       COUNT(CASE WHEN status = 'cancelled' THEN 1 END)
+FROM missions
+GROUP BY id_user;
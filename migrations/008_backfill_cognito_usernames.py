@@ -0,0 +1,62 @@
+""" One-off job that fills users.cognito_username (migrations/008) for the users registered before the column
+
+Run it once after applying the SQL migration, with AWS credentials and the layer in the PYTHONPATH:
+
+    PYTHONPATH=layers/dudu_common python migrations/008_backfill_cognito_usernames.py
+
+ListUsers is paged through once (60 users per call), instead of once per profile update or deletion.
+"""
+import boto3
+from dudu_common.cognito import get_secret
+from dudu_common.db_connection import get_db_connection
+
+# Users returned by every ListUsers call, the maximum allowed by Cognito
+PAGE_SIZE = 60
+
+
+def list_usernames(user_pool_id):
+    """ This function pages through the user pool
+
+    Args:
+        user_pool_id (str): The user pool id
+
+    Yields:
+        list: The (username, sub) pairs of every page
+    """
+    client = boto3.client('cognito-idp', region_name='us-east-2')
+    paginator = client.get_paginator('list_users')
+
+    for page in paginator.paginate(UserPoolId=user_pool_id, AttributesToGet=['sub'],
+                                   PaginationConfig={'PageSize': PAGE_SIZE}):
+        yield [(user['Username'], attribute['Value'])
+               for user in page['Users']
+               for attribute in user.get('Attributes', [])
+               if attribute['Name'] == 'sub']
+
+
+def backfill_cognito_usernames(user_pool_id):
+    """ This function stores the Cognito username of every user that does not have it yet, one page per commit
+
+    Args:
+        user_pool_id (str): The user pool id
+
+    Returns:
+        int: The number of users updated
+    """
+    updated = 0
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            for usernames in list_usernames(user_pool_id):
+                if not usernames:
+                    continue
+                updated += cursor.executemany("UPDATE users SET cognito_username = %s "
+                                              "WHERE id_user = %s AND cognito_username IS NULL", usernames)
+                connection.commit()
+    finally:
+        connection.close()
+    return updated
+
+
+if __name__ == '__main__':
+    print(f"{backfill_cognito_usernames(get_secret()['USER_POOL_ID'])} users updated")
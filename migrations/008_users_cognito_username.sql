@@ -0,0 +1,5 @@
+-- Nombre de usuario de Cognito de cada usuario (id_user es su sub), para que update_profile y delete_user_profile
+-- no tengan que buscarlo con ListUsers. register_user lo guarda al registrar; los usuarios existentes se llenan con
+-- migrations/008_backfill_cognito_usernames.py o la primera vez que se busca su nombre.
+ALTER TABLE users
+    ADD COLUMN cognito_username VARCHAR(128) NULL;
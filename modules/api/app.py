@@ -0,0 +1,64 @@
+import importlib
+from dudu_common.responses import get_cors_headers, build_response
+
+# 'modules.' when imported from the repository (tests and benchmarks), empty when deployed with CodeUri modules/
+PACKAGE_PREFIX = __name__[:-len('api.app')]
+
+# (method, path) -> module of the handler, the same routes as the separate functions of template.yaml
+ROUTES = {
+    ('POST', '/search_mission'): 'missions.search_mission.app',
+    ('POST', '/insert_mission'): 'missions.insert_mission.app',
+    ('POST', '/bulk_insert_missions'): 'missions.bulk_insert_missions.app',
+    ('PUT', '/complete_mission'): 'missions.complete_mission.app',
+    ('PUT', '/cancel_mission'): 'missions.cancel_mission.app',
+    ('POST', '/mission_expiration'): 'missions.mission_expiration.app',
+    ('POST', '/get_profile'): 'profile.get_profile.app',
+    ('PUT', '/update_profile'): 'profile.update_profile.app',
+    ('POST', '/login'): 'users.login.app',
+    ('POST', '/register_user'): 'users.register_user.app',
+    ('POST', '/set_password'): 'users.set_password.app',
+    ('POST', '/recover_password'): 'users.recover_password.app',
+    ('POST', '/change_password'): 'users.change_password.app',
+    ('POST', '/delete_user_profile'): 'users.delete_user_profile.app',
+    ('POST', '/exist_user'): 'users.exist_user.app',
+    ('POST', '/register_alexa_user'): 'users.register_alexa_user.app',
+    ('POST', '/update_alexa_user'): 'users.update_alexa_user.app',
+}
+
+# Every handler is imported on the cold start, the init phase runs with the most CPU and the imports are shared
+MODULES = {route: importlib.import_module(PACKAGE_PREFIX + module) for route, module in ROUTES.items()}
+
+
+def lambda_handler(event, context):
+    """
+    This function dispatches an API Gateway event to the handler of its path and method
+
+    The handlers run in this container as they are, so every route shares the warm database connection, the
+    secrets cache and the AWS clients instead of keeping a cold function of its own.
+
+    event (dict): The API Gateway proxy event, httpMethod and path select the handler
+    """
+    method = (event.get('httpMethod') or '').upper()
+    path = normalize_path(event.get('path') or event.get('resource'))
+
+    module = MODULES.get((method, path))
+    if module is not None:
+        return module.lambda_handler(event, context)
+
+    methods = sorted(route_method for route_method, route_path in ROUTES if route_path == path)
+    if methods:
+        return build_response(405, f"Method {method} not allowed", get_cors_headers(','.join(['OPTIONS', *methods])))
+
+    return build_response(404, f"Route {path} not found", get_cors_headers())
+
+
+def normalize_path(path):
+    """ This function strips the trailing slash of a path, /recover_password/ and /recover_password are one route
+
+    Args:
+        path (str): The path of the event
+
+    Returns:
+        str: The normalized path
+    """
+    return '/' + (path or '').strip('/')
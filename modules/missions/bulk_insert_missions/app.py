@@ -0,0 +1,222 @@
+import json
+from datetime import datetime
+from dudu_common.db_connection import get_db_connection
+from dudu_common.description_cache import get_cached_fantasy_descriptions, store_fantasy_description
+from dudu_common.openai_connection import get_openai_batch
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.mission_stats import status_deltas, update_mission_stats
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
+
+# Missions accepted in a single request
+MAX_MISSIONS = 25
+
+
+@instrumented('bulk_insert_missions')
+def lambda_handler(event, ___):
+    """ This function generates the fantasy descriptions of several missions with a single OpenAI request and
+    inserts them into the database
+
+    body (dict): The body parameter is a dictionary that contains the following attributes:
+        - id_user (int): The user id
+        - missions (list): The missions, each one with original_description, creation_date, due_date and status
+
+    Returns:
+        dict: A dictionary that contains the status code and the result of every mission, in the same order. Invalid
+        missions have an error, missions OpenAI could not convert are inserted with description_status pending and
+        completed later by fantasy_description_worker
+    """
+
+    headers = get_cors_headers('OPTIONS,POST')
+
+    try:
+        body = json.loads(event['body'])
+
+        # Validate payload
+        validate_body(body)
+
+        # Validate existence of user
+        validate_user(body['id_user'])
+
+        results = []
+        missions = []
+        for index, mission in enumerate(body['missions']):
+            try:
+                validate_mission(mission)
+            except HttpStatusCodeError as e:
+                results.append({'index': index, 'error': e.message})
+                continue
+            results.append({'index': index})
+            missions.append((index, mission))
+
+        if len(missions) == 0:
+            raise HttpStatusCodeError(400, "No valid missions")
+
+        # Generate fantasy descriptions
+        add_fantasy_descriptions([mission for _, mission in missions])
+
+        # Insert missions
+        insert_missions(body['id_user'], [mission for _, mission in missions])
+
+        for index, mission in missions:
+            results[index]['fantasy_description'] = mission['fantasy_description']
+            results[index]['description_status'] = mission['description_status']
+
+        response = build_response(200, {'missions': results}, headers)
+
+    except HttpStatusCodeError as e:
+        response = build_response(e.status_code, e.message, headers)
+
+    except Exception as e:
+        response = build_response(500, str(e), headers)
+
+    return response
+
+
+# Validate payload
+def validate_body(body):
+    """ This function validates the payload"""
+
+    # Validate id_user
+    if 'id_user' not in body:
+        raise HttpStatusCodeError(400, "id_user is required")
+
+    if body['id_user'] is None:
+        raise HttpStatusCodeError(400, "id_user is required")
+
+    # Validate missions
+    if 'missions' not in body:
+        raise HttpStatusCodeError(400, "missions is required")
+
+    if not isinstance(body['missions'], list) or len(body['missions']) == 0:
+        raise HttpStatusCodeError(400, "missions must be a non empty list")
+
+    if len(body['missions']) > MAX_MISSIONS:
+        raise HttpStatusCodeError(400, f"missions cannot have more than {MAX_MISSIONS} items")
+
+    return True
+
+
+# Validate a mission of the payload
+def validate_mission(mission):
+    """ This function validates a mission of the payload"""
+
+    if not isinstance(mission, dict):
+        raise HttpStatusCodeError(400, "mission must be an object")
+
+    # Validate original_description
+    if not isinstance(mission.get('original_description'), str):
+        raise HttpStatusCodeError(400, "original_description must be a string")
+
+    if len(mission['original_description']) == 0:
+        raise HttpStatusCodeError(400, "original_description cannot be empty")
+
+    # Validate creation_date and due_date
+    for field in ('creation_date', 'due_date'):
+        if mission.get(field) is None:
+            raise HttpStatusCodeError(400, f"{field} is required")
+
+        try:
+            datetime.strptime(mission[field], '%Y-%m-%d')
+        except (TypeError, ValueError):
+            raise HttpStatusCodeError(400, f"Incorrect {field} format, should be YYYY-MM-DD")
+
+    # Validate status
+    if mission.get('status') is None:
+        raise HttpStatusCodeError(400, "status is required")
+
+    if mission['status'] not in ['pending', 'completed', 'cancelled', 'in_progress']:
+        raise HttpStatusCodeError(400, "Invalid status")
+
+    return True
+
+
+# Validate existence of user
+def validate_user(id_user):
+    """ This function validates the existence of a user
+
+    id_user (int): The user id
+
+    Returns:
+        bool: True if the user exists
+    """
+    connection = get_db_connection()
+
+    try:
+        with connection.cursor() as cursor:
+            sql = "SELECT id_user FROM users WHERE id_user = %s"
+            cursor.execute(sql, (id_user,))
+            rows = cursor.fetchall()
+
+            if len(rows) == 0:
+                raise HttpStatusCodeError(404, "User not found")
+    finally:
+        connection.close()
+    return True
+
+
+# Generate fantasy descriptions
+def add_fantasy_descriptions(missions):
+    """ This function sets the fantasy_description and description_status of every mission
+
+    Cached descriptions are read with a single query and reused, the rest are converted with a single OpenAI
+    request. Missions that are not converted, because the request failed or its answer could not be paired with
+    the missions, are left pending for the worker.
+
+    missions (list): The validated missions
+    """
+    cached = get_cached_fantasy_descriptions([mission['original_description'] for mission in missions])
+
+    uncached = []
+    for mission, fantasy_description in zip(missions, cached):
+        if fantasy_description is None:
+            uncached.append(mission)
+        else:
+            mission['fantasy_description'] = fantasy_description
+            mission['description_status'] = 'ready'
+
+    if len(uncached) == 0:
+        return
+
+    try:
+        converted = get_openai_batch([mission['original_description'] for mission in uncached])
+    except HttpStatusCodeError:
+        converted = [None] * len(uncached)
+
+    for mission, fantasy_description in zip(uncached, converted):
+        if fantasy_description is None:
+            mission['fantasy_description'] = ''
+            mission['description_status'] = 'pending'
+        else:
+            store_fantasy_description(mission['original_description'], fantasy_description)
+            mission['fantasy_description'] = fantasy_description
+            mission['description_status'] = 'ready'
+
+
+# Insert missions
+def insert_missions(id_user, missions):
+    """ This function inserts all the missions with a single multi-row INSERT and counts them in the stats of the
+    user
+
+    id_user (int): The user id
+    missions (list): The missions with their fantasy description
+
+    Returns:
+        int: The number of missions inserted
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("INSERT INTO missions (original_description, fantasy_description, creation_date, status, due_date, "
+                   "id_user, description_status) VALUES (%s, %s, %s, %s, %s, %s, %s)")
+            cursor.executemany(sql, [(
+                mission['original_description'], mission['fantasy_description'], mission['creation_date'],
+                mission['status'], mission['due_date'], id_user, mission['description_status']
+            ) for mission in missions])
+            update_mission_stats(cursor, {id_user: status_deltas((None, mission['status']) for mission in missions)})
+        connection.commit()
+    except Exception:
+        raise HttpStatusCodeError(500, "Error inserting missions")
+    finally:
+        connection.close()
+    return len(missions)
@@ -1,8 +1,12 @@
 import json
-from common.db_connection import get_db_connection
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.instrumentation import instrumented
+from dudu_common.mission_stats import status_deltas, update_mission_stats
+from dudu_common.responses import get_cors_headers, build_response
 
 
+@instrumented('cancel_mission')
 def lambda_handler(event, ___):
     """ This function cancels a mission and updates its status in the database
 
@@ -14,11 +18,7 @@ def lambda_handler(event, ___):
         dict: A dictionary that contains the status code and a message
     """
 
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET,PUT,DELETE'
-    }
+    headers = get_cors_headers('OPTIONS,POST,GET,PUT,DELETE')
     try:
         body = json.loads(event['body'])
 
@@ -31,19 +31,11 @@ def lambda_handler(event, ___):
         # Cancel mission
         cancel_mission(body['id_mission'], body['id_user'])
 
-        response = {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps("Mission cancelled successfully")
-        }
+        response = build_response(200, "Mission cancelled successfully", headers)
 
     except HttpStatusCodeError as e:
         print(e.message)
-        response = {
-            'statusCode': e.status_code,
-            'headers': headers,
-            'body': json.dumps(e.message)
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     return response
 
@@ -97,12 +89,14 @@ def validate_user(id_user):
         raise e
     finally:
         connection.close()
+
     return True
 
 
 # Cancel mission
 def cancel_mission(id_mission, id_user):
-    """ This function cancels a mission by updating its status in the database
+    """ This function cancels a mission by updating its status in the database, moving it to the cancelled
+    counter of the user in the same transaction
 
     id_mission (int): The mission id to be cancelled
     id_user (int): The user id performing the cancellation
@@ -115,10 +109,15 @@ def cancel_mission(id_mission, id_user):
 
     try:
         with connection.cursor() as cursor:
+            sql = "SELECT status FROM missions WHERE id_mission = %s AND id_user = %s FOR UPDATE"
+            cursor.execute(sql, (id_mission, id_user))
+            mission = cursor.fetchone()
+            if mission is None:
+                raise HttpStatusCodeError(404, "Mission not found or user unauthorized to cancel")
+
             sql = "UPDATE missions SET status = %s WHERE id_mission = %s AND id_user = %s"
             cursor.execute(sql, ('cancelled', id_mission, id_user))
-            if cursor.rowcount == 0:
-                raise HttpStatusCodeError(404, "Mission not found or user unauthorized to cancel")
+            update_mission_stats(cursor, {id_user: status_deltas([(mission[0], 'cancelled')])})
 
         connection.commit()
 
@@ -1,156 +1,258 @@
 import json
 import random
-from common.db_connection import get_db_connection
+from dudu_common.db_connection import get_db_connection
+from dudu_common.idempotency import idempotent
+from dudu_common.instrumentation import instrumented
+from dudu_common.mission_stats import status_deltas, update_mission_stats
+from dudu_common.progression import MAX_REWARD_ID, Progress, apply_xp, get_reward_titles
+from dudu_common.responses import get_cors_headers, build_response
 
+# Missions accepted by a single batch completion
+MAX_BATCH_MISSIONS = 50
+
+
+@instrumented('complete_mission')
+@idempotent('complete_mission', get_cors_headers('POST, OPTIONS, GET, PUT, DELETE', 'Content-Type, Idempotency-Key'))
 def lambda_handler(event, __):
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS, GET, PUT, DELETE',
-        'Access-Control-Allow-Headers': 'Content-Type',
-    }
+    headers = get_cors_headers('POST, OPTIONS, GET, PUT, DELETE', 'Content-Type, Idempotency-Key')
     try:
         if 'body' not in event or event['body'] is None:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: Body is required"})
-            }
+            return build_response(400, {"message": "Bad request: Body is required"}, headers)
 
         body = json.loads(event['body'])
         if not body:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: Body is required"})
-            }
+            return build_response(400, {"message": "Bad request: Body is required"}, headers)
+
+        if 'id_missions' in body:
+            return complete_missions(body, headers)
 
         id_mission = body.get('id_mission')
         id_user = body.get('id_user')
 
         if id_mission is None or id_user is None:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: id of mission and user is required"})
-            }
+            return build_response(400, {"message": "Bad request: id of mission and user is required"}, headers)
 
         if isinstance(id_mission, int) and isinstance(id_user, str):
             connection = get_db_connection()
             try:
                 with connection.cursor() as cursor:
-                    cursor.execute("SELECT status FROM missions WHERE id_mission = %s", (id_mission,))
-                    mission_status = cursor.fetchone()
-                    if mission_status and mission_status[0] == 'completed':
-                        return {
-                            'statusCode': 400,
-                            'headers': headers,
-                            'body': json.dumps({"message": "Mission is already completed"})
-                        }
-
-                    cursor.execute("SELECT current_xp, xp_limit, level FROM users WHERE id_user = %s FOR UPDATE",
-                                   (id_user,))
+                    reward_titles = get_reward_titles(cursor)
+
+                    # A mission of another user does not join, so it is reported as not found
+                    cursor.execute("SELECT m.status, u.current_xp, u.xp_limit, u.level, ur.id_reward "
+                                   "FROM users u "
+                                   "LEFT JOIN missions m ON m.id_mission = %s AND m.id_user = u.id_user "
+                                   "LEFT JOIN user_rewards ur ON ur.id_user = u.id_user "
+                                   "WHERE u.id_user = %s FOR UPDATE",
+                                   (id_mission, id_user))
                     user = cursor.fetchone()
                     if not user:
                         raise Exception("User not found")
 
-                    current_xp, xp_limit, level = user
-
-                    if current_xp >= xp_limit:
-                        raise Exception("User's XP is already at the limit")
-
-                    random_xp = random.randint(10, 35)
-                    cursor.execute("UPDATE missions SET status = 'completed' WHERE id_mission = %s", (id_mission,))
-                    new_current_xp = current_xp + random_xp
-
-                    if new_current_xp >= xp_limit:
-                        new_level = level + 1
-                        if new_level > 50:
-                            new_level = 50
-                            new_current_xp = xp_limit  # Ensure XP doesn't go above the limit
-                        else:
-                            new_current_xp = new_current_xp - xp_limit
-                            new_limit_xp = xp_limit + 10
-                            cursor.execute(
-                                "UPDATE users SET level = %s, current_xp = %s, xp_limit = %s WHERE id_user = %s",
-                                (new_level, new_current_xp, new_limit_xp, id_user))
-
-                            max_reward_id = 11
-                            cursor.execute("SELECT id_reward FROM user_rewards WHERE id_user = %s", (id_user,))
-                            reward_increment = cursor.fetchone()[0]
-                            if new_level % 5 == 0:
-                                reward_increment += 1
-
-                            if reward_increment > 0:
-                                new_reward_id = min(reward_increment, max_reward_id)
-
-                                cursor.execute("UPDATE user_rewards SET id_reward = %s where id_user = %s",
-                                               (new_reward_id, id_user))
-
-                                cursor.execute("SELECT wizard_title FROM rewards WHERE id_reward = %s",
-                                               (new_reward_id,))
-                                reward = cursor.fetchone()
-                                reward_title = reward[0] if reward else "Unknown Reward"
-                            else:
-                                reward_title = None
-
-                        response = {
-                            'statusCode': 200,
-                            'headers': headers,
-                            'body': json.dumps({
-                                "message": f"Mission {id_mission} completed successfully and XP updated. Level Up!",
-                                "id_user": id_user,
-                                "level": new_level,
-                                "current_xp": new_current_xp,
-                                "xp_limit": xp_limit,
-                                "level_up": True,
-                                "xp": random_xp,
-                                "reward_title": reward_title,
-                                "reward_increment": reward_increment,
-                                "new_reward_id": new_reward_id
-                            })
-                        }
+                    mission_status, current_xp, xp_limit, level, id_reward = user
+
+                    if mission_status is None:
+                        raise Exception("Mission not found")
+
+                    if mission_status == 'completed':
+                        connection.rollback()
+                        return build_response(400, {"message": "Mission is already completed"}, headers)
+
+                    progress = Progress(level, current_xp, xp_limit, id_reward, 0)
+                    random_xp = 0
+                    # At MAX_LEVEL the XP stays at the limit, the mission is still completed without XP
+                    if current_xp < xp_limit:
+                        random_xp = random.randint(10, 35)
+                        progress = apply_xp(level, current_xp, xp_limit, id_reward, random_xp,
+                                            max(reward_titles, default=MAX_REWARD_ID))
+
+                    # Mission, user and reward are written back with a single statement
+                    save_progress(cursor, id_user, [id_mission], progress)
+                    update_mission_stats(cursor, {id_user: status_deltas([(mission_status, 'completed')])})
+
+                    if progress.levels_gained > 0:
+                        reward_title = get_reward_title(reward_titles, progress)
+
+                        response = build_response(200, {
+                            "message": f"Mission {id_mission} completed successfully and XP updated. Level Up!",
+                            "id_user": id_user,
+                            "level": progress.level,
+                            "current_xp": progress.current_xp,
+                            "xp_limit": progress.xp_limit,
+                            "level_up": True,
+                            "xp": random_xp,
+                            "reward_title": reward_title,
+                            "reward_increment": progress.id_reward,
+                            "new_reward_id": progress.id_reward
+                        }, headers)
 
                     else:
-                        cursor.execute("UPDATE users SET current_xp = %s WHERE id_user = %s", (new_current_xp, id_user))
-                        response = {
-                            'statusCode': 200,
-                            'headers': headers,
-                            'body': json.dumps({
-                                "message": f"Mission {id_mission} completed successfully and XP updated",
-                                "id_user": id_user,
-                                "level": level,
-                                "current_xp": new_current_xp,
-                                "xp_limit": xp_limit,
-                                "level_up": False,
-                                "xp": random_xp
-                            })
-                        }
+                        response = build_response(200, {
+                            "message": f"Mission {id_mission} completed successfully and XP updated",
+                            "id_user": id_user,
+                            "level": progress.level,
+                            "current_xp": progress.current_xp,
+                            "xp_limit": progress.xp_limit,
+                            "level_up": False,
+                            "xp": random_xp
+                        }, headers)
 
                     connection.commit()
 
             except Exception as e:
                 connection.rollback()
-                response = {
-                    'statusCode': 500,
-                    'headers': headers,
-                    'body': json.dumps({"message": f"An error occurred: {str(e)}"})
-                }
+                response = build_response(500, {"message": f"An error occurred: {str(e)}"}, headers)
 
             finally:
                 connection.close()
 
         else:
-            response = {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Invalid mission or user ID"})
-            }
+            response = build_response(400, {"message": "Invalid mission or user ID"}, headers)
+
+    except Exception as e:
+        response = build_response(500, {"message": f"An error occurred: {str(e)}"}, headers)
+
+    return response
+
+
+def complete_missions(body, headers):
+    """ This function completes several missions of a user in one transaction
+
+    The user row is locked once, the statuses of all the missions are read with one query, the XP of every
+    completable mission is applied in order (including several level ups) and everything is written back with a
+    single UPDATE.
+
+    Args:
+        body (dict): The request body with id_user and id_missions
+        headers (dict): The CORS headers
+
+    Returns:
+        dict: The response with the final progress of the user and the result of every mission
+    """
+    id_missions = body.get('id_missions')
+    id_user = body.get('id_user')
+
+    if id_user is None or not isinstance(id_missions, list) or len(id_missions) == 0:
+        return build_response(400, {"message": "Bad request: list of missions and id of user is required"}, headers)
+
+    if len(id_missions) > MAX_BATCH_MISSIONS:
+        return build_response(400, {"message": f"Bad request: at most {MAX_BATCH_MISSIONS} missions per batch"},
+                              headers)
+
+    if not isinstance(id_user, str) or not all(isinstance(id_mission, int) for id_mission in id_missions):
+        return build_response(400, {"message": "Invalid mission or user ID"}, headers)
+
+    # Replayed completions may repeat a mission
+    id_missions = list(dict.fromkeys(id_missions))
+
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            reward_titles = get_reward_titles(cursor)
+
+            cursor.execute("SELECT u.current_xp, u.xp_limit, u.level, ur.id_reward "
+                           "FROM users u "
+                           "LEFT JOIN user_rewards ur ON ur.id_user = u.id_user "
+                           "WHERE u.id_user = %s FOR UPDATE",
+                           (id_user,))
+            user = cursor.fetchone()
+            if not user:
+                raise Exception("User not found")
+
+            current_xp, xp_limit, level, id_reward = user
+            progress = Progress(level, current_xp, xp_limit, id_reward, 0)
+
+            # Missions of other users are reported as not found
+            cursor.execute("SELECT id_mission, status FROM missions WHERE id_mission IN %s AND id_user = %s "
+                           "FOR UPDATE",
+                           (id_missions, id_user))
+            statuses = {row[0]: row[1] for row in cursor.fetchall()}
+
+            results = []
+            completed = []
+            total_xp = 0
+            levels_gained = 0
+            for id_mission in id_missions:
+                if id_mission not in statuses:
+                    results.append({"id_mission": id_mission, "completed": False, "message": "Mission not found"})
+                elif statuses[id_mission] == 'completed':
+                    results.append({"id_mission": id_mission, "completed": False,
+                                    "message": "Mission is already completed"})
+                else:
+                    random_xp = 0
+                    # At MAX_LEVEL the XP stays at the limit, the mission is still completed without XP
+                    if progress.current_xp < progress.xp_limit:
+                        random_xp = random.randint(10, 35)
+                        progress = apply_xp(progress.level, progress.current_xp, progress.xp_limit,
+                                            progress.id_reward, random_xp, max(reward_titles, default=MAX_REWARD_ID))
+                    else:
+                        progress = progress._replace(levels_gained=0)
+                    total_xp += random_xp
+                    levels_gained += progress.levels_gained
+                    completed.append(id_mission)
+                    results.append({"id_mission": id_mission, "completed": True, "xp": random_xp,
+                                    "level_up": progress.levels_gained > 0})
+
+            if completed:
+                save_progress(cursor, id_user, completed, progress)
+                update_mission_stats(cursor, {id_user: status_deltas(
+                    (statuses[id_mission], 'completed') for id_mission in completed)})
+            connection.commit()
+
+        response = build_response(200, {
+            "message": f"{len(completed)} of {len(id_missions)} missions completed successfully",
+            "id_user": id_user,
+            "level": progress.level,
+            "current_xp": progress.current_xp,
+            "xp_limit": progress.xp_limit,
+            "level_up": levels_gained > 0,
+            "levels_gained": levels_gained,
+            "xp": total_xp,
+            "reward_title": get_reward_title(reward_titles, progress),
+            "new_reward_id": progress.id_reward,
+            "missions": results
+        }, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": f"An error occurred: {str(e)}"})
-        }
+        connection.rollback()
+        response = build_response(500, {"message": f"An error occurred: {str(e)}"}, headers)
+
+    finally:
+        connection.close()
 
     return response
+
+
+def save_progress(cursor, id_user, id_missions, progress):
+    """ This function marks the missions as completed and stores the progress of the user with a single
+    multi-table UPDATE, only missions owned by the user are completed
+
+    Args:
+        cursor (Cursor): The cursor of the transaction that locked the user
+        id_user (str): The user id
+        id_missions (list): The ids of the completed missions
+        progress (Progress): The new level, XP, XP limit and reward of the user
+    """
+    cursor.execute("UPDATE missions m "
+                   "JOIN users u ON u.id_user = %s "
+                   "LEFT JOIN user_rewards ur ON ur.id_user = u.id_user "
+                   "SET m.status = 'completed', u.level = %s, u.current_xp = %s, u.xp_limit = %s, "
+                   "ur.id_reward = COALESCE(%s, ur.id_reward) "
+                   "WHERE m.id_mission IN %s AND m.id_user = u.id_user",
+                   (id_user, progress.level, progress.current_xp, progress.xp_limit, progress.id_reward,
+                    list(id_missions)))
+
+
+def get_reward_title(reward_titles, progress):
+    """ This function returns the wizard title of the reward of the user
+
+    Args:
+        reward_titles (MappingProxyType): The wizard title of every reward
+        progress (Progress): The progress of the user
+
+    Returns:
+        str: The wizard title, None if the user has no reward
+    """
+    if progress.id_reward is None:
+        return None
+    return reward_titles.get(progress.id_reward, "Unknown Reward")
@@ -0,0 +1,146 @@
+import os
+import json
+from pymysql.cursors import DictCursor
+from dudu_common.db_connection import get_db_connection
+from dudu_common.description_cache import get_fantasy_description
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.instrumentation import instrumented
+
+# Missions claimed from the queue on every run
+BATCH_SIZE = int(os.environ.get('DESCRIPTION_WORKER_BATCH_SIZE', '20'))
+
+# Attempts before a mission is marked as failed
+MAX_ATTEMPTS = 3
+
+# Seconds after which a claimed mission is considered abandoned by a crashed worker
+CLAIM_TIMEOUT = 300
+
+
+@instrumented('fantasy_description_worker')
+def lambda_handler(event, context):
+    """ This function generates the fantasy descriptions of the missions inserted with async_description
+
+    Returns:
+        dict: A dictionary that contains the status code and the number of missions processed
+    """
+    try:
+        processed = process_pending_descriptions()
+        response = {
+            'statusCode': 200,
+            'body': json.dumps({'processed': processed})
+        }
+    except Exception as e:
+        response = {
+            'statusCode': 500,
+            'body': json.dumps(f"An error occurred while generating the descriptions: {str(e)}")
+        }
+    return response
+
+
+def process_pending_descriptions():
+    """ This function claims a batch of pending missions and fills in their fantasy descriptions
+
+    Returns:
+        int: The number of missions processed
+    """
+    jobs = claim_pending_descriptions(BATCH_SIZE)
+
+    for job in jobs:
+        try:
+            fantasy_description = get_fantasy_description(job['original_description'])
+        except HttpStatusCodeError:
+            release_description(job)
+        else:
+            complete_description(job['id_mission'], fantasy_description)
+
+    return len(jobs)
+
+
+def claim_pending_descriptions(limit):
+    """ This function marks the next pending missions as processing, so concurrent workers skip them
+
+    The claim is committed before OpenAI is called, so no row lock is held while waiting for it. Missions claimed
+    longer than CLAIM_TIMEOUT ago are claimed again while they have attempts left, the ones that already used
+    MAX_ATTEMPTS (a worker kept timing out or crashing on them) are marked as failed by the same sweep.
+
+    Args:
+        limit (int): The maximum number of missions to claim
+
+    Returns:
+        list: The claimed missions with id_mission, original_description and description_attempts
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor(DictCursor) as cursor:
+            sql = ("UPDATE missions "
+                   "SET description_status = 'failed', description_claimed_at = NULL "
+                   "WHERE description_status = 'processing' "
+                   "AND description_claimed_at < NOW() - INTERVAL %s SECOND "
+                   "AND description_attempts >= %s")
+            cursor.execute(sql, (CLAIM_TIMEOUT, MAX_ATTEMPTS))
+
+            sql = ("SELECT id_mission, original_description, description_attempts FROM missions "
+                   "WHERE description_status = 'pending' "
+                   "OR (description_status = 'processing' "
+                   "AND description_claimed_at < NOW() - INTERVAL %s SECOND "
+                   "AND description_attempts < %s) "
+                   "ORDER BY id_mission "
+                   "LIMIT %s "
+                   "FOR UPDATE SKIP LOCKED")
+            cursor.execute(sql, (CLAIM_TIMEOUT, MAX_ATTEMPTS, limit))
+            jobs = cursor.fetchall()
+
+            if len(jobs) > 0:
+                sql = ("UPDATE missions "
+                       "SET description_status = 'processing', "
+                       "description_claimed_at = NOW(), "
+                       "description_attempts = description_attempts + 1 "
+                       "WHERE id_mission IN %s")
+                cursor.execute(sql, ([job['id_mission'] for job in jobs],))
+        connection.commit()
+    finally:
+        connection.close()
+
+    for job in jobs:
+        job['description_attempts'] += 1
+    return jobs
+
+
+def complete_description(id_mission, fantasy_description):
+    """ This function stores the fantasy description of a mission and marks it as ready
+
+    Args:
+        id_mission (int): The mission id
+        fantasy_description (str): The fantasy description
+    """
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("UPDATE missions "
+                   "SET fantasy_description = %s, description_status = 'ready', description_claimed_at = NULL "
+                   "WHERE id_mission = %s")
+            cursor.execute(sql, (fantasy_description, id_mission))
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def release_description(job):
+    """ This function puts a mission back in the queue after a failed attempt, or marks it as failed after
+    MAX_ATTEMPTS
+
+    Args:
+        job (dict): The claimed mission
+    """
+    status = 'failed' if job['description_attempts'] >= MAX_ATTEMPTS else 'pending'
+
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql = ("UPDATE missions "
+                   "SET description_status = %s, description_claimed_at = NULL "
+                   "WHERE id_mission = %s")
+            cursor.execute(sql, (status, job['id_mission']))
+        connection.commit()
+    finally:
+        connection.close()
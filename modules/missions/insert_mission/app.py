@@ -1,10 +1,16 @@
 import json
 from datetime import datetime
-from common.db_connection import get_db_connection
-from common.openai_connection import get_openai_client
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.description_cache import get_fantasy_description
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.idempotency import idempotent
+from dudu_common.instrumentation import instrumented
+from dudu_common.mission_stats import status_deltas, update_mission_stats
+from dudu_common.responses import get_cors_headers, build_response
 
 
+@instrumented('insert_mission')
+@idempotent('insert_mission', get_cors_headers('OPTIONS,POST'))
 def lambda_handler(event, ___):
     """ This function generates a fantasy description for a mission and inserts it into the database
 
@@ -13,11 +19,17 @@ def lambda_handler(event, ___):
         - id_user (int): The user id
         - creation_date (str): The creation date of the mission
         - status (str): The status of the mission
+        - async_description (bool, optional): Return the mission id without waiting for the fantasy description
+
+    A retry with the same Idempotency-Key header gets the original response back without inserting the mission
+    or calling OpenAI again.
 
     Returns:
         dict: A dictionary that contains the status code and a message
     """
 
+    headers = get_cors_headers('OPTIONS,POST')
+
     try:
         body = json.loads(event['body'])
 
@@ -27,46 +39,33 @@ def lambda_handler(event, ___):
         # Validate existence of user
         validate_user(body['id_user'])
 
-        # Generate fantasy description
-        fantasy_description = get_openai_client(body.get('original_description', ''))
+        if body.get('async_description', False):
+            # Insert mission right away, fantasy_description_worker fills in the description later
+            body['fantasy_description'] = ''
+            body['description_status'] = 'pending'
+            id_mission = insert_mission(body)
+
+            response = build_response(202, {
+                'id_mission': id_mission,
+                'description_status': 'pending'
+            }, headers)
+        else:
+            # Generate fantasy description, reusing the cached ones of the same task
+            fantasy_description = get_fantasy_description(body.get('original_description', ''))
 
-        # Add fantasy description to body
-        body['fantasy_description'] = fantasy_description
+            # Add fantasy description to body
+            body['fantasy_description'] = fantasy_description
 
-        # Insert mission
-        insert_mission(body)
+            # Insert mission
+            insert_mission(body)
 
-        response = {
-            'statusCode': 200,
-            'body': json.dumps(fantasy_description),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            }
-        }
+            response = build_response(200, fantasy_description, headers)
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'body': json.dumps(e.message),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            }
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'body': json.dumps(str(e)),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            }
-        }
+        response = build_response(500, str(e), headers)
 
     return response
 
@@ -129,6 +128,10 @@ def validate_body(body):
     if body['status'] not in ['pending', 'completed', 'cancelled', 'in_progress']:
         raise HttpStatusCodeError(400, "Invalid status")
 
+    # Validate async_description
+    if not isinstance(body.get('async_description', False), bool):
+        raise HttpStatusCodeError(400, "async_description must be a boolean")
+
     return True
 
 
@@ -158,16 +161,25 @@ def validate_user(id_user):
 
 # Insert mission
 def insert_mission(body):
+    """ This function inserts the mission into the database and counts it in the stats of the user
+
+    body (dict): The mission, description_status defaults to ready
+
+    Returns:
+        int: The id of the new mission
+    """
     connection = get_db_connection()
     try:
         with connection.cursor() as cursor:
-            sql = "INSERT INTO missions (original_description, fantasy_description, creation_date, status, due_date, id_user) VALUES (%s, %s, %s, %s, %s, %s)"
+            sql = "INSERT INTO missions (original_description, fantasy_description, creation_date, status, due_date, id_user, description_status) VALUES (%s, %s, %s, %s, %s, %s, %s)"
             cursor.execute(sql, (
                 body['original_description'], body['fantasy_description'], body['creation_date'], body['status'], body['due_date'],
-                body['id_user']))
+                body['id_user'], body.get('description_status', 'ready')))
+            id_mission = cursor.lastrowid
+            update_mission_stats(cursor, {body['id_user']: status_deltas([(None, body['status'])])})
         connection.commit()
     except Exception:
         raise HttpStatusCodeError(500, "Error inserting mission")
     finally:
         connection.close()
-    return True
+    return id_mission
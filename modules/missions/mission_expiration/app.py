@@ -1,11 +1,15 @@
+import os
 import json
-import datetime
-from pymysql.cursors import DictCursor
-from .common.db_connection import get_db_connection
-from datetime import datetime
+from dudu_common.db_connection import get_db_connection
+from dudu_common.idempotency import purge_expired_keys
+from dudu_common.instrumentation import instrumented
+from dudu_common.mission_stats import status_deltas, update_mission_stats
 
+# Missions expired by every UPDATE, so each transaction only locks a bounded number of rows
+BATCH_SIZE = int(os.environ.get('EXPIRATION_BATCH_SIZE', '1000'))
 
 
+@instrumented('mission_expiration')
 def lambda_handler(event, context):
     """ This function checks for expired missions and updates their status
 
@@ -14,10 +18,11 @@ def lambda_handler(event, context):
               and a message indicating the expiration check is done
     """
     try:
-        check_and_update_expired_missions()
+        expired = check_and_update_expired_missions()
+        purge_idempotency_keys()
         response = {
             'statusCode': 200,
-            'body': json.dumps("Missions' expiration checking done")
+            'body': json.dumps(f"Missions' expiration checking done, {expired} missions expired")
         }
     except Exception as e:
         response = {
@@ -28,25 +33,71 @@ def lambda_handler(event, context):
 
 
 def check_and_update_expired_missions():
-    """ This function checks pending missions and updates the status to 'failed'
-    if the current date is greater than the due date
+    """ This function updates the status of the pending missions whose due date has passed to 'failed'
+
+    The missions are expired in chunks of BATCH_SIZE, committing after every chunk. Each chunk is picked with the
+    (status, due_date) index and locked, expired with one UPDATE and moved from the pending to the failed counter
+    of its users with one upsert, all in the same transaction.
+
+    Returns:
+        int: The number of missions expired
+    """
+    expired = 0
+    connection = get_db_connection()
+    try:
+        with connection.cursor() as cursor:
+            sql_select = ("SELECT id_mission, id_user FROM missions "
+                          "WHERE status = 'pending' AND due_date < CURRENT_DATE "
+                          "LIMIT %s FOR UPDATE")
+            sql_update = "UPDATE missions SET status = 'failed' WHERE id_mission IN %s"
+            while True:
+                cursor.execute(sql_select, (BATCH_SIZE,))
+                missions = cursor.fetchall()
+                if missions:
+                    cursor.execute(sql_update, ([row[0] for row in missions],))
+                    update_mission_stats(cursor, count_expired_by_user(missions))
+                connection.commit()
+                expired += len(missions)
+
+                if len(missions) < BATCH_SIZE:
+                    break
+    finally:
+        connection.close()
+    return expired
+
+
+def count_expired_by_user(missions):
+    """ This function returns the counter changes of the users of the expired missions
+
+    Args:
+        missions (list): The (id_mission, id_user) rows of the expired missions
+
+    Returns:
+        dict: The status_deltas of every user id
+    """
+    transitions_by_user = {}
+    for _, id_user in missions:
+        transitions_by_user.setdefault(id_user, []).append(('pending', 'failed'))
+    return {id_user: status_deltas(transitions) for id_user, transitions in transitions_by_user.items()}
+
+
+def purge_idempotency_keys():
+    """ This function deletes the expired idempotency keys in chunks of BATCH_SIZE, committing after every chunk
+
+    Returns:
+        int: The number of keys deleted
     """
+    purged = 0
     connection = get_db_connection()
     try:
-        with connection.cursor(DictCursor) as cursor:
-            sql_select = "SELECT * FROM missions WHERE status = 'pending'"
-            cursor.execute(sql_select)
-            missions = cursor.fetchall()
-
-            current_date = datetime.now().date()
-
-            for mission in missions:
-                due_date_str = mission['due_date']
-                if due_date_str:
-                    due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
-                    if current_date > due_date:
-                        sql_update = "UPDATE missions SET status = 'failed' WHERE id_mission = %s"
-                        cursor.execute(sql_update, (mission['id_mission'],))
-            connection.commit()
+        with connection.cursor() as cursor:
+            while True:
+                affected = purge_expired_keys(cursor, BATCH_SIZE)
+                connection.commit()
+                purged += affected
+
+                if affected < BATCH_SIZE:
+                    break
     finally:
         connection.close()
+    return purged
@@ -1,29 +1,47 @@
+import base64
+import binascii
 import json
-from common.db_connection import get_db_connection
+import re
 from pymysql.cursors import DictCursor
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.instrumentation import instrumented
+from dudu_common.responses import get_cors_headers, build_response
 
+# Shortest word answered with the FULLTEXT index (innodb_ft_min_token_size), shorter queries use LIKE
+MIN_FULLTEXT_QUERY_LENGTH = 3
+# Words as the FULLTEXT parser splits them, punctuation and boolean mode operators are separators
+FULLTEXT_WORD = re.compile(r'\w+')
+# Types of the value a cursor may carry for each order_by, the dates are encoded as strings and may be NULL
+CURSOR_VALUE_TYPES = {
+    'creation_date': (str, type(None)),
+    'due_date': (str, type(None)),
+    'relevance': (int, float),
+    'id_mission': (int,)
+}
 
+
+@instrumented('search_mission')
 def lambda_handler(event, __):
     """ This function searches for a mission with name and/or filters
 
     body (dict): The body parameter is a dictionary that contains the following attributes:
         - id_user (int): The user id
         - search_query (str): The search query
-        - order_by (str): The field to order the results
+        - order_by (str): The field to order the results (creation_date, due_date or relevance)
         - order (str): The order of the results
         - status (str): The status of the mission
         - page (int): The page number for pagination
+        - cursor (str, optional): The next_cursor of the previous page, replaces page. Send null for the first page
+        - include_total (bool, optional): Whether to count the missions when paginating with cursor
         - limit (int): The number of results per page
 
     Returns:
-        dict: A dictionary that contains the status code and a message, the mission list and the pagination information
+        dict: A dictionary that contains the status code and a message, the mission list and the pagination information.
+        Every mission has a description_status: pending or processing while its fantasy description is generated,
+        then ready (or failed)
     """
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-    }
+    headers = get_cors_headers('OPTIONS,POST,GET')
     try:
 
         body = json.loads(event['body'])
@@ -31,27 +49,27 @@ def lambda_handler(event, __):
         # Validate payload
         validate_body(body)
 
-        # Validate existence of user
-        validate_user(body['id_user'])
-
         # Search missions
-        missions, total = search_mission(body)
+        if 'cursor' in body:
+            # Validate existence of user
+            validate_user(body['id_user'])
+
+            missions, total, next_cursor = search_mission_by_cursor(body)
+            result = {'missions': missions, 'next_cursor': next_cursor}
+            if total is not None:
+                result['total'] = total
+            response = build_response(200, result, headers)
+        else:
+            # The user is validated by the same query
+            missions, total = search_mission(body)
 
-        response = {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
+            response = build_response(200, {
                 'missions': missions,
                 'total': total
-            })
-        }
+            }, headers)
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'headers': headers,
-            'body': json.dumps(e.message)
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     return response
 
@@ -66,6 +84,10 @@ def validate_body(body):
             - order_by (str): The field to order the results
             - order (str): The order of the results
             - status (str): The status of the mission
+            - page (int): The page number for pagination, not required when cursor is sent
+            - cursor (str): The cursor of the next page
+            - include_total (bool): Whether to count the missions when paginating with cursor
+            - limit (int): The number of results per page
     """
     if 'id_user' not in body:
         raise HttpStatusCodeError(400, 'id_user is required')
@@ -77,7 +99,12 @@ def validate_body(body):
         raise HttpStatusCodeError(400, 'order is required')
     if 'status' not in body:
         raise HttpStatusCodeError(400, 'status is required')
-    if 'page' not in body or not isinstance(body['page'], int) or body['page'] < 1:
+    if 'cursor' in body:
+        if body['cursor'] is not None and not isinstance(body['cursor'], str):
+            raise HttpStatusCodeError(400, 'invalid cursor')
+        if not isinstance(body.get('include_total', False), bool):
+            raise HttpStatusCodeError(400, 'invalid include_total')
+    elif 'page' not in body or not isinstance(body['page'], int) or body['page'] < 1:
         raise HttpStatusCodeError(400, 'invalid page')
     if 'limit' not in body or not isinstance(body['limit'], int) or body['limit'] < 1:
         raise HttpStatusCodeError(400, 'invalid limit')
@@ -112,9 +139,97 @@ def validate_user(id_user):
     return True
 
 
+def build_fulltext_query(search_query):
+    """ This function builds a boolean mode FULLTEXT query from the search query
+
+    Every word becomes a required prefix term, so "pay bil" matches "Pay the bills" while the user is typing. The
+    query is split on punctuation like the index is, so "tarea." or "a/b" do not become terms that match nothing, and
+    words shorter than the index token size are left out because the index cannot match them.
+
+    Args:
+        search_query (str): The search query
+
+    Returns:
+        str: The boolean mode query, or None if no word is long enough for the FULLTEXT index
+    """
+    words = [word for word in FULLTEXT_WORD.findall(search_query) if len(word) >= MIN_FULLTEXT_QUERY_LENGTH]
+    if not words:
+        return None
+    return ' '.join(f"+{word}*" for word in words)
+
+
+def build_search_condition(search_query):
+    """ This function builds the WHERE condition that matches the search query
+
+    Args:
+        search_query (str): The search query
+
+    Returns:
+        tuple: The condition and its values, and the relevance expression and its values (None when searching with LIKE)
+    """
+    fulltext_query = build_fulltext_query(search_query)
+    if fulltext_query is None:
+        return ("(original_description LIKE %s OR fantasy_description LIKE %s)",
+                (f"%{search_query}%", f"%{search_query}%"), None, ())
+
+    condition = "MATCH(original_description, fantasy_description) AGAINST (%s IN BOOLEAN MODE)"
+    return condition, (fulltext_query,), condition, (fulltext_query,)
+
+
+def get_order(body, relevance):
+    """ This function sanitizes and validates order_by and order
+
+    Args:
+        body (dict): The request body with order_by and order
+        relevance (str): The relevance expression, None when the search cannot be ranked
+
+    Returns:
+        tuple: The column to order by and the order direction
+    """
+    # List of allowed columns to order by
+    allowed_order_by = {'creation_date', 'due_date', 'relevance'}
+    # List of allowed order directions
+    allowed_order = {'ASC', 'DESC'}
+
+    order_by = body['order_by'] if body['order_by'] in allowed_order_by else 'id_mission'
+    order = body['order'].upper() if body['order'].upper() in allowed_order else 'ASC'
+
+    if order_by == 'relevance':
+        if relevance is None:
+            return 'id_mission', order
+        # The most relevant missions always come first
+        return order_by, 'DESC'
+    return order_by, order
+
+
+def count_missions(cursor, body, search_condition, search_values):
+    """ This function counts the missions of the user that match the search
+
+    Args:
+        cursor (DictCursor): The cursor to run the query with
+        body (dict): The request body with id_user and status
+        search_condition (str): The condition that matches the search query
+        search_values (tuple): The values of the search condition
+
+    Returns:
+        int: The number of missions
+    """
+    sql = ("SELECT COUNT(*) as total FROM missions "
+           "WHERE id_user=%s "
+           f"AND {search_condition} "
+           "AND status=%s")
+    cursor.execute(sql, (body['id_user'], *search_values, body['status']))
+    return cursor.fetchone()['total']
+
+
 def search_mission(body):
     """ This function searches for a mission in the database with name and/or filters
 
+    Queries long enough for the FULLTEXT index use MATCH ... AGAINST and can be ordered by relevance, shorter ones
+    fall back to LIKE. The existence of the user, the page and the total (COUNT(*) OVER()) come from a single
+    statement: the page is joined to the user row, so an unknown user returns no rows and a user without matching
+    missions returns one row with no mission.
+
     Args:
         body (dict): The body parameter is a dictionary that contains the following attributes:
             - id_user (int): The user id
@@ -128,14 +243,8 @@ def search_mission(body):
     Returns:
         missions (list): A list of missions
     """
-    # List of allowed columns to order by
-    allowed_order_by = {'creation_date', 'due_date'}
-    # List of allowed order directions
-    allowed_order = {'ASC', 'DESC'}
-
-    # Sanitize and validate order_by and order
-    order_by = body['order_by'] if body['order_by'] in allowed_order_by else 'id_mission'
-    order = body['order'].upper() if body['order'].upper() in allowed_order else 'ASC'
+    search_condition, search_values, relevance, relevance_values = build_search_condition(body['search_query'])
+    order_by, order = get_order(body, relevance)
 
     connection = get_db_connection()
     try:
@@ -143,37 +252,180 @@ def search_mission(body):
             limit = body['limit']
             offset = (body['page'] - 1) * limit
 
-            # Get the total number of missions
-            sql = ("SELECT COUNT(*) as total FROM missions "
-                   "WHERE id_user=%s "
-                   "AND (original_description LIKE %s "
-                   "OR fantasy_description LIKE %s) "
-                   "AND status=%s")
-            cursor.execute(sql, (body['id_user'], f"%{body['search_query']}%", f"%{body['search_query']}%",
-                                 body['status']))
-            total = cursor.fetchone()['total']
-
-            # If there are no missions, return an empty list
-            if total == 0:
-                return [], total
-
-            # Get the missions
-            sql = (f"SELECT id_mission, "
+            sql = (f"SELECT users.id_user AS found_user, page.* "
+                   f"FROM users "
+                   f"LEFT JOIN ("
+                   f"SELECT id_mission, "
                    f"original_description, "
                    f"fantasy_description, "
                    f"creation_date, "
                    f"due_date, "
-                   f"status "
+                   f"status, "
+                   f"description_status, "
+                   f"{relevance or 0} AS relevance, "
+                   f"COUNT(*) OVER() AS total "
                    f"FROM missions "
                    f"WHERE id_user=%s "
-                   f"AND (original_description LIKE %s OR fantasy_description LIKE %s) "
+                   f"AND {search_condition} "
                    f"AND status=%s "
                    f"ORDER BY {order_by} {order} "
-                   f"LIMIT %s OFFSET %s")
-            cursor.execute(sql, (body['id_user'], f"%{body['search_query']}%", f"%{body['search_query']}%",
-                                 body['status'], limit, offset)
+                   f"LIMIT %s OFFSET %s"
+                   f") AS page ON TRUE "
+                   f"WHERE users.id_user=%s "
+                   f"ORDER BY page.{order_by} {order}")
+            cursor.execute(sql, (*relevance_values, body['id_user'], *search_values,
+                                 body['status'], limit, offset, body['id_user'])
                            )
-            missions = cursor.fetchall()
+            rows = cursor.fetchall()
+
+            if len(rows) == 0:
+                raise HttpStatusCodeError(404, 'User not found')
+
+            missions = []
+            for row in rows:
+                if row['id_mission'] is None:
+                    continue
+                total = row.pop('total')
+                row.pop('found_user')
+                missions.append(row)
+
+            # A page past the end has no rows to carry the total
+            if len(missions) == 0:
+                total = count_missions(cursor, body, search_condition, search_values) if offset > 0 else 0
+
             return missions, total
     finally:
         connection.close()
+
+
+def encode_cursor(order_by, order, mission):
+    """ This function encodes the position after a mission as an opaque cursor
+
+    Args:
+        order_by (str): The column the results are ordered by
+        order (str): The order direction
+        mission (dict): The last mission of the page
+
+    Returns:
+        str: The cursor
+    """
+    position = {
+        'order_by': order_by,
+        'order': order,
+        'value': mission[order_by],
+        'id_mission': mission['id_mission']
+    }
+    return base64.urlsafe_b64encode(json.dumps(position, default=str).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, order_by, order):
+    """ This function decodes a cursor created by encode_cursor
+
+    Args:
+        cursor (str): The cursor
+        order_by (str): The column the results are ordered by
+        order (str): The order direction
+
+    Returns:
+        dict: The position with the value of order_by and the id_mission of the last mission
+    """
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(position, dict) or not isinstance(position.get('id_mission'), int):
+            raise ValueError('invalid position')
+        value = position['value']
+    except (binascii.Error, UnicodeError, ValueError, KeyError):
+        raise HttpStatusCodeError(400, 'invalid cursor')
+
+    if position.get('order_by') != order_by or position.get('order') != order:
+        raise HttpStatusCodeError(400, 'cursor does not match order_by and order')
+
+    # The value is bound to the keyset predicate, a list or an object would not be a valid SQL value
+    if isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES[order_by]):
+        raise HttpStatusCodeError(400, 'invalid cursor')
+
+    return {'value': value, 'id_mission': position['id_mission']}
+
+
+def search_mission_by_cursor(body):
+    """ This function searches for a mission in the database with keyset pagination
+
+    Instead of skipping rows with OFFSET, the page starts right after the position encoded in the cursor, so deep
+    pages cost the same as the first one. The missions are only counted when include_total is sent.
+
+    Args:
+        body (dict): The body parameter is a dictionary that contains the following attributes:
+            - id_user (int): The user id
+            - search_query (str): The search query
+            - order_by (str): The field to order the results
+            - order (str): The order of the results
+            - status (str): The status of the mission
+            - cursor (str): The cursor of the page, None for the first page
+            - include_total (bool): Whether to count the missions
+            - limit (int): The number of results per page
+
+    Returns:
+        tuple: A list of missions, the total (None if not requested) and the cursor of the next page (None on the
+        last page)
+    """
+    search_condition, search_values, relevance, relevance_values = build_search_condition(body['search_query'])
+    order_by, order = get_order(body, relevance)
+    comparison = '>' if order == 'ASC' else '<'
+    sort_expression = relevance if order_by == 'relevance' else order_by
+    sort_values = relevance_values if order_by == 'relevance' else ()
+
+    keyset_condition = ""
+    keyset_values = ()
+    if body['cursor']:
+        position = decode_cursor(body['cursor'], order_by, order)
+        if order_by == 'id_mission':
+            keyset_condition = f"AND id_mission {comparison} %s "
+            keyset_values = (position['id_mission'],)
+        else:
+            keyset_condition = (f"AND ({sort_expression} {comparison} %s "
+                                f"OR ({sort_expression} = %s AND id_mission {comparison} %s)) ")
+            keyset_values = (*sort_values, position['value'], *sort_values, position['value'],
+                             position['id_mission'])
+
+    order_clause = f"{order_by} {order}" if order_by == 'id_mission' else f"{order_by} {order}, id_mission {order}"
+
+    connection = get_db_connection()
+    try:
+        with connection.cursor(DictCursor) as cursor:
+            limit = body['limit']
+
+            total = None
+            if body.get('include_total', False):
+                total = count_missions(cursor, body, search_condition, search_values)
+                if total == 0:
+                    return [], total, None
+
+            # Get one mission more than the limit to know if there is a next page
+            sql = (f"SELECT id_mission, "
+                   f"original_description, "
+                   f"fantasy_description, "
+                   f"creation_date, "
+                   f"due_date, "
+                   f"status, "
+                   f"description_status, "
+                   f"{relevance or 0} AS relevance "
+                   f"FROM missions "
+                   f"WHERE id_user=%s "
+                   f"AND {search_condition} "
+                   f"AND status=%s "
+                   f"{keyset_condition}"
+                   f"ORDER BY {order_clause} "
+                   f"LIMIT %s")
+            cursor.execute(sql, (*relevance_values, body['id_user'], *search_values, body['status'],
+                                 *keyset_values, limit + 1)
+                           )
+            missions = list(cursor.fetchall())
+    finally:
+        connection.close()
+
+    next_cursor = None
+    if len(missions) > limit:
+        missions = missions[:limit]
+        next_cursor = encode_cursor(order_by, order, missions[-1])
+
+    return missions, total, next_cursor
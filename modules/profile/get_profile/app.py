@@ -1,147 +1,131 @@
 import json
-import boto3
 from pymysql.cursors import DictCursor
-from common.db_connection import get_db_connection
-from botocore.exceptions import ClientError, NoCredentialsError
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.instrumentation import instrumented
+from dudu_common.profile_cache import cache_profile, get_cached_profile
+from dudu_common.progression import get_rewards, resolve_reward
+from dudu_common.responses import get_cors_headers, build_response
 
 
+@instrumented('get_profile')
 def lambda_handler(event, __):
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-    }
+    """ This function returns the profile of a user
+
+    Every response carries an ETag computed from the profile, so a request whose If-None-Match header matches it
+    gets a 304 without a body. The profile is read from the database on every request, since the writes of the user
+    happen in other functions, unless PROFILE_CACHE_TTL opts in to serving it from the container for that long.
+
+    Returns:
+        dict: A dictionary that contains the status code and the profile
+    """
+    headers = get_cors_headers('OPTIONS,POST,GET')
+    headers['Access-Control-Expose-Headers'] = 'ETag'
     try:
         if 'body' not in event:
-            return {
-                'statusCode': 500,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: Body is required"})
-            }
+            return build_response(500, {"message": "Bad request: Body is required"}, headers)
 
         body = json.loads(event['body'])
         profile_id = body.get('id_user')
 
         if profile_id is None:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: ID is required"})
-            }
+            return build_response(400, {"message": "Bad request: ID is required"}, headers)
 
         if not isinstance(profile_id, str):
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: ID must be a string"})
-            }
+            return build_response(400, {"message": "Bad request: ID must be a string"}, headers)
 
         if not profile_id.strip():
-            return {
-                'statusCode': 400,  # Adjusted to 400 for bad request
-                'headers': headers,
-                'body': json.dumps({"message": "Bad request: ID cannot be empty"})
-            }
+            return build_response(400, {"message": "Bad request: ID cannot be empty"}, headers)
 
-        user_found = validate_user(profile_id)
+        cached = get_cached_profile(profile_id)
+        if cached is not None:
+            profile, etag = cached
+        else:
+            profile = get_profile(profile_id)
 
-        if user_found['user_count'] == 0:
-            return {
-                'statusCode': 404,
-                'headers': headers,
-                'body': json.dumps({"message": "User not found"})
-            }
+            if not profile:
+                return build_response(404, {"message": "User not found"}, headers)
 
-        profile = get_profile(profile_id)
+            etag = cache_profile(profile_id, profile)
 
-        if not profile:
+        headers['ETag'] = etag
+        headers['Cache-Control'] = 'private, no-cache'
+
+        if get_if_none_match(event) == etag:
             return {
-                'statusCode': 404,
+                'statusCode': 304,
                 'headers': headers,
-                'body': json.dumps({"message": "No profile information found"})
+                'body': ''
             }
 
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'profile': profile
-            })
-        }
+        return build_response(200, {
+            'profile': profile
+        }, headers)
 
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": f"An error occurred: {str(e)}"})
-        }
+        return build_response(500, {"message": f"An error occurred: {str(e)}"}, headers)
 
-    return response
 
+def get_if_none_match(event):
+    """ This function returns the If-None-Match header of the request
 
-def validate_user(user_id):
-    connection = get_db_connection()
-    try:
-        with connection.cursor(DictCursor) as cursor:
-            sql = """ SELECT COUNT(id_user) as user_count
-                FROM users
-                WHERE id_user = %s
-            """
-            cursor.execute(sql, (user_id,))
-            user_data = cursor.fetchone()
-            return user_data
-    finally:
-        connection.close()
+    Args:
+        event (dict): The API Gateway event
+
+    Returns:
+        str: The ETag sent by the client, None if there is none
+    """
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == 'if-none-match':
+            return value
+    return None
 
 
 def get_profile(user_id):
+    """ This function returns the profile of a user with its current reward and mission counts
+
+    The user, its mission counters and its user_rewards row are read with a single primary key lookup and the
+    reward is resolved against the rewards table cached by the container.
+
+    Args:
+        user_id (str): The user id
+
+    Returns:
+        dict: The profile, None if the user does not exist
+    """
     connection = get_db_connection()
     try:
         with connection.cursor(DictCursor) as cursor:
-            sql = """ SELECT u.id_user, 
-       u.level, 
-       u.current_xp, 
-       u.gender, 
+            # The mission counts come from the counters of the user, kept up to date by every mission change
+            sql = """ SELECT u.id_user,
+       u.level,
+       u.current_xp,
+       u.gender,
        u.username,
        u.xp_limit,
-       r.id_reward, 
-       r.unlock_level, 
-       r.wizard_title,
-       COUNT(CASE WHEN m.status = 'completed' THEN 1 END) AS completed_missions,
-       COUNT(CASE WHEN m.status = 'failed' THEN 1 END) AS failed_missions,
-       COUNT(CASE WHEN m.status = 'canceled' THEN 1 END) AS canceled_missions
+       ur.id_reward,
+       COALESCE(s.completed_missions, 0) AS completed_missions,
+       COALESCE(s.failed_missions, 0) AS failed_missions,
+       COALESCE(s.cancelled_missions, 0) AS canceled_missions,
+       COALESCE(s.pending_missions, 0) AS pending_missions
 FROM dududb.users u
-LEFT JOIN dududb.rewards r ON u.level >= r.unlock_level
-LEFT JOIN dududb.missions m ON u.id_user = m.id_user
+LEFT JOIN dududb.user_mission_stats s ON s.id_user = u.id_user
+LEFT JOIN dududb.user_rewards ur ON ur.id_user = u.id_user
 WHERE u.id_user = %s
-GROUP BY u.id_user, u.level, u.current_xp, u.gender, u.username, r.id_reward, r.unlock_level, r.wizard_title;
+LIMIT 1;
             """
             cursor.execute(sql, (user_id,))
             profile_data = cursor.fetchone()
-            return profile_data
+            if not profile_data:
+                return profile_data
+
+        # The rewards cache is read with a plain cursor, as complete_mission does
+        with connection.cursor() as cursor:
+            rewards = get_rewards(cursor)
     finally:
         connection.close()
 
-
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
+    reward = resolve_reward(rewards, profile_data['level'], profile_data['id_reward'])
+    profile_data['id_reward'] = reward.id_reward if reward else None
+    profile_data['unlock_level'] = reward.unlock_level if reward else None
+    profile_data['wizard_title'] = reward.wizard_title if reward else None
+    return profile_data
@@ -1,18 +1,18 @@
 import json
 import re
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 
-from common.db_connection import get_db_connection
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import get_secret, get_username_from_sub
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('update_profile')
 def lambda_handler(event, context):
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET,PUT,DELETE'
-    }
+    headers = get_cors_headers('OPTIONS,POST,GET,PUT,DELETE')
 
     try:
         body = json.loads(event['body'])
@@ -25,39 +25,19 @@ def lambda_handler(event, context):
         # Actualizar el usuario en la base de datos
         update_user_db(body['id_user'], body['gender'])
 
-        response = {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps("User updated successfully")
-        }
+        response = build_response(200, "User updated successfully", headers)
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'headers': headers,
-            'body': json.dumps({"message": str(e)})
-        }
+        response = build_response(e.status_code, {"message": str(e)}, headers)
 
     except ClientError as e:
-        response = {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": f"AWS Client Error: {str(e)}"})
-        }
+        response = build_response(500, {"message": f"AWS Client Error: {str(e)}"}, headers)
 
     except NoCredentialsError as e:
-        response = {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": f"Credentials Error: {str(e)}"})
-        }
+        response = build_response(500, {"message": f"Credentials Error: {str(e)}"}, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({"message": f"An unexpected error occurred: {str(e)}"})
-        }
+        response = build_response(500, {"message": f"An unexpected error occurred: {str(e)}"}, headers)
 
     return response
 
@@ -114,46 +94,8 @@ def validate_body(body):
     return True
 
 
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret from AWS Secrets Manager: " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "AWS Credentials Error: " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-
-def get_username_from_sub(sub, user_pool_id):
-    client = boto3.client('cognito-idp', region_name='us-east-2')
-
-    # Obtén la lista de usuarios en el User Pool
-    response = client.list_users(
-        UserPoolId=user_pool_id,
-        Filter=f'sub="{sub}"'
-    )
-
-    if response['Users']:
-        return response['Users'][0]['Username']
-    else:
-        raise Exception("User not found")
-
-
 def update_cognito_user(sub, body, secrets):
-    client = boto3.client('cognito-idp', region_name='us-east-2')
+    client = get_cognito_client()
     user_pool_id = secrets['USER_POOL_ID']
 
     # Obtén el nombre de usuario basado en el sub
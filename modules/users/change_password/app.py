@@ -1,80 +1,45 @@
-import boto3
 import json
 from botocore.exceptions import ClientError
-from common.common_functions import get_secret, get_secret_hash
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import call_with_secret_hash
+from dudu_common.instrumentation import instrumented
+from dudu_common.responses import get_cors_headers, build_response
 
 
+@instrumented('change_password')
 def lambda_handler(event, context):
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST'
-    }
+    headers = get_cors_headers('OPTIONS,POST')
 
-    client = boto3.client('cognito-idp')
-    secrets = get_secret()
+    client = get_cognito_client()
     body = json.loads(event['body'])
     username = body['username']
     confirmation_code = body['confirmation_code']
     new_password = body['new_password']
     confirm_new_password = body['confirm_new_password']
 
-    client_id = secrets['ID_CLIENT']
-    client_secret = secrets['SECRET_CLIENT']
-
     if new_password != confirm_new_password:
-        return {
-            'statusCode': 400,
-            'body': json.dumps('New password and confirmation password do not match.'),
-            'headers': headers
-        }
+        return build_response(400, 'New password and confirmation password do not match.', headers)
 
     try:
-        secret_hash = get_secret_hash(username, client_id, client_secret)
-
-        response = client.confirm_forgot_password(
-            ClientId=client_id,
+        response = call_with_secret_hash(username, lambda secrets, secret_hash: client.confirm_forgot_password(
+            ClientId=secrets['ID_CLIENT'],
             Username=username,
             ConfirmationCode=confirmation_code,
             Password=new_password,
             SecretHash=secret_hash
-        )
+        ))
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps('Password has been reset successfully.'),
-            'headers': headers
-        }
+        return build_response(200, 'Password has been reset successfully.', headers)
 
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == 'CodeMismatchException':
-            return {
-                'statusCode': 400,
-                'body': json.dumps('Invalid confirmation code.'),
-                'headers': headers
-            }
+            return build_response(400, 'Invalid confirmation code.', headers)
         elif error_code == 'ExpiredCodeException':
-            return {
-                'statusCode': 400,
-                'body': json.dumps('Confirmation code has expired.'),
-                'headers': headers
-            }
+            return build_response(400, 'Confirmation code has expired.', headers)
         elif error_code == 'InvalidPasswordException':
-            return {
-                'statusCode': 400,
-                'body': json.dumps('Invalid password.'),
-                'headers': headers
-            }
+            return build_response(400, 'Invalid password.', headers)
         elif error_code == 'UserNotFoundException':
-            return {
-                'statusCode': 404,
-                'body': json.dumps('User not found.'),
-                'headers': headers
-            }
+            return build_response(404, 'User not found.', headers)
         else:
-            return {
-                'statusCode': 500,
-                'body': json.dumps('An error occurred while resetting the password: ' + str(e)),
-                'headers': headers
-            }
+            return build_response(500, 'An error occurred while resetting the password: ' + str(e), headers)
@@ -1,9 +1,12 @@
 import json
 
-from common.httpStatusCodeError import HttpStatusCodeError
-from common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('exist_user')
 def lambda_handler(event, ___):
     """
     This function checks if a user exists only in the database
@@ -13,6 +16,8 @@ def lambda_handler(event, ___):
 
     exist_user is only to alexa skill
     """
+    headers = get_cors_headers('OPTIONS,POST,GET')
+
     try:
         body = json.loads(event['body'])
 
@@ -26,35 +31,15 @@ def lambda_handler(event, ___):
 
         response = {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
+            'headers': headers,
             'body': True
         }
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
-            'body': json.dumps(e.message)
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-            },
-            'body': json.dumps(str(e)),
-        }
+        response = build_response(500, str(e), headers)
 
     return response
 
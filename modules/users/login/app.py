@@ -1,70 +1,65 @@
-import hmac
-import boto3
-import hashlib
 import json
-import base64
-from botocore.exceptions import ClientError, NoCredentialsError
+from botocore.exceptions import ClientError
 
-from .common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import call_with_secret_hash, get_token_claims
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
+# Cognito errors of users whose temporary password has not been changed yet
+MUST_CHANGE_PASSWORD_ERRORS = ('UserNotConfirmedException', 'PasswordResetRequiredException')
 
+
+@instrumented('login')
 def lambda_handler(event, ___):
+    """ This function logs a user in with a single Cognito call
+
+    initiate_auth is called right away. The user status is only looked at when Cognito answers with a challenge or
+    an error, and the email verification is read by name from the claims of the id token.
+
+    Returns:
+        dict: A dictionary that contains the status code and the tokens
+    """
 
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST,GET'
-    }
+    headers = get_cors_headers('OPTIONS,POST,GET')
 
     try:
         body = json.loads(event['body'])
         validate_body(body)
 
-        secrets = get_secret()
-
-        verify_user(body['username'], secrets)
-
-        client = boto3.client('cognito-idp', region_name='us-east-2')
-        client_id = secrets['ID_CLIENT']
-        client_secret = secrets['SECRET_CLIENT']
-
-        secret_hash = get_secret_hash(body['username'], client_id, client_secret)
-
-        tokens = client.initiate_auth(
-            AuthFlow='USER_PASSWORD_AUTH',
-            AuthParameters={
-                'USERNAME': body['username'],
-                'PASSWORD': body['password'],
-                'SECRET_HASH': secret_hash
-            },
-            ClientId=client_id
-        )
-
-        response = {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'id_token': tokens['AuthenticationResult']['IdToken'],
-                'access_token': tokens['AuthenticationResult']['AccessToken'],
-                'refresh_token': tokens['AuthenticationResult']['RefreshToken'],
-                'username': body['username']
-            })
-        }
+        client = get_cognito_client()
+
+        try:
+            tokens = call_with_secret_hash(body['username'], lambda secrets, secret_hash: client.initiate_auth(
+                AuthFlow='USER_PASSWORD_AUTH',
+                AuthParameters={
+                    'USERNAME': body['username'],
+                    'PASSWORD': body['password'],
+                    'SECRET_HASH': secret_hash
+                },
+                ClientId=secrets['ID_CLIENT']
+            ))
+        except ClientError as e:
+            # Users that are not confirmed or must reset their password are told to change it, as before
+            if e.response.get('Error', {}).get('Code') in MUST_CHANGE_PASSWORD_ERRORS:
+                raise HttpStatusCodeError(200, "MUST CHANGE TEMPORARY PASSWORD")
+            raise
+
+        verify_tokens(tokens)
+
+        response = build_response(200, {
+            'id_token': tokens['AuthenticationResult']['IdToken'],
+            'access_token': tokens['AuthenticationResult']['AccessToken'],
+            'refresh_token': tokens['AuthenticationResult']['RefreshToken'],
+            'username': body['username']
+        }, headers)
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'headers': headers,
-            'body': json.dumps(e.message)
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 401,
-            'headers': headers,
-            'body': json.dumps('User or password incorrect')
-
-        }
+        response = build_response(401, 'User or password incorrect', headers)
 
     return response
 
@@ -96,50 +91,24 @@ def validate_body(body):
     return True
 
 
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
+def verify_tokens(tokens):
+    """ This function checks the answer of initiate_auth
 
-def verify_user(username, secrets):
-    client = boto3.client('cognito-idp', region_name='us-east-2')
-    user_pool_id = secrets['USER_POOL_ID']
+    A challenge (NEW_PASSWORD_REQUIRED for a temporary password) or an id token whose email_verified claim is not
+    true means the user still has to change the temporary password. A token without the claim is not verified, as
+    admin_get_user refused the users that were not explicitly marked verified.
 
-    user = client.admin_get_user(
-        UserPoolId=user_pool_id,
-        Username=username
-    )
-
-    email_verified = user['UserAttributes'][1]['Value']
-    user_status = user['UserStatus']
+    Args:
+        tokens (dict): The response of initiate_auth
 
-    if str.lower(email_verified) != 'true':
+    Returns:
+        bool: True if the user can log in
+    """
+    if tokens.get('ChallengeName') or 'AuthenticationResult' not in tokens:
         raise HttpStatusCodeError(200, "MUST CHANGE TEMPORARY PASSWORD")
-    if user_status != 'CONFIRMED':
+
+    email_verified = get_token_claims(tokens['AuthenticationResult']['IdToken']).get('email_verified', False)
+    if str(email_verified).lower() != 'true':
         raise HttpStatusCodeError(200, "MUST CHANGE TEMPORARY PASSWORD")
 
     return True
-
-
-def get_secret_hash(username, client_id, client_secret):
-    message = username + client_id
-    dig = hmac.new(client_secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
@@ -1,18 +1,14 @@
-import boto3
 import json
-import base64
-import hashlib
-import hmac
-from botocore.exceptions import ClientError, NoCredentialsError
-from common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import call_with_secret_hash, get_secret
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('recover_password')
 def lambda_handler(event, context):
-    headers = {
-        'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'OPTIONS,POST'
-    }
+    headers = get_cors_headers('OPTIONS,POST')
 
     try:
         body = json.loads(event['body'])
@@ -22,41 +18,25 @@ def lambda_handler(event, context):
 
         verify_user(body['username'], secrets)
 
-        client = boto3.client('cognito-idp', region_name='us-east-2')
-        client_id = secrets['ID_CLIENT']
-        client_secret = secrets['SECRET_CLIENT']
+        client = get_cognito_client()
 
-        secret_hash = get_secret_hash(body['username'], client_id, client_secret)
-
-        response = client.forgot_password(
-            ClientId=client_id,
+        response = call_with_secret_hash(body['username'], lambda secrets, secret_hash: client.forgot_password(
+            ClientId=secrets['ID_CLIENT'],
             Username=body['username'],
             SecretHash=secret_hash
-        )
+        ))
 
         response['headers'] = headers
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps('A code to reset your password was sent to your email'),
-            'headers': headers
-        }
+        return build_response(200, 'A code to reset your password was sent to your email', headers)
     except HttpStatusCodeError as e:
-        return {
-            'statusCode': e.status_code,
-            'body': json.dumps(str(e)),
-            'headers': headers
-        }
+        return build_response(e.status_code, str(e), headers)
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps('An error occurred: ' + str(e)),
-            'headers': headers
-        }
+        return build_response(500, 'An error occurred: ' + str(e), headers)
 
 
 def verify_user(username, secrets):
-    client = boto3.client('cognito-idp', region_name='us-east-2')
+    client = get_cognito_client()
     user_pool_id = secrets['USER_POOL_ID']
 
     user = client.admin_get_user(
@@ -75,29 +55,6 @@ def verify_user(username, secrets):
     return True
 
 
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-
 def validate_body(body):
     """
     Validate payload
@@ -116,9 +73,3 @@ def validate_body(body):
         raise HttpStatusCodeError(400, "Username must be a string")
 
     return True
-
-
-def get_secret_hash(username, client_id, client_secret):
-    message = username + client_id
-    dig = hmac.new(client_secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
@@ -1,9 +1,13 @@
 import json
 
-from common.httpStatusCodeError import HttpStatusCodeError
-from common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.progression import BASIC_REWARD_ID, get_reward_titles
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('register_alexa_user')
 def lambda_handler(event, ___):
     """
     This function registers a user in the database and gives basic rewards
@@ -17,50 +21,26 @@ def lambda_handler(event, ___):
 
     exist_user is only to alexa skill
     """
+    headers = get_cors_headers('OPTIONS,POST')
+
     try:
         body = json.loads(event['body'])
 
         validate_body(body)
 
-        # Save user on DB
-        save_user_db(body['id_user'], body['username'], 'M')
-
-        # Give basic rewards
-        give_basic_rewards(body['id_user'])
-
-        # Get first title
-        first_title = get_first_title()
+        # Save user and basic rewards on DB and get the first title
+        first_title = register_user_db(body['id_user'], body['username'], 'M')
 
         response = {
             'statusCode': 200,
-            'body': first_title[0],
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
+            'body': first_title,
+            'headers': headers,
         }
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'body': json.dumps(str(e.message)),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
-        }
+        response = build_response(e.status_code, str(e.message), headers)
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
-            'body': json.dumps(str(e)),
-        }
+        response = build_response(500, str(e), headers)
 
     return response
 
@@ -89,47 +69,60 @@ def validate_body(body):
     return True
 
 
-def save_user_db(id_user, username, gender):
+def register_user_db(id_user, username, gender):
+    """ This function saves the user and its basic rewards and gets the first title with one connection and one
+    transaction, so a failed reward insert does not leave the user without rewards
+
+    Args:
+        id_user (str): The user of alexa
+        username (str): The username
+        gender (str): M or F
+
+    Returns:
+        str: The wizard title of the basic reward
+    """
     connection = get_db_connection()
 
     try:
         with connection.cursor() as cursor:
-            sql = "INSERT INTO users (id_user, username, gender) VALUES (%s, %s, %s)"
-            cursor.execute(sql, (id_user, username, gender))
+            save_user_db(cursor, id_user, username, gender)
+            give_basic_rewards(cursor, id_user)
+            first_title = get_first_title(cursor)
         connection.commit()
-    except Exception as e:
-        raise HttpStatusCodeError(500, "Error inserting user")
+    except Exception:
+        connection.rollback()
+        raise
     finally:
         connection.close()
 
-    return True
+    return first_title
 
 
-def give_basic_rewards(id_user):
-    connection = get_db_connection()
+def save_user_db(cursor, id_user, username, gender):
+    try:
+        sql = "INSERT INTO users (id_user, username, gender) VALUES (%s, %s, %s)"
+        cursor.execute(sql, (id_user, username, gender))
+    except Exception as e:
+        raise HttpStatusCodeError(500, "Error inserting user")
+
+    return True
+
 
+def give_basic_rewards(cursor, id_user):
     try:
-        with connection.cursor() as cursor:
-            sql = "INSERT INTO user_rewards (id_user, id_reward) VALUES (%s, 1)"
-            cursor.execute(sql, id_user)
-        connection.commit()
+        sql = "INSERT INTO user_rewards (id_user, id_reward) VALUES (%s, %s)"
+        cursor.execute(sql, (id_user, BASIC_REWARD_ID))
     except Exception as e:
         raise HttpStatusCodeError(500, "Error giving basic rewards")
-    finally:
-        connection.close()
     return True
 
 
-def get_first_title():
-    connection = get_db_connection()
-
+def get_first_title(cursor):
+    # The rewards table is read once per warm container
     try:
-        with connection.cursor() as cursor:
-            sql = "SELECT wizard_title FROM rewards WHERE id_reward = 1"
-            cursor.execute(sql)
-            result = cursor.fetchone()
+        first_title = get_reward_titles(cursor).get(BASIC_REWARD_ID)
     except Exception as e:
         raise HttpStatusCodeError(500, "Error getting first title")
-    finally:
-        connection.close()
-    return result
+    if first_title is None:
+        raise HttpStatusCodeError(500, "Error getting first title")
+    return first_title
@@ -3,14 +3,19 @@ import re
 import string
 import random
 
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
-
-from common.httpStatusCodeError import HttpStatusCodeError
-from common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import get_secret
+from dudu_common.db_connection import get_db_connection
+from dudu_common.progression import BASIC_REWARD_ID
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('register_user')
 def lambda_handler(event, ___):
+    headers = get_cors_headers('OPTIONS,POST')
+
     try:
         body = json.loads(event['body'])
 
@@ -26,42 +31,15 @@ def lambda_handler(event, ___):
         # Save user on AWS Cognito
         id_user = save_user_cognito(body, secrets)
 
-        # Save user on DB
-        save_user_db(id_user, body['gender'])
+        # Save user and basic rewards on DB
+        register_user_db(id_user, body['username'], body['gender'])
 
-        # Give basic rewards
-        give_basic_rewards(id_user)
-
-        response = {
-            'statusCode': 200,
-            'body': json.dumps("User registered successfully"),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
-        }
+        response = build_response(200, "User registered successfully", headers)
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'body': json.dumps(e.message),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
-        }
+        response = build_response(e.status_code, e.message, headers)
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            },
-            'body': json.dumps("An unexpected error occurred: " + str(e)),
-        }
+        response = build_response(500, "An unexpected error occurred: " + str(e), headers)
 
     return response
 
@@ -128,31 +106,8 @@ def generate_temporary_password(length=12):
             return password
 
 
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-
 def save_user_cognito(body, secrets):
-    client = boto3.client('cognito-idp', region_name='us-east-2')
+    client = get_cognito_client()
     user_pool_id = secrets['USER_POOL_ID']
 
     response = client.admin_create_user(
@@ -170,31 +125,44 @@ def save_user_cognito(body, secrets):
     return response['User']['Attributes'][1]['Value']
 
 
-def save_user_db(id_user, gender):
+def register_user_db(id_user, cognito_username, gender):
+    """ This function saves the user and its basic rewards with one connection and one transaction, so a failed
+    reward insert does not leave the user without rewards
+
+    Args:
+        id_user (str): The Cognito sub of the user
+        cognito_username (str): The Cognito username
+        gender (str): M or F
+    """
     connection = get_db_connection()
 
     try:
         with connection.cursor() as cursor:
-            sql = "INSERT INTO users (id_user, gender) VALUES (%s, %s)"
-            cursor.execute(sql, (id_user, gender))
+            save_user_db(cursor, id_user, cognito_username, gender)
+            give_basic_rewards(cursor, id_user)
         connection.commit()
-    except Exception as e:
-        raise HttpStatusCodeError(500, "Error inserting user")
+    except Exception:
+        connection.rollback()
+        raise
     finally:
         connection.close()
     return True
 
 
-def give_basic_rewards(id_user):
-    connection = get_db_connection()
+def save_user_db(cursor, id_user, cognito_username, gender):
+    try:
+        # The Cognito username is kept so profile updates and deletions do not need ListUsers
+        sql = "INSERT INTO users (id_user, cognito_username, gender) VALUES (%s, %s, %s)"
+        cursor.execute(sql, (id_user, cognito_username, gender))
+    except Exception as e:
+        raise HttpStatusCodeError(500, "Error inserting user")
+    return True
+
 
+def give_basic_rewards(cursor, id_user):
     try:
-        with connection.cursor() as cursor:
-            sql = "INSERT INTO user_rewards (id_user, id_reward) VALUES (%s, 1)"
-            cursor.execute(sql, id_user)
-        connection.commit()
+        sql = "INSERT INTO user_rewards (id_user, id_reward) VALUES (%s, %s)"
+        cursor.execute(sql, (id_user, BASIC_REWARD_ID))
     except Exception as e:
         raise HttpStatusCodeError(500, "Error giving basic rewards")
-    finally:
-        connection.close()
     return True
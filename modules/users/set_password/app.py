@@ -1,15 +1,16 @@
-import base64
-import hashlib
-import hmac
 import json
 import re
-import boto3
-
-from common.httpStatusCodeError import HttpStatusCodeError
-from botocore.exceptions import ClientError, NoCredentialsError
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import get_cognito_client
+from dudu_common.cognito import get_secret, get_secret_hash
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('set_password')
 def lambda_handler(event, context):
+    headers = get_cors_headers('OPTIONS,POST')
+
     try:
         body = json.loads(event['body'])
         validate_body(body)
@@ -18,33 +19,13 @@ def lambda_handler(event, context):
 
         response = set_password(body, secrets)
 
-        response['headers'] = {
-            'Access-Control-Allow-Headers': '*',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'OPTIONS,POST'
-        }
+        response['headers'] = headers
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'body': json.dumps(e.message),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            }
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'body': json.dumps(str(e)),
-            'headers': {
-                'Access-Control-Allow-Headers': '*',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'OPTIONS,POST'
-            }
-        }
+        response = build_response(500, str(e), headers)
 
     return response
 
@@ -88,32 +69,9 @@ def validate_body(body):
     return True
 
 
-def get_secret():
-    secret_name = "users_pool/client_secret2"
-    region_name = "us-east-2"
-
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name
-    )
-
-    try:
-        get_secret_value_response = client.get_secret_value(
-            SecretId=secret_name
-        )
-    except ClientError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-    except NoCredentialsError as e:
-        raise HttpStatusCodeError(500, "Error getting secret -> " + str(e))
-
-    secret = get_secret_value_response['SecretString']
-    return json.loads(secret)
-
-
 def set_password(body, secrets):
     try:
-        client = boto3.client('cognito-idp', region_name='us-east-2')
+        client = get_cognito_client()
 
         user_pool_id = secrets['USER_POOL_ID']
         client_id = secrets['ID_CLIENT']
@@ -182,9 +140,3 @@ def set_password(body, secrets):
 
     except Exception as e:
         raise HttpStatusCodeError(500, str(e))
-
-
-def get_secret_hash(username, client_id, client_secret):
-    message = username + client_id
-    dig = hmac.new(client_secret.encode('utf-8'), message.encode('utf-8'), hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
@@ -1,15 +1,14 @@
 import json
 
-from .common.httpStatusCodeError import HttpStatusCodeError
-from .common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.responses import get_cors_headers, build_response
+from dudu_common.instrumentation import instrumented
 
 
+@instrumented('update_alexa_user')
 def lambda_handler(event, ___):
-    headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'POST, OPTIONS, GET, PUT, DELETE',
-        'Access-Control-Allow-Headers': 'Content-Type',
-    }
+    headers = get_cors_headers('POST, OPTIONS, GET, PUT, DELETE', 'Content-Type')
 
     """
         This function checks if a user exists only in the database
@@ -35,18 +34,10 @@ def lambda_handler(event, ___):
         }
 
     except HttpStatusCodeError as e:
-        response = {
-            'statusCode': e.status_code,
-            'headers': headers,
-            'body': json.dumps(e.message)
-        }
+        response = build_response(e.status_code, e.message, headers)
 
     except Exception as e:
-        response = {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps(str(e)),
-        }
+        response = build_response(500, str(e), headers)
 
     return response
 
@@ -0,0 +1,46 @@
+import json
+import unittest
+from unittest import TestCase
+from unittest.mock import patch
+from modules.api import app
+
+
+class TestApiRouter(TestCase):
+    @patch('modules.missions.search_mission.app.lambda_handler')
+    def test_route_is_dispatched_to_its_handler(self, mock_lambda_handler):
+        mock_lambda_handler.return_value = {'statusCode': 200, 'headers': {}, 'body': '[]'}
+        event = {'httpMethod': 'POST', 'path': '/search_mission', 'body': '{}'}
+
+        response = app.lambda_handler(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        mock_lambda_handler.assert_called_once_with(event, None)
+
+    @patch('modules.users.recover_password.app.lambda_handler')
+    def test_trailing_slash_is_ignored(self, mock_lambda_handler):
+        mock_lambda_handler.return_value = {'statusCode': 200, 'headers': {}, 'body': '""'}
+
+        app.lambda_handler({'httpMethod': 'POST', 'path': '/recover_password/', 'body': '{}'}, None)
+        app.lambda_handler({'httpMethod': 'POST', 'path': '/recover_password', 'body': '{}'}, None)
+
+        self.assertEqual(mock_lambda_handler.call_count, 2)
+
+    def test_wrong_method(self):
+        response = app.lambda_handler({'httpMethod': 'GET', 'path': '/complete_mission'}, None)
+
+        self.assertEqual(response['statusCode'], 405)
+        self.assertEqual(response['headers']['Access-Control-Allow-Methods'], 'OPTIONS,PUT')
+
+    def test_unknown_route(self):
+        response = app.lambda_handler({'httpMethod': 'POST', 'path': '/unknown'}, None)
+
+        self.assertEqual(response['statusCode'], 404)
+        self.assertEqual(json.loads(response['body']), 'Route /unknown not found')
+
+    def test_every_route_has_a_handler(self):
+        for route, module in app.MODULES.items():
+            self.assertTrue(callable(module.lambda_handler), route)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from modules.missions.bulk_insert_missions import app
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+
+MISSION = {
+    'original_description': 'alimentar a mi perro',
+    'creation_date': '2022-01-01',
+    'due_date': '2022-01-02',
+    'status': 'pending'
+}
+
+
+def build_event(missions, id_user=1):
+    return {'body': json.dumps({'id_user': id_user, 'missions': missions})}
+
+
+class Test(unittest.TestCase):
+
+    @patch('modules.missions.bulk_insert_missions.app.insert_missions')
+    @patch('modules.missions.bulk_insert_missions.app.store_fantasy_description')
+    @patch('modules.missions.bulk_insert_missions.app.get_openai_batch')
+    @patch('modules.missions.bulk_insert_missions.app.get_cached_fantasy_descriptions')
+    @patch('modules.missions.bulk_insert_missions.app.validate_user')
+    def test_success_lambda_handler(self, mock_validate_user, mock_get_cached, mock_get_openai_batch,
+                                    mock_store_fantasy_description, mock_insert_missions):
+        mock_validate_user.return_value = True
+        mock_get_cached.return_value = ['bestia cacheada', None, None]
+        mock_get_openai_batch.return_value = ['gremio de magos', None]
+
+        missions = [
+            MISSION,
+            dict(MISSION, original_description='jugar con amigos'),
+            dict(MISSION, original_description='buscar trabajo')
+        ]
+        response = app.lambda_handler(build_event(missions), None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'missions': [
+            {'index': 0, 'fantasy_description': 'bestia cacheada', 'description_status': 'ready'},
+            {'index': 1, 'fantasy_description': 'gremio de magos', 'description_status': 'ready'},
+            {'index': 2, 'fantasy_description': '', 'description_status': 'pending'}
+        ]})
+        mock_get_cached.assert_called_once_with(['alimentar a mi perro', 'jugar con amigos', 'buscar trabajo'])
+        mock_get_openai_batch.assert_called_once_with(['jugar con amigos', 'buscar trabajo'])
+        mock_store_fantasy_description.assert_called_once_with('jugar con amigos', 'gremio de magos')
+        self.assertEqual(len(mock_insert_missions.call_args.args[1]), 3)
+
+    @patch('modules.missions.bulk_insert_missions.app.insert_missions')
+    @patch('modules.missions.bulk_insert_missions.app.add_fantasy_descriptions')
+    @patch('modules.missions.bulk_insert_missions.app.validate_user')
+    def test_invalid_missions_are_reported(self, mock_validate_user, mock_add_fantasy_descriptions,
+                                           mock_insert_missions):
+        mock_validate_user.return_value = True
+
+        def add_fantasy_descriptions(missions):
+            for mission in missions:
+                mission['fantasy_description'] = 'mision'
+                mission['description_status'] = 'ready'
+        mock_add_fantasy_descriptions.side_effect = add_fantasy_descriptions
+
+        missions = [dict(MISSION, status='invalid'), MISSION, dict(MISSION, due_date='02/01/2022')]
+        response = app.lambda_handler(build_event(missions), None)
+
+        results = json.loads(response['body'])['missions']
+        self.assertEqual(results[0], {'index': 0, 'error': 'Invalid status'})
+        self.assertEqual(results[1]['description_status'], 'ready')
+        self.assertEqual(results[2], {'index': 2, 'error': 'Incorrect due_date format, should be YYYY-MM-DD'})
+        self.assertEqual(len(mock_insert_missions.call_args.args[1]), 1)
+
+    @patch('modules.missions.bulk_insert_missions.app.validate_user')
+    def test_no_valid_missions(self, mock_validate_user):
+        mock_validate_user.return_value = True
+
+        response = app.lambda_handler(build_event([dict(MISSION, original_description='')]), None)
+
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(response['body'], '"No valid missions"')
+
+    def test_missions_is_required(self):
+        response = app.lambda_handler({'body': json.dumps({'id_user': 1})}, None)
+        self.assertEqual(response['body'], '"missions is required"')
+
+    def test_too_many_missions(self):
+        response = app.lambda_handler(build_event([MISSION] * (app.MAX_MISSIONS + 1)), None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('modules.missions.bulk_insert_missions.app.get_db_connection')
+    def test_validate_user_not_found(self, mock_get_db_connection):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = []
+
+        response = app.lambda_handler(build_event([MISSION]), None)
+        self.assertEqual(response['statusCode'], 404)
+
+    @patch('modules.missions.bulk_insert_missions.app.get_openai_batch')
+    @patch('modules.missions.bulk_insert_missions.app.get_cached_fantasy_descriptions')
+    def test_failed_batch_leaves_missions_pending(self, mock_get_cached, mock_get_openai_batch):
+        mock_get_cached.return_value = [None, None]
+        mock_get_openai_batch.side_effect = HttpStatusCodeError(500, 'Error getting openai client')
+        missions = [dict(MISSION), dict(MISSION)]
+
+        app.add_fantasy_descriptions(missions)
+
+        self.assertEqual([mission['description_status'] for mission in missions], ['pending', 'pending'])
+
+    @patch('modules.missions.bulk_insert_missions.app.get_db_connection')
+    def test_insert_missions_uses_executemany(self, mock_get_db_connection):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        missions = [dict(MISSION, fantasy_description='uno', description_status='ready'),
+                    dict(MISSION, fantasy_description='', description_status='pending')]
+
+        inserted = app.insert_missions(1, missions)
+
+        self.assertEqual(inserted, 2)
+        _, rows = mock_cursor.executemany.call_args_list[0].args
+        self.assertEqual(rows[1], ('alimentar a mi perro', '', '2022-01-01', 'pending', '2022-01-02', 1, 'pending'))
+        sql, stats = mock_cursor.executemany.call_args.args
+        self.assertIn('INSERT INTO user_mission_stats', sql)
+        self.assertEqual(stats, [(1, 2, 0, 0, 0, 0)])
+        mock_connection.commit.assert_called_once()
+
+    @patch('modules.missions.bulk_insert_missions.app.get_db_connection')
+    def test_insert_missions_exception(self, mock_get_db_connection):
+        mock_get_db_connection.return_value.cursor.side_effect = Exception('Error')
+
+        with self.assertRaises(HttpStatusCodeError) as context:
+            app.insert_missions(1, [dict(MISSION, fantasy_description='uno', description_status='ready')])
+
+        self.assertEqual(context.exception.message, 'Error inserting missions')
+
+
+if __name__ == '__main__':
+    unittest.main()
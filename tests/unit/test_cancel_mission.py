@@ -3,7 +3,7 @@ import unittest
 from unittest.mock import patch, MagicMock
 from modules.missions.cancel_mission import app
 from modules.missions.cancel_mission.app import validate_body, validate_user, cancel_mission, lambda_handler
-from modules.missions.cancel_mission.common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
 
 
 class TestCancelMission(unittest.TestCase):
@@ -128,6 +128,12 @@ class TestCancelMission(unittest.TestCase):
                 def fetchall(self):
                     pass
 
+                def fetchone(self):
+                    return ('pending',)
+
+                def executemany(self, sql, params):
+                    pass
+
                 def rowcount(self):
                     return 1  # Simula una actualización exitosa
 
@@ -170,7 +176,7 @@ class TestCancelMission(unittest.TestCase):
     def test_cancel_mission_not_found(self, mock_get_db_connection):
         # Simular el cursor
         mock_cursor = MagicMock()
-        mock_cursor.rowcount = 0  # Simula que la misión no se encuentra
+        mock_cursor.fetchone.return_value = None  # Simula que la misión no se encuentra
 
         # Simular la conexión y el cursor
         mock_connection = MagicMock()
@@ -188,6 +194,21 @@ class TestCancelMission(unittest.TestCase):
 
         self.assertEqual(context.exception.args, (404, "Mission not found or user unauthorized to cancel"))
 
+    @patch('modules.missions.cancel_mission.app.get_db_connection')
+    def test_cancel_mission_updates_stats(self, mock_get_db_connection):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = ('pending',)
+        mock_connection = MagicMock()
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_db_connection.return_value = mock_connection
+
+        cancel_mission(1, 'user')
+
+        sql, rows = mock_cursor.executemany.call_args.args
+        self.assertIn('INSERT INTO user_mission_stats', sql)
+        self.assertEqual(rows, [('user', -1, 0, 0, 0, 1)])
+        mock_connection.commit.assert_called_once()
+
 
     @patch('modules.missions.cancel_mission.app.validate_body')
     @patch('modules.missions.cancel_mission.app.validate_user')
@@ -3,7 +3,9 @@ import unittest
 from unittest.mock import patch
 from botocore.exceptions import ClientError
 from modules.users.change_password.app import lambda_handler
-from modules.users.change_password.common.common_functions import get_secret_value
+from dudu_common.secrets_cache import get_secret_value
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 
 
 class FakeSecretsManagerClient:
@@ -41,11 +43,13 @@ class FakeSession:
 class TestLambdaHandler(unittest.TestCase):
 
     def setUp(self):
+        invalidate_secret()
+        clear_clients()
         self.patcher_boto_session = patch('boto3.session.Session', return_value=FakeSession())
         self.mock_boto_session = self.patcher_boto_session.start()
 
-        self.patcher_get_secret = patch('modules.users.change_password.common.common_functions.get_secret')
-        self.patcher_get_secret_hash = patch('modules.users.change_password.common.common_functions.get_secret_hash')
+        self.patcher_get_secret = patch('dudu_common.cognito.get_secret')
+        self.patcher_get_secret_hash = patch('dudu_common.cognito.get_secret_hash')
 
         self.mock_get_secret = self.patcher_get_secret.start()
         self.mock_get_secret_hash = self.patcher_get_secret_hash.start()
@@ -61,7 +65,7 @@ class TestLambdaHandler(unittest.TestCase):
         self.patcher_get_secret.stop()
         self.patcher_get_secret_hash.stop()
 
-    @patch('modules.users.change_password.common.common_functions.boto3.client')
+    @patch('dudu_common.aws_clients.boto3.client')
     def test_get_secrets_client_error(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         mock_client_instance.get_secret_value.side_effect = ClientError(
@@ -72,7 +76,7 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(context.exception.response['Error']['Code'], 'ResourceNotFoundException')
 
     def test_successful_password_reset(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             event = {
                 'body': json.dumps({
                     'username': 'testuser',
@@ -88,7 +92,7 @@ class TestLambdaHandler(unittest.TestCase):
             self.assertEqual(json.loads(response['body']), 'Password has been reset successfully.')
 
     def test_code_mismatch_exception(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             with patch.object(FakeCognitoIdpClient, 'confirm_forgot_password', side_effect=ClientError(
                     {'Error': {'Code': 'CodeMismatchException', 'Message': 'The code passed is incorrect.'}},
                     'ConfirmForgotPassword'
@@ -109,7 +113,7 @@ class TestLambdaHandler(unittest.TestCase):
                 self.assertEqual(json.loads(response['body']), 'Invalid confirmation code.')
 
     def test_password_mismatch(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             event = {
                 'body': json.dumps({
                     'username': 'testuser',
@@ -126,7 +130,7 @@ class TestLambdaHandler(unittest.TestCase):
             self.assertEqual(json.loads(response['body']), 'New password and confirmation password do not match.')
 
     def test_expired_code_exception(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             with patch.object(FakeCognitoIdpClient, 'confirm_forgot_password', side_effect=ClientError(
                     {'Error': {'Code': 'ExpiredCodeException', 'Message': 'The confirmation code has expired.'}},
                     'ConfirmForgotPassword'
@@ -147,7 +151,7 @@ class TestLambdaHandler(unittest.TestCase):
                 self.assertEqual(json.loads(response['body']), 'Confirmation code has expired.')
 
     def test_invalid_password_exception(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             with patch.object(FakeCognitoIdpClient, 'confirm_forgot_password', side_effect=ClientError(
                     {'Error': {'Code': 'InvalidPasswordException', 'Message': 'The password provided is invalid.'}},
                     'ConfirmForgotPassword'
@@ -168,7 +172,7 @@ class TestLambdaHandler(unittest.TestCase):
                 self.assertEqual(json.loads(response['body']), 'Invalid password.')
 
     def test_user_not_found_exception(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             # Simulamos la excepción UserNotFoundException en el cliente de Cognito
             with patch.object(FakeCognitoIdpClient, 'confirm_forgot_password', side_effect=ClientError(
                     {'Error': {'Code': 'UserNotFoundException', 'Message': 'User does not exist.'}},
@@ -190,7 +194,7 @@ class TestLambdaHandler(unittest.TestCase):
                 self.assertEqual(json.loads(response['body']), 'User not found.')
 
     def test_generic_exception(self):
-        with patch('modules.users.change_password.app.boto3.client', return_value=FakeCognitoIdpClient()):
+        with patch('dudu_common.aws_clients.boto3.client', return_value=FakeCognitoIdpClient()):
             with patch.object(FakeCognitoIdpClient, 'confirm_forgot_password',
                               side_effect=ClientError(
                                   {'Error': {'Code': 'UnknownException', 'Message': 'An unknown error occurred'}},
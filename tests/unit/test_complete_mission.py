@@ -2,6 +2,7 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.missions.complete_mission.app import lambda_handler
+from dudu_common.progression import clear_reward_titles
 
 
 class TestCompleteMission(unittest.TestCase):
@@ -14,6 +15,7 @@ class TestCompleteMission(unittest.TestCase):
         self.mock_connection = MagicMock()
         self.mock_get_db_connection = patch('modules.missions.complete_mission.app.get_db_connection').start()
         self.mock_get_db_connection.return_value = self.mock_connection
+        clear_reward_titles()
 
     def tearDown(self):
         patch.stopall()
@@ -65,10 +67,10 @@ class TestCompleteMission(unittest.TestCase):
 
     @patch('modules.missions.complete_mission.app.get_db_connection')
     def test_lambda_handler_xp_limit_reached(self, mock_get_db_connection):
-        # Test when user's XP is already at the limit
+        # Test a user whose XP is already at the limit still completes the mission, without XP
         mock_get_db_connection.return_value = self.mock_connection
         self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
-        self.mock_cursor.fetchone.return_value = (100, 100, 1)  # current_xp = xp_limit
+        self.mock_cursor.fetchone.return_value = ('pending', 100, 100, 1, 1)  # current_xp = xp_limit
 
         event = {
             'body': json.dumps({
@@ -77,15 +79,56 @@ class TestCompleteMission(unittest.TestCase):
             })
         }
         response = lambda_handler(event, None)
-        self.assertEqual(response['statusCode'], 500)
-        self.assertIn("User's XP is already at the limit", response['body'])
+        self.assertEqual(response['statusCode'], 200)
+        response_body = json.loads(response['body'])
+        self.assertEqual(response_body['xp'], 0)
+        self.assertEqual((response_body['level'], response_body['current_xp']), (1, 100))
+        self.mock_connection.commit.assert_called_once()
+
+    @patch('modules.missions.complete_mission.app.random.randint', return_value=30)
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_max_level_completes_twice(self, mock_get_db_connection, _):
+        # Test a level 50 user reaching the XP limit can keep completing missions
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+
+        responses = []
+        for id_mission, user in [(1, ('pending', 580, 590, 50, 11)), (2, ('pending', 590, 590, 50, 11))]:
+            self.mock_cursor.fetchone.return_value = user
+            responses.append(lambda_handler({'body': json.dumps({'id_mission': id_mission,
+                                                                 'id_user': "valid_user"})}, None))
+
+        self.assertEqual([response['statusCode'] for response in responses], [200, 200])
+        self.assertEqual([json.loads(response['body'])['xp'] for response in responses], [30, 0])
+        self.assertEqual([json.loads(response['body'])['current_xp'] for response in responses], [590, 590])
+        updates = [call.args for call in self.mock_cursor.execute.call_args_list
+                   if "SET m.status = 'completed'" in call.args[0]]
+        self.assertEqual([update[1][-1] for update in updates], [[1], [2]])
+        self.assertEqual(self.mock_connection.commit.call_count, 2)
+
+    @patch('modules.missions.complete_mission.app.random.randint', return_value=30)
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_batch_max_level(self, mock_get_db_connection, _):
+        # Test a batch of a level 50 user completes every mission once the XP is at the limit
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = (580, 590, 50, 11)
+        self.mock_cursor.fetchall.side_effect = [[(11, 'Archimago')], [(1, 'pending'), (2, 'pending')]]
+
+        response = lambda_handler({'body': json.dumps({'id_missions': [1, 2], 'id_user': "valid_user"})}, None)
+
+        response_body = json.loads(response['body'])
+        self.assertEqual([mission['completed'] for mission in response_body['missions']], [True, True])
+        self.assertEqual([mission['xp'] for mission in response_body['missions']], [30, 0])
+        self.assertEqual((response_body['level'], response_body['current_xp'], response_body['levels_gained']),
+                         (50, 590, 0))
 
     @patch('modules.missions.complete_mission.app.get_db_connection')
     def test_lambda_handler_success(self, mock_get_db_connection):
         # Test successful completion of a mission and XP update
         mock_get_db_connection.return_value = self.mock_connection
         self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
-        self.mock_cursor.fetchone.return_value = (50, 100, 2)
+        self.mock_cursor.fetchone.return_value = ('pending', 50, 100, 2, 1)
 
         event = {
             'body': json.dumps({
@@ -102,7 +145,9 @@ class TestCompleteMission(unittest.TestCase):
         # Test level up scenario
         mock_get_db_connection.return_value = self.mock_connection
         self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
-        self.mock_cursor.fetchone.return_value = (95, 100, 4)
+        self.mock_cursor.fetchone.return_value = ('pending', 95, 100, 4, 1)
+        self.mock_cursor.fetchall.return_value = [(1, 'Novato'), (2, 'Aprendiz')]
+        patch('modules.missions.complete_mission.app.random.randint', return_value=10).start()
 
         event = {
             'body': json.dumps({
@@ -115,6 +160,64 @@ class TestCompleteMission(unittest.TestCase):
         response_body = json.loads(response['body'])
         self.assertIn("Level Up!", response_body['message'])
         self.assertTrue(response_body['level_up'])
+        self.assertEqual(response_body['level'], 5)
+        self.assertEqual(response_body['xp_limit'], 110)
+        self.assertEqual(response_body['new_reward_id'], 2)
+        self.assertEqual(response_body['reward_title'], 'Aprendiz')
+
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_single_update(self, mock_get_db_connection):
+        # Test the lock is followed by a single multi-table UPDATE
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = ('pending', 50, 100, 2, 1)
+
+        event = {
+            'body': json.dumps({
+                'id_mission': 1,
+                'id_user': "valid_user"
+            })
+        }
+        lambda_handler(event, None)
+
+        statements = [call.args[0] for call in self.mock_cursor.execute.call_args_list]
+        self.assertIn('FOR UPDATE', statements[-2])
+        self.assertIn('m.id_mission = %s AND m.id_user = u.id_user', statements[-2])
+        self.assertIn("SET m.status = 'completed'", statements[-1])
+
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_mission_already_completed(self, mock_get_db_connection):
+        # Test completing a mission twice
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = ('completed', 50, 100, 2, 1)
+
+        event = {
+            'body': json.dumps({
+                'id_mission': 1,
+                'id_user': "valid_user"
+            })
+        }
+        response = lambda_handler(event, None)
+        self.assertEqual(response['statusCode'], 400)
+        self.assertIn("Mission is already completed", response['body'])
+
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_mission_not_found(self, mock_get_db_connection):
+        # Test completing a mission that does not exist
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = (None, 50, 100, 2, 1)
+
+        event = {
+            'body': json.dumps({
+                'id_mission': 1,
+                'id_user': "valid_user"
+            })
+        }
+        response = lambda_handler(event, None)
+        self.assertEqual(response['statusCode'], 500)
+        self.assertIn("Mission not found", response['body'])
 
     @patch('modules.missions.complete_mission.app.get_db_connection')
     def test_lambda_handler_exception(self, mock_get_db_connection):
@@ -130,6 +233,92 @@ class TestCompleteMission(unittest.TestCase):
         self.assertEqual(response['statusCode'], 500)
         self.assertIn("An error occurred: Database error", response['body'])
 
+    @patch('modules.missions.complete_mission.app.random.randint', return_value=30)
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_batch(self, mock_get_db_connection, _):
+        # Test a batch completion with level ups and per mission results
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = (90, 100, 4, 1)
+        self.mock_cursor.fetchall.side_effect = [
+            [(1, 'Novato'), (2, 'Aprendiz')],
+            [(1, 'pending'), (2, 'completed'), (3, 'pending'), (4, 'pending'), (5, 'pending')]
+        ]
+
+        event = {
+            'body': json.dumps({
+                'id_missions': [1, 2, 3, 4, 5, 1, 9],
+                'id_user': "valid_user"
+            })
+        }
+        response = lambda_handler(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        response_body = json.loads(response['body'])
+        self.assertEqual(response_body['xp'], 120)
+        self.assertEqual(response_body['level'], 6)
+        self.assertEqual(response_body['levels_gained'], 2)
+        self.assertEqual(response_body['current_xp'], 0)
+        self.assertEqual(response_body['xp_limit'], 120)
+        self.assertEqual(response_body['reward_title'], 'Aprendiz')
+        self.assertEqual([mission['id_mission'] for mission in response_body['missions']], [1, 2, 3, 4, 5, 9])
+        self.assertEqual(response_body['missions'][1]['message'], 'Mission is already completed')
+        self.assertEqual(response_body['missions'][5]['message'], 'Mission not found')
+
+        statements = [call.args for call in self.mock_cursor.execute.call_args_list]
+        self.assertIn('WHERE id_mission IN %s AND id_user = %s', statements[2][0])
+        self.assertEqual(statements[2][1], ([1, 2, 3, 4, 5, 9], "valid_user"))
+        self.assertIn('m.id_user = u.id_user', statements[3][0])
+        self.assertEqual(statements[3][1][-1], [1, 3, 4, 5])
+        self.assertEqual(len(statements), 4)
+        self.mock_connection.commit.assert_called_once()
+
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_batch_foreign_missions(self, mock_get_db_connection):
+        # Test missions of other users are not returned by the lock query and are reported as not found
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = (10, 100, 4, 1)
+        self.mock_cursor.fetchall.side_effect = [[(1, 'Novato')], []]
+
+        response = lambda_handler({'body': json.dumps({'id_missions': [7, 8], 'id_user': "valid_user"})}, None)
+
+        response_body = json.loads(response['body'])
+        self.assertEqual([mission['message'] for mission in response_body['missions']],
+                         ['Mission not found', 'Mission not found'])
+        self.assertEqual(response_body['xp'], 0)
+        statements = [call.args[0] for call in self.mock_cursor.execute.call_args_list]
+        self.assertFalse(any("SET m.status = 'completed'" in statement for statement in statements))
+
+    def test_lambda_handler_batch_invalid(self):
+        # Test a batch without missions
+        event = {
+            'body': json.dumps({
+                'id_missions': [],
+                'id_user': "valid_user"
+            })
+        }
+        response = lambda_handler(event, None)
+        self.assertEqual(response['statusCode'], 400)
+
+    @patch('modules.missions.complete_mission.app.get_db_connection')
+    def test_lambda_handler_batch_user_not_found(self, mock_get_db_connection):
+        # Test a batch for a user that does not exist
+        mock_get_db_connection.return_value = self.mock_connection
+        self.mock_connection.cursor.return_value.__enter__.return_value = self.mock_cursor
+        self.mock_cursor.fetchone.return_value = None
+
+        event = {
+            'body': json.dumps({
+                'id_missions': [1, 2],
+                'id_user': "valid_user"
+            })
+        }
+        response = lambda_handler(event, None)
+        self.assertEqual(response['statusCode'], 500)
+        self.assertIn("User not found", response['body'])
+        self.mock_connection.rollback.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -8,8 +8,10 @@ from botocore.exceptions import ClientError, NoCredentialsError
 from modules.users.delete_user_profile import app
 from modules.users.delete_user_profile.app import validate_body_for_deletion, delete_cognito_user, delete_user_db, \
     lambda_handler, get_username_from_sub, get_secret
-from modules.users.delete_user_profile.common.db_connection import get_db_connection
-from modules.users.delete_user_profile.common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.db_connection import get_db_connection
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 
 
 # Clase que simula el cliente de boto3
@@ -52,6 +54,8 @@ class MockConnection:
 class TestDeleteUserProfile(unittest.TestCase):
     def setUp(self):
         # Configurar el cliente simulado
+        invalidate_secret()
+        clear_clients()
         self.client = MockCognitoClient()
         self.user_pool_id = 'test_pool_id'
         self.client.admin_create_user(
@@ -101,7 +105,7 @@ class TestDeleteUserProfile(unittest.TestCase):
 
 
     """Test to ensure the delete_user_db function deletes a user successfully from the database"""
-    @patch('modules.users.delete_user_profile.common.db_connection.get_secrets')
+    @patch('dudu_common.db_connection.get_secrets')
     @patch('modules.users.delete_user_profile.app.get_db_connection')
     def test_delete_user_db(self, mock_get_db_connection, mock_get_secrets):
         # Simulamos la respuesta del secreto
@@ -118,12 +122,12 @@ class TestDeleteUserProfile(unittest.TestCase):
         print(f"Test Passed: delete_user_db Exception - {str(excinfo.value)}")
 
     """Test get_secret function"""
-    @patch('modules.users.delete_user_profile.app.boto3.session.Session')
-    def test_get_secret_success(self, mock_boto_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_success(self, mock_get_client):
         class MockClient:
             def get_secret_value(self, SecretId):
                 return {'SecretString': json.dumps({'USER_POOL_ID': 'mock_pool_id'})}
-        mock_boto_session.return_value.client.return_value = MockClient()
+        mock_get_client.return_value = MockClient()
         secret = app.get_secret()
         expected_secret = {'USER_POOL_ID': 'mock_pool_id'}
         self.assertEqual(secret, expected_secret)
@@ -269,13 +273,13 @@ class TestDeleteUserProfile(unittest.TestCase):
         self.assertIsNone(username)
 
     """Tests the get_secret function to ensure it correctly retrieves the secret."""
-    @patch('modules.users.delete_user_profile.app.boto3.session.Session')
-    def test_get_secret_success(self, mock_boto_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_success(self, mock_get_client):
         class MockClient:
             def get_secret_value(self, SecretId):
                 return {'SecretString': json.dumps({'USER_POOL_ID': 'mock_pool_id'})}
 
-        mock_boto_session.return_value.client.return_value = MockClient()
+        mock_get_client.return_value = MockClient()
 
         secret = app.get_secret()
         expected_secret = {'USER_POOL_ID': 'mock_pool_id'}
@@ -285,40 +289,40 @@ class TestDeleteUserProfile(unittest.TestCase):
         self.print_response({'statusCode': 200, 'body': json.dumps(secret)})
 
     """Test get_secret function success"""
-    @patch('modules.users.delete_user_profile.app.boto3.session.Session')
-    def test_get_secret_success(self, mock_boto_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_success(self, mock_get_client):
         class MockClient:
             def get_secret_value(self, SecretId):
                 return {'SecretString': json.dumps({'USER_POOL_ID': 'mock_pool_id'})}
 
-        mock_boto_session.return_value.client.return_value = MockClient()
+        mock_get_client.return_value = MockClient()
         secret = get_secret()
         expected_secret = {'USER_POOL_ID': 'mock_pool_id'}
         self.assertEqual(secret, expected_secret)
         print("Test Passed: Secret retrieved successfully")
 
     """Test get_secret function with ClientError"""
-    @patch('modules.users.delete_user_profile.app.boto3.session.Session')
-    def test_get_secret_client_error(self, mock_boto_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_client_error(self, mock_get_client):
         class MockClient:
             def get_secret_value(self, SecretId):
                 raise ClientError({'Error': {'Code': 'ClientError'}}, 'operation')
 
-        mock_boto_session.return_value.client.return_value = MockClient()
+        mock_get_client.return_value = MockClient()
         with self.assertRaises(HttpStatusCodeError) as e:
             get_secret()
         self.assertEqual(e.exception.status_code, 500)
-        self.assertTrue("Error getting secret from AWS Secrets Manager" in str(e.exception))
+        self.assertTrue("Error getting secret ->" in str(e.exception))
         print(f"Test Passed: get_secret ClientError - {str(e.exception)}")
 
     """Test get_secret function with NoCredentialsError"""
-    @patch('modules.users.delete_user_profile.app.boto3.session.Session')
-    def test_get_secret_no_credentials_error(self, mock_boto_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_no_credentials_error(self, mock_get_client):
         class MockClient:
             def get_secret_value(self, SecretId):
                 raise NoCredentialsError
 
-        mock_boto_session.return_value.client.return_value = MockClient()
+        mock_get_client.return_value = MockClient()
         with self.assertRaises(HttpStatusCodeError) as e:
             get_secret()
         self.assertEqual(e.exception.status_code, 500)
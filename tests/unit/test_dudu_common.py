@@ -0,0 +1,530 @@
+import os
+import json
+import subprocess
+import sys
+import unittest
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+import pymysql
+from dudu_common import db_connection, secrets_cache, description_cache, openai_connection, progression, idempotency, \
+    mission_stats, aws_clients, instrumentation
+from dudu_common.cognito import forget_username, get_username_from_sub
+from dudu_common.secrets_cache import invalidate_secret
+
+
+class TestDbConnectionPool(TestCase):
+    def setUp(self):
+        db_connection._pool['connection'] = None
+        db_connection._pool['last_used'] = 0.0
+
+    def tearDown(self):
+        db_connection._pool['connection'] = None
+
+    # Test that every checkout of a warm container reuses the same connection
+    @patch("dudu_common.db_connection.open_db_connection")
+    def test_get_db_connection_reuses_connection(self, mock_open_db_connection):
+        mock_connection = MagicMock()
+        mock_connection.server_status = 0
+        mock_open_db_connection.return_value = mock_connection
+
+        first = db_connection.get_db_connection()
+        first.close()
+        second = db_connection.get_db_connection()
+        second.close()
+
+        mock_open_db_connection.assert_called_once()
+        mock_connection.close.assert_not_called()
+        # Nothing ran since the last commit, so the release costs no round trip
+        mock_connection.rollback.assert_not_called()
+        self.assertIs(db_connection._pool['connection'], mock_connection)
+
+    # Test that a connection dropped by the server is replaced on checkout
+    @patch("dudu_common.db_connection.open_db_connection")
+    def test_get_db_connection_reconnects_when_ping_fails(self, mock_open_db_connection):
+        stale_connection = MagicMock()
+        stale_connection.ping.side_effect = db_connection.pymysql.OperationalError(2006, 'MySQL server has gone away')
+        fresh_connection = MagicMock()
+        mock_open_db_connection.return_value = fresh_connection
+        db_connection._pool['connection'] = stale_connection
+
+        connection = db_connection.get_db_connection()
+
+        stale_connection.ping.assert_called_once_with(reconnect=False)
+        self.assertIs(db_connection._pool['connection'], fresh_connection)
+        self.assertIs(connection._connection, fresh_connection)
+
+    # Test that releasing the connection ends a transaction left open
+    @patch("dudu_common.db_connection.open_db_connection")
+    def test_close_rolls_back_open_transaction(self, mock_open_db_connection):
+        mock_connection = MagicMock()
+        mock_connection.server_status = db_connection.SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        mock_open_db_connection.return_value = mock_connection
+
+        db_connection.get_db_connection().close()
+
+        mock_connection.rollback.assert_called_once()
+        mock_connection.close.assert_not_called()
+
+
+class TestSecretsCache(TestCase):
+
+    def setUp(self):
+        invalidate_secret()
+
+    @patch('dudu_common.secrets_cache.fetch_secret')
+    def test_secret_is_cached_within_ttl(self, mock_fetch_secret):
+        mock_fetch_secret.return_value = {'ID_CLIENT': 'client_id'}
+
+        first = secrets_cache.get_secret_value('users_pool/client_secret2')
+        second = secrets_cache.get_secret_value('users_pool/client_secret2')
+
+        self.assertEqual(first, second)
+        mock_fetch_secret.assert_called_once_with('users_pool/client_secret2')
+
+    @patch('dudu_common.secrets_cache.fetch_secret')
+    def test_expired_secret_is_fetched_again(self, mock_fetch_secret):
+        mock_fetch_secret.side_effect = [{'ID_CLIENT': 'old'}, {'ID_CLIENT': 'new'}]
+
+        secrets_cache.get_secret_value('users_pool/client_secret2')
+        secrets_cache._cache['users_pool/client_secret2']['expires_at'] = 0
+
+        secret = secrets_cache.get_secret_value('users_pool/client_secret2')
+        self.assertEqual(secret, {'ID_CLIENT': 'new'})
+
+    @patch('dudu_common.secrets_cache.fetch_secret')
+    def test_force_refresh_skips_cache(self, mock_fetch_secret):
+        mock_fetch_secret.side_effect = [{'ID_CLIENT': 'old'}, {'ID_CLIENT': 'rotated'}]
+
+        secrets_cache.get_secret_value('users_pool/client_secret2')
+        secret = secrets_cache.get_secret_value('users_pool/client_secret2', force_refresh=True)
+
+        self.assertEqual(secret, {'ID_CLIENT': 'rotated'})
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_secrets_share_the_container_client(self, mock_boto_client):
+        aws_clients.clear_clients()
+        mock_boto_client.return_value.get_secret_value.return_value = {'SecretString': '{"ID_CLIENT": "id"}'}
+
+        secrets_cache.get_secret_value('users_pool/client_secret2')
+        secrets_cache.get_secret_value('users_pool/client_secret2', force_refresh=True)
+
+        mock_boto_client.assert_called_once_with('secretsmanager', region_name='us-east-2',
+                                                 config=aws_clients.CLIENT_CONFIG)
+        aws_clients.clear_clients()
+
+    @patch('dudu_common.secrets_cache.threading.Thread')
+    @patch('dudu_common.secrets_cache.fetch_secret')
+    def test_secret_is_refreshed_in_background_ahead_of_expiry(self, mock_fetch_secret, mock_thread):
+        mock_fetch_secret.side_effect = [{'ID_CLIENT': 'old'}, {'ID_CLIENT': 'new'}]
+
+        secrets_cache.get_secret_value('users_pool/client_secret2')
+        secrets_cache._cache['users_pool/client_secret2']['refresh_at'] = 0
+
+        # The cached value is served while the refresh runs
+        secret = secrets_cache.get_secret_value('users_pool/client_secret2')
+        self.assertEqual(secret, {'ID_CLIENT': 'old'})
+
+        mock_thread.call_args.kwargs['target']()
+        self.assertEqual(secrets_cache.get_secret_value('users_pool/client_secret2'), {'ID_CLIENT': 'new'})
+
+
+class TestDescriptionCache(TestCase):
+    def setUp(self):
+        description_cache.clear_description_cache()
+
+    def mock_connection(self, mock_get_db_connection, rows=()):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = list(rows)
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_db_connection.return_value = mock_connection
+        return mock_connection, mock_cursor
+
+    def test_normalize_description(self):
+        normalized = description_cache.normalize_description('  Alimentar a MÍ\t perro  ')
+
+        self.assertEqual(normalized, 'alimentar a mi perro')
+
+    @patch('dudu_common.description_cache.get_openai_client')
+    @patch('dudu_common.description_cache.get_db_connection')
+    def test_cached_variants_skip_openai(self, mock_get_db_connection, mock_get_openai_client):
+        self.mock_connection(mock_get_db_connection, rows=[('uno',), ('dos',), ('tres',)])
+
+        fantasy_description = description_cache.get_fantasy_description('Alimentar a mi perro')
+
+        self.assertIn(fantasy_description, ['uno', 'dos', 'tres'])
+        mock_get_openai_client.assert_not_called()
+
+    @patch('dudu_common.description_cache.get_openai_client')
+    @patch('dudu_common.description_cache.get_db_connection')
+    def test_missing_variants_are_generated_and_stored(self, mock_get_db_connection, mock_get_openai_client):
+        mock_connection, mock_cursor = self.mock_connection(mock_get_db_connection, rows=[('uno',)])
+        mock_get_openai_client.return_value = 'dos'
+
+        fantasy_description = description_cache.get_fantasy_description('Alimentar a mí perro')
+
+        self.assertEqual(fantasy_description, 'dos')
+        mock_get_openai_client.assert_called_once_with('Alimentar a mí perro')
+        sql, values = mock_cursor.execute.call_args.args
+        self.assertIn('INSERT INTO fantasy_description_cache', sql)
+        self.assertEqual(values, (description_cache.hash_description('alimentar a mi perro'), 'alimentar a mi perro',
+                                  'dos'))
+        mock_connection.commit.assert_called_once()
+
+    @patch('dudu_common.description_cache.get_db_connection')
+    def test_full_variants_are_served_from_memory(self, mock_get_db_connection):
+        self.mock_connection(mock_get_db_connection, rows=[('uno',), ('dos',), ('tres',)])
+
+        description_cache.get_variants('hash')
+        variants = description_cache.get_variants('hash')
+
+        self.assertEqual(variants, ['uno', 'dos', 'tres'])
+        mock_get_db_connection.assert_called_once()
+
+    @patch('dudu_common.description_cache.get_db_connection')
+    def test_batch_lookup_is_a_single_query(self, mock_get_db_connection):
+        perro = description_cache.hash_description('alimentar a mi perro')
+        amigos = description_cache.hash_description('jugar con amigos')
+        description_cache.remember_variants(amigos, ['a', 'b', 'c'])
+        _, mock_cursor = self.mock_connection(mock_get_db_connection, rows=[(perro, 'uno'), (perro, 'dos'),
+                                                                            (perro, 'tres'), (perro, 'cuatro')])
+
+        cached = description_cache.get_cached_fantasy_descriptions(['Alimentar a mi perro', 'Jugar con amigos',
+                                                                    'buscar trabajo'])
+
+        self.assertIn(cached[0], ['uno', 'dos', 'tres'])
+        self.assertIn(cached[1], ['a', 'b', 'c'])
+        self.assertIsNone(cached[2])
+        mock_cursor.execute.assert_called_once()
+        sql, values = mock_cursor.execute.call_args.args
+        self.assertIn('WHERE description_hash IN %s', sql)
+        self.assertEqual(values, ([perro, description_cache.hash_description('buscar trabajo')],))
+
+    def test_least_recently_used_description_is_evicted(self):
+        with patch('dudu_common.description_cache.MEMORY_CACHE_SIZE', 2):
+            description_cache.remember_variants('a', ['uno'])
+            description_cache.remember_variants('b', ['dos'])
+            description_cache.remember_variants('a', ['uno', 'otro'])
+            description_cache.remember_variants('c', ['tres'])
+
+        self.assertEqual(list(description_cache._variants), ['a', 'c'])
+
+    @patch('dudu_common.description_cache.get_openai_client')
+    @patch('dudu_common.description_cache.get_db_connection')
+    def test_database_errors_fall_back_to_openai(self, mock_get_db_connection, mock_get_openai_client):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+        mock_cursor.execute.side_effect = pymysql.MySQLError('Table does not exist')
+        mock_get_openai_client.return_value = 'uno'
+
+        fantasy_description = description_cache.get_fantasy_description('Alimentar a mi perro')
+
+        self.assertEqual(fantasy_description, 'uno')
+
+
+class TestOpenaiBatch(TestCase):
+    @patch('dudu_common.openai_connection.create_completion')
+    @patch('dudu_common.openai_connection.get_secret')
+    def test_batch_is_a_single_request(self, mock_get_secret, mock_create_completion):
+        mock_get_secret.return_value = {'OPENAI_KEY': 'key'}
+        mock_create_completion.return_value = '{"1": "Reunir al gremio", "0": "Alimentar a la bestia"}'
+
+        converted = openai_connection.get_openai_batch(['alimentar a mi perro', 'jugar con amigos'])
+
+        self.assertEqual(converted, ['Alimentar a la bestia', 'Reunir al gremio'])
+        mock_create_completion.assert_called_once()
+        self.assertIn('{"0": "alimentar a mi perro", "1": "jugar con amigos"}',
+                      mock_create_completion.call_args.args[0])
+
+    def test_parse_batch_response_marks_missing_items(self):
+        self.assertEqual(openai_connection.parse_batch_response('{"0": "uno", "1": "", "2": 3}', 3),
+                         ['uno', None, None])
+        self.assertEqual(openai_connection.parse_batch_response('no es json', 2), [None, None])
+        self.assertEqual(openai_connection.parse_batch_response('["uno"]', 1), [None])
+
+    def test_parse_batch_response_discards_unmatched_keys(self):
+        # A skipped or merged item would shift every description after it, so nothing is paired
+        self.assertEqual(openai_connection.parse_batch_response('{"0": "uno", "2": "tres"}', 3), [None, None, None])
+        self.assertEqual(openai_connection.parse_batch_response('{"0": "uno", "1": "dos"}', 1), [None])
+
+    def test_parse_batch_response_strips_code_fences(self):
+        content = '```json\n{"0": "uno", "1": "dos"}\n```'
+
+        self.assertEqual(openai_connection.parse_batch_response(content, 2), ['uno', 'dos'])
+
+    def test_openai_is_not_imported_on_cold_start(self):
+        # A fresh interpreter, this one already imported openai through other tests
+        layer = os.path.dirname(os.path.dirname(openai_connection.__file__))
+        code = "import sys; from dudu_common import description_cache; print('openai' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], env=dict(os.environ, PYTHONPATH=layer),
+                                capture_output=True, text=True, check=True).stdout
+
+        self.assertEqual(output.strip(), 'False')
+
+
+class TestProgression(TestCase):
+    def setUp(self):
+        progression.clear_reward_titles()
+
+    def test_apply_xp_without_level_up(self):
+        progress = progression.apply_xp(2, 50, 100, 1, 20, 11)
+
+        self.assertEqual(progress, progression.Progress(2, 70, 100, 1, 0))
+
+    def test_apply_xp_unlocks_reward_every_five_levels(self):
+        progress = progression.apply_xp(4, 95, 100, 1, 10, 11)
+
+        self.assertEqual(progress, progression.Progress(5, 5, 110, 2, 1))
+
+    def test_apply_xp_applies_several_level_ups(self):
+        progress = progression.apply_xp(3, 90, 100, 1, 130, 11)
+
+        self.assertEqual(progress, progression.Progress(5, 10, 120, 2, 2))
+
+    def test_apply_xp_caps_reward_and_level(self):
+        self.assertEqual(progression.apply_xp(49, 0, 580, 11, 600, 11), progression.Progress(50, 20, 590, 11, 1))
+        self.assertEqual(progression.apply_xp(50, 580, 590, 11, 30, 11), progression.Progress(50, 590, 590, 11, 0))
+
+    def test_resolve_reward_prefers_user_rewards(self):
+        rewards = (progression.Reward(1, 1, 'Novato'), progression.Reward(2, 5, 'Aprendiz'),
+                   progression.Reward(3, 10, 'Mago'))
+
+        self.assertEqual(progression.resolve_reward(rewards, 12, 2).wizard_title, 'Aprendiz')
+        self.assertEqual(progression.resolve_reward(rewards, 12).wizard_title, 'Mago')
+        self.assertEqual(progression.resolve_reward(rewards, 5, 99).wizard_title, 'Aprendiz')
+        self.assertIsNone(progression.resolve_reward(rewards, 0))
+
+    def test_reward_titles_are_loaded_once(self):
+        mock_cursor = MagicMock()
+        mock_cursor.fetchall.return_value = [(1, 'Novato'), (2, 'Aprendiz')]
+
+        progression.get_reward_titles(mock_cursor)
+        titles = progression.get_reward_titles(mock_cursor)
+
+        self.assertEqual(dict(titles), {1: 'Novato', 2: 'Aprendiz'})
+        mock_cursor.execute.assert_called_once()
+        with self.assertRaises(TypeError):
+            titles[3] = 'Mago'
+
+
+class TestIdempotency(TestCase):
+    def setUp(self):
+        self.handler = MagicMock(return_value={'statusCode': 200, 'headers': {}, 'body': '"ok"'})
+        self.wrapped = idempotency.idempotent('insert_mission', {})(self.handler)
+        self.event = {'headers': {'Idempotency-Key': 'abc'}, 'body': '{"id_user": 1}'}
+
+    def mock_connection(self, mock_get_db_connection, row=None):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = row
+        # INSERT IGNORE claims the key only when there is no stored row
+        mock_cursor.execute.return_value = 1 if row is None else 0
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_db_connection.return_value = mock_connection
+        return mock_connection, mock_cursor
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_requests_without_key_skip_the_table(self, mock_get_db_connection):
+        response = self.wrapped({'body': '{}'}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        mock_get_db_connection.assert_not_called()
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_first_request_claims_key_and_stores_response(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+
+        response = self.wrapped(self.event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.handler.assert_called_once()
+        statements = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        self.assertEqual(len(statements), 2)
+        self.assertIn('INSERT IGNORE INTO idempotency_keys', statements[0])
+        self.assertIn("SET status = 'completed'", statements[1])
+        self.assertEqual(json.loads(mock_cursor.execute.call_args.args[1][0]), response)
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_retry_replays_stored_response(self, mock_get_db_connection):
+        stored = json.dumps({'statusCode': 200, 'headers': {}, 'body': '"ok"'})
+        self.mock_connection(mock_get_db_connection,
+                             row=(idempotency.hash_value(self.event['body']), 'completed', stored, 0))
+
+        response = self.wrapped(self.event, None)
+
+        self.handler.assert_not_called()
+        self.assertEqual(response['body'], '"ok"')
+        self.assertEqual(response['headers'][idempotency.REPLAYED_HEADER], 'true')
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_retry_conflicts(self, mock_get_db_connection):
+        request_hash = idempotency.hash_value(self.event['body'])
+        self.mock_connection(mock_get_db_connection, row=(request_hash, 'in_progress', None, 0))
+        self.assertEqual(self.wrapped(self.event, None)['statusCode'], 409)
+
+        self.mock_connection(mock_get_db_connection, row=(b'other', 'completed', '{}', 0))
+        self.assertEqual(self.wrapped(self.event, None)['statusCode'], 422)
+
+        self.handler.assert_not_called()
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_keys_are_scoped_by_caller(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+
+        self.wrapped(self.event, None)
+        self.wrapped(dict(self.event, body='{"id_user": 2}'), None)
+        self.wrapped(dict(self.event, requestContext={'authorizer': {'claims': {'sub': 'abc-123'}}}), None)
+
+        key_hashes = [call.args[1][0] for call in mock_cursor.execute.call_args_list
+                      if call.args[0].startswith('INSERT IGNORE')]
+        self.assertEqual(key_hashes, [idempotency.hash_value('insert_mission:1:abc'),
+                                      idempotency.hash_value('insert_mission:2:abc'),
+                                      idempotency.hash_value('insert_mission:abc-123:abc')])
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_concurrent_first_requests_conflict(self, mock_get_db_connection):
+        mock_connection, mock_cursor = self.mock_connection(mock_get_db_connection)
+        mock_cursor.execute.side_effect = pymysql.OperationalError(1213, 'Deadlock found when trying to get lock')
+
+        response = self.wrapped(self.event, None)
+
+        self.assertEqual(response['statusCode'], 409)
+        self.handler.assert_not_called()
+        mock_connection.rollback.assert_called_once()
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    def test_server_errors_release_key(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+        self.handler.return_value = {'statusCode': 500, 'headers': {}, 'body': '"error"'}
+
+        self.wrapped(self.event, None)
+
+        self.assertIn('DELETE FROM idempotency_keys', mock_cursor.execute.call_args.args[0])
+
+
+class TestMissionStats(TestCase):
+    def test_status_deltas(self):
+        deltas = mission_stats.status_deltas([(None, 'pending'), ('pending', 'completed'), ('failed', 'failed')])
+
+        self.assertEqual(deltas, {'pending': 0, 'completed': 1})
+
+    def test_update_mission_stats_is_one_upsert(self):
+        mock_cursor = MagicMock()
+
+        updated = mission_stats.update_mission_stats(mock_cursor, {
+            'a': mission_stats.status_deltas([('pending', 'failed')]),
+            'b': mission_stats.status_deltas([('failed', 'failed')])
+        })
+
+        self.assertEqual(updated, 1)
+        sql, rows = mock_cursor.executemany.call_args.args
+        self.assertIn('ON DUPLICATE KEY UPDATE pending_missions = pending_missions + VALUES(pending_missions)', sql)
+        self.assertEqual(rows, [('a', -1, 0, 0, 1, 0)])
+
+
+class TestCognitoUsernames(TestCase):
+    def setUp(self):
+        forget_username()
+
+    @patch('dudu_common.cognito.list_username')
+    @patch('dudu_common.cognito.get_db_connection')
+    def test_stored_username_skips_list_users(self, mock_get_db_connection, mock_list_username):
+        mock_cursor = mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value
+        mock_cursor.fetchone.return_value = ('wizard',)
+
+        self.assertEqual(get_username_from_sub('sub', 'pool'), 'wizard')
+        self.assertEqual(get_username_from_sub('sub', 'pool'), 'wizard')
+
+        mock_list_username.assert_not_called()
+        mock_get_db_connection.assert_called_once()
+
+
+class TestAwsClients(TestCase):
+    def setUp(self):
+        aws_clients.clear_clients()
+
+    def tearDown(self):
+        aws_clients.clear_clients()
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_client_is_created_once_per_container(self, mock_boto_client):
+        first = aws_clients.get_cognito_client()
+        second = aws_clients.get_cognito_client()
+
+        self.assertIs(first, second)
+        mock_boto_client.assert_called_once_with('cognito-idp', region_name='us-east-2',
+                                                 config=aws_clients.CLIENT_CONFIG)
+
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        db_connection._pool['connection'] = None
+        db_connection._pool['last_used'] = 0.0
+
+    def tearDown(self):
+        db_connection._pool['connection'] = None
+
+    # Test that the summary line counts the statements and connections of the invocation
+    @patch('builtins.print')
+    @patch('dudu_common.db_connection.open_db_connection')
+    def test_summary_counts_round_trips(self, mock_open_db_connection, mock_print):
+        mock_open_db_connection.return_value.server_status = 0
+
+        @instrumentation.instrumented('get_profile')
+        def handler(event, context):
+            for _ in range(2):
+                connection = db_connection.get_db_connection()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT * FROM users WHERE id_user = %s", ('user',))
+                connection.commit()
+                connection.close()
+            return {'statusCode': 200}
+
+        self.assertEqual(handler({}, None), {'statusCode': 200})
+
+        summary = json.loads(mock_print.call_args.args[0])
+        self.assertEqual(summary['function'], 'get_profile')
+        self.assertEqual(summary['status_code'], 200)
+        self.assertEqual(summary['db_checkout_count'], 2)
+        self.assertEqual(summary['db_connect_count'], 1)
+        self.assertEqual(summary['sql_count'], 4)
+        self.assertEqual(summary['_aws']['CloudWatchMetrics'][0]['Dimensions'], [['function']])
+        self.assertIn({'Name': 'sql_count', 'Unit': 'Count'}, summary['_aws']['CloudWatchMetrics'][0]['Metrics'])
+
+    # Test that calls outside an invocation are not counted and slow statements are logged on their own line
+    @patch('builtins.print')
+    @patch('dudu_common.instrumentation.SLOW_QUERY_MS', 1)
+    def test_slow_query_log(self, mock_print):
+        instrumentation.record('sql', 0.0005, 'SELECT 1')
+        mock_print.assert_not_called()
+
+        instrumentation.record('sql', 0.5, 'SELECT SLEEP(0.5)')
+        self.assertEqual(json.loads(mock_print.call_args.args[0]),
+                         {'slow_query': 'SELECT SLEEP(0.5)', 'ms': 500.0, 'function': None})
+
+    # Test that the API calls of a boto3 client are timed through its event hooks
+    @patch('builtins.print')
+    def test_boto3_client_calls_are_recorded(self, mock_print):
+        import boto3
+        from botocore.stub import Stubber
+
+        client = boto3.client('cognito-idp', region_name='us-east-2', aws_access_key_id='key',
+                              aws_secret_access_key='secret')
+        instrumentation.instrument_client(client, 'cognito')
+
+        @instrumentation.instrumented('recover_password')
+        def handler(event, context):
+            with Stubber(client) as stubber:
+                stubber.add_response('forgot_password', {}, {'ClientId': 'client', 'Username': 'wizard'})
+                client.forgot_password(ClientId='client', Username='wizard')
+            return {'statusCode': 200}
+
+        handler({}, None)
+
+        summary = json.loads(mock_print.call_args.args[0])
+        self.assertEqual(summary['cognito_count'], 1)
+        self.assertEqual(summary['calls'][0][:2], ['cognito', 'ForgotPassword'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from modules.missions.fantasy_description_worker import app
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from unittest import TestCase
+
+
+class TestFantasyDescriptionWorker(TestCase):
+
+    def mock_connection(self, mock_get_db_connection, jobs=()):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.return_value = [dict(job) for job in jobs]
+        return mock_connection, mock_cursor
+
+    @patch('modules.missions.fantasy_description_worker.app.get_fantasy_description')
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_lambda_success(self, mock_get_db_connection, mock_get_fantasy_description):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection, jobs=[
+            {'id_mission': 1, 'original_description': 'alimentar a mi perro', 'description_attempts': 0}
+        ])
+        mock_get_fantasy_description.return_value = 'alimentar a la bestia guardiana'
+
+        response = app.lambda_handler({}, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'processed': 1})
+        mock_get_fantasy_description.assert_called_once_with('alimentar a mi perro')
+        sql, values = mock_cursor.execute.call_args.args
+        self.assertIn("description_status = 'ready'", sql)
+        self.assertEqual(values, ('alimentar a la bestia guardiana', 1))
+
+    @patch('modules.missions.fantasy_description_worker.app.get_fantasy_description')
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_claim_skips_locked_missions(self, mock_get_db_connection, mock_get_fantasy_description):
+        mock_connection, mock_cursor = self.mock_connection(mock_get_db_connection, jobs=[
+            {'id_mission': 1, 'original_description': 'uno', 'description_attempts': 0},
+            {'id_mission': 2, 'original_description': 'dos', 'description_attempts': 1}
+        ])
+
+        jobs = app.claim_pending_descriptions(5)
+
+        self.assertEqual([job['description_attempts'] for job in jobs], [1, 2])
+        select_sql, select_values = mock_cursor.execute.call_args_list[1].args
+        self.assertIn('FOR UPDATE SKIP LOCKED', select_sql)
+        self.assertIn('description_attempts < %s', select_sql)
+        self.assertEqual(select_values, (app.CLAIM_TIMEOUT, app.MAX_ATTEMPTS, 5))
+        update_sql, update_values = mock_cursor.execute.call_args_list[2].args
+        self.assertIn("description_status = 'processing'", update_sql)
+        self.assertEqual(update_values, ([1, 2],))
+        mock_connection.commit.assert_called_once()
+        mock_get_fantasy_description.assert_not_called()
+
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_empty_queue(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+
+        response = app.lambda_handler({}, None)
+
+        self.assertEqual(json.loads(response['body']), {'processed': 0})
+        self.assertEqual(mock_cursor.execute.call_count, 2)
+
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_abandoned_missions_out_of_attempts_are_failed(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+
+        app.claim_pending_descriptions(5)
+
+        sweep_sql, sweep_values = mock_cursor.execute.call_args_list[0].args
+        self.assertIn("SET description_status = 'failed'", sweep_sql)
+        self.assertIn("description_status = 'processing'", sweep_sql)
+        self.assertEqual(sweep_values, (app.CLAIM_TIMEOUT, app.MAX_ATTEMPTS))
+
+    @patch('modules.missions.fantasy_description_worker.app.get_fantasy_description')
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_failed_attempt_is_requeued(self, mock_get_db_connection, mock_get_fantasy_description):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection, jobs=[
+            {'id_mission': 1, 'original_description': 'uno', 'description_attempts': 0}
+        ])
+        mock_get_fantasy_description.side_effect = HttpStatusCodeError(500, 'Error getting openai client')
+
+        app.lambda_handler({}, None)
+
+        _, values = mock_cursor.execute.call_args.args
+        self.assertEqual(values, ('pending', 1))
+
+    @patch('modules.missions.fantasy_description_worker.app.get_fantasy_description')
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_last_attempt_marks_failed(self, mock_get_db_connection, mock_get_fantasy_description):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection, jobs=[
+            {'id_mission': 1, 'original_description': 'uno', 'description_attempts': app.MAX_ATTEMPTS - 1}
+        ])
+        mock_get_fantasy_description.side_effect = HttpStatusCodeError(500, 'Error getting openai client')
+
+        app.lambda_handler({}, None)
+
+        _, values = mock_cursor.execute.call_args.args
+        self.assertEqual(values, ('failed', 1))
+
+    @patch('modules.missions.fantasy_description_worker.app.get_db_connection')
+    def test_lambda_exception(self, mock_get_db_connection):
+        _, mock_cursor = self.mock_connection(mock_get_db_connection)
+        mock_cursor.fetchall.side_effect = Exception('Error')
+
+        response = app.lambda_handler({}, None)
+        self.assertEqual(response['statusCode'], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,14 +2,19 @@ import unittest
 from unittest.mock import patch, MagicMock
 import json
 from botocore.exceptions import ClientError, NoCredentialsError
-from modules.profile.get_profile.app import lambda_handler, get_secret
-from modules.profile.get_profile.common.httpStatusCodeError import HttpStatusCodeError
+from modules.profile.get_profile.app import lambda_handler, get_profile
+from dudu_common import progression, profile_cache
+from dudu_common.cognito import get_secret
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.secrets_cache import invalidate_secret
 
 
 class TestLambdaHandler(unittest.TestCase):
 
     def setUp(self):
         # Setup any needed test data or mocks
+        invalidate_secret()
+        profile_cache.clear_profile_cache()
         self.headers = {
             'Access-Control-Allow-Headers': '*',
             'Access-Control-Allow-Origin': '*',
@@ -17,12 +22,10 @@ class TestLambdaHandler(unittest.TestCase):
         }
 
     @patch('modules.profile.get_profile.app.get_db_connection')
-    @patch('modules.profile.get_profile.app.validate_user')
     @patch('modules.profile.get_profile.app.get_profile')
-    def test_lambda_handler_success(self, mock_get_profile, mock_validate_user, mock_get_db_connection):
+    def test_lambda_handler_success(self, mock_get_profile, mock_get_db_connection):
         # Mock the database connection and cursor
         mock_get_db_connection.return_value = MagicMock()
-        mock_validate_user.return_value = {'user_count': 1}
         mock_get_profile.return_value = {
             'id_user': 'valid_user',
             'level': 1,
@@ -47,6 +50,53 @@ class TestLambdaHandler(unittest.TestCase):
         response_body = json.loads(response['body'])
         self.assertIn('profile', response_body)
         self.assertEqual(response_body['profile']['id_user'], 'valid_user')
+        self.assertIn('ETag', response['headers'])
+
+    @patch('modules.profile.get_profile.app.get_profile')
+    def test_lambda_handler_not_modified(self, mock_get_profile):
+        # Test a request whose If-None-Match matches the current profile gets a 304 without a body
+        mock_get_profile.return_value = {'id_user': 'valid_user', 'level': 1}
+        event = {
+            'body': json.dumps({'id_user': 'valid_user'})
+        }
+        etag = lambda_handler(event, None)['headers']['ETag']
+
+        event['headers'] = {'If-None-Match': etag}
+        response = lambda_handler(event, None)
+
+        self.assertEqual(response['statusCode'], 304)
+        self.assertEqual(response['body'], '')
+
+    @patch('modules.profile.get_profile.app.get_profile')
+    def test_lambda_handler_profile_changed_elsewhere(self, mock_get_profile):
+        # Test a profile written by another function is read again instead of answering 304 with the old ETag
+        mock_get_profile.return_value = {'id_user': 'valid_user', 'level': 1}
+        event = {
+            'body': json.dumps({'id_user': 'valid_user'})
+        }
+        etag = lambda_handler(event, None)['headers']['ETag']
+
+        mock_get_profile.return_value = {'id_user': 'valid_user', 'level': 2}
+        event['headers'] = {'If-None-Match': etag}
+        response = lambda_handler(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body'])['profile']['level'], 2)
+        self.assertNotEqual(response['headers']['ETag'], etag)
+
+    @patch('dudu_common.profile_cache.PROFILE_CACHE_TTL', 30)
+    @patch('modules.profile.get_profile.app.get_profile')
+    def test_lambda_handler_cached_profile(self, mock_get_profile):
+        # Test an opted-in cache serves the profile without reading the database again
+        mock_get_profile.return_value = {'id_user': 'valid_user', 'level': 1}
+        event = {
+            'body': json.dumps({'id_user': 'valid_user'})
+        }
+        lambda_handler(event, None)
+        response = lambda_handler(event, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        mock_get_profile.assert_called_once()
 
     @patch('modules.profile.get_profile.app.get_db_connection')
     def test_lambda_handler_missing_body(self, mock_get_db_connection):
@@ -77,10 +127,10 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertIn("Bad request: ID cannot be empty", response['body'])
 
     @patch('modules.profile.get_profile.app.get_db_connection')
-    @patch('modules.profile.get_profile.app.validate_user')
-    def test_lambda_handler_sql_exception(self, mock_validate_user, mock_get_db_connection):
-        # Test SQL exception in validate_user
-        mock_validate_user.side_effect = Exception("Database error")
+    @patch('modules.profile.get_profile.app.get_profile')
+    def test_lambda_handler_sql_exception(self, mock_get_profile, mock_get_db_connection):
+        # Test SQL exception in get_profile
+        mock_get_profile.side_effect = Exception("Database error")
 
         event = {
             'body': json.dumps({'id_user': 'valid_user'})
@@ -90,8 +140,7 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertIn("An error occurred", response['body'])
 
     @patch('modules.profile.get_profile.app.get_db_connection')
-    @patch('modules.profile.get_profile.app.get_profile')
-    def test_lambda_handler_db_connection_error(self, mock_get_profile, mock_get_db_connection):
+    def test_lambda_handler_db_connection_error(self, mock_get_db_connection):
         # Test database connection error
         mock_get_db_connection.side_effect = Exception("Connection error")
         event = {
@@ -112,10 +161,10 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertIn("Bad request: ID must be a string", response['body'])
 
     @patch('modules.profile.get_profile.app.get_db_connection')
-    @patch('modules.profile.get_profile.app.validate_user')
-    def test_lambda_handler_user_not_found(self, mock_validate_user, mock_get_db_connection):
+    @patch('modules.profile.get_profile.app.get_profile')
+    def test_lambda_handler_user_not_found(self, mock_get_profile, mock_get_db_connection):
         # Test user not found
-        mock_validate_user.return_value = {'user_count': 0}
+        mock_get_profile.return_value = None
 
         event = {
             'body': json.dumps({'id_user': 'non_existing_user'})
@@ -124,41 +173,26 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(response['statusCode'], 404)
         self.assertIn("User not found", response['body'])
 
-    @patch('modules.profile.get_profile.app.get_db_connection')
-    @patch('modules.profile.get_profile.app.validate_user')
-    @patch('modules.profile.get_profile.app.get_profile')
-    def test_lambda_handler_no_profile(self, mock_get_profile, mock_validate_user, mock_get_db_connection):
-        # Test no profile found
-        mock_validate_user.return_value = {'user_count': 1}
-        mock_get_profile.return_value = None
-
-        event = {
-            'body': json.dumps({'id_user': 'valid_user'})
-        }
-        response = lambda_handler(event, None)
-        self.assertEqual(response['statusCode'], 404)
-        self.assertIn("No profile information found", response['body'])
-
-    @patch('modules.profile.get_profile.app.boto3.session.Session')
-    def test_get_secret_success(self, mock_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_success(self, mock_get_client):
         mock_secret = {'key': 'value'}
-        mock_client = mock_session.return_value.client.return_value
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.return_value = {'SecretString': json.dumps(mock_secret)}
 
         secret = get_secret()
         self.assertEqual(secret, mock_secret)
 
-    @patch('modules.profile.get_profile.app.boto3.session.Session')
-    def test_get_secret_client_error(self, mock_session):
-        mock_client = mock_session.return_value.client.return_value
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_client_error(self, mock_get_client):
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.side_effect = ClientError({'Error': {'Code': 'InvalidRequestException'}}, 'GetSecretValue')
 
         with self.assertRaises(HttpStatusCodeError):
             get_secret()
 
-    @patch('modules.profile.get_profile.app.boto3.session.Session')
-    def test_get_secret_no_credentials_error(self, mock_session):
-        mock_client = mock_session.return_value.client.return_value
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_no_credentials_error(self, mock_get_client):
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.side_effect = NoCredentialsError()
 
         with self.assertRaises(HttpStatusCodeError):
@@ -185,5 +219,21 @@ class TestLambdaHandler(unittest.TestCase):
         lambda_handler(event, None)
         self.assertTrue(mock_connection.close.called)
 
+    @patch('modules.profile.get_profile.app.get_db_connection')
+    def test_get_profile_resolves_current_reward(self, mock_get_db_connection):
+        progression.clear_reward_titles()
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchone.return_value = {'id_user': 'valid_user', 'level': 7, 'id_reward': None}
+        mock_cursor.fetchall.return_value = [(1, 1, 'Novato'), (2, 5, 'Aprendiz'), (3, 10, 'Mago')]
+
+        profile = get_profile('valid_user')
+
+        self.assertEqual((profile['id_reward'], profile['unlock_level'], profile['wizard_title']), (2, 5, 'Aprendiz'))
+        self.assertNotIn('dududb.rewards', mock_cursor.execute.call_args_list[0].args[0])
+        progression.clear_reward_titles()
+
 if __name__ == '__main__':
     unittest.main()
@@ -2,6 +2,8 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.missions.insert_mission import app
+from dudu_common import idempotency
+from dudu_common.secrets_cache import invalidate_secret
 
 EVENT = {
     'body': json.dumps({
@@ -16,11 +18,14 @@ EVENT = {
 
 class Test(unittest.TestCase):
 
+    def setUp(self):
+        invalidate_secret()
+
     @patch('modules.missions.insert_mission.app.insert_mission')
-    @patch('modules.missions.insert_mission.app.get_openai_client')
+    @patch('modules.missions.insert_mission.app.get_fantasy_description')
     @patch('modules.missions.insert_mission.app.validate_user')
-    @patch('modules.missions.insert_mission.common.db_connection.get_secrets')
-    def test_success_lambda_handler(self, mock_get_secrets, mock_validate_user, mock_get_openai_client, mock_insert_mission):
+    @patch('dudu_common.db_connection.get_secrets')
+    def test_success_lambda_handler(self, mock_get_secrets, mock_validate_user, mock_get_fantasy_description, mock_insert_mission):
         mock_get_secrets.return_value = {
             'username': 'admin',
             'password': 'admin',
@@ -32,7 +37,7 @@ class Test(unittest.TestCase):
         }
 
         mock_validate_user.return_value = True
-        mock_get_openai_client.return_value = 'fantasy description'
+        mock_get_fantasy_description.return_value = 'fantasy description'
         mock_insert_mission.return_value = True
 
         response = app.lambda_handler(EVENT, None)
@@ -245,12 +250,12 @@ class Test(unittest.TestCase):
         self.assertEqual(response['body'], '"Invalid status"')
 
     def test_get_secrets_exception(self):
-        with patch('modules.missions.insert_mission.common.db_connection.get_secrets',
+        with patch('dudu_common.db_connection.get_secrets',
                    side_effect=Exception('Error getting secret')):
             response = app.lambda_handler(EVENT, None)
             self.assertEqual(response['body'], '"Error getting secret"')
 
-    @patch('modules.missions.insert_mission.common.db_connection.get_secrets')
+    @patch('dudu_common.db_connection.get_secrets')
     def test_db_connection_exception(self, mock_get_secrets):
         mock_get_secrets.return_value = {
             'username': 'admin',
@@ -262,15 +267,15 @@ class Test(unittest.TestCase):
             'dbInstanceIdentifier': 'admin'
         }
 
-        with patch('modules.missions.insert_mission.common.db_connection.get_db_connection',
+        with patch('dudu_common.db_connection.get_db_connection',
                    side_effect=Exception('Error connecting to database')):
             response = app.lambda_handler(EVENT, None)
             self.assertEqual(response['body'], '"Error connecting to database"')
 
     @patch('modules.missions.insert_mission.app.insert_mission')
-    @patch('modules.missions.insert_mission.app.get_openai_client')
+    @patch('modules.missions.insert_mission.app.get_fantasy_description')
     @patch('modules.missions.insert_mission.app.get_db_connection')
-    def test_validate_user_success(self, mock_get_db_connection, mock_get_openai_client, mock_insert_mission):
+    def test_validate_user_success(self, mock_get_db_connection, mock_get_fantasy_description, mock_insert_mission):
         mock_connection = MagicMock()
         mock_cursor = MagicMock()
 
@@ -278,15 +283,16 @@ class Test(unittest.TestCase):
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.fetchall.return_value = [{'id_user': 1, 'name': 'John Doe'}]
 
-        mock_get_openai_client.return_value = 'fantasy description'
+        mock_get_fantasy_description.return_value = 'fantasy description'
         mock_insert_mission.return_value = True
 
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['body'], '"fantasy description"')
 
+    @patch('dudu_common.description_cache.get_variants', return_value=[])
     @patch('modules.missions.insert_mission.app.validate_user')
-    @patch('modules.missions.insert_mission.common.db_connection.get_secrets')
-    def test_get_secrets_openai_client_exception(self, mock_get_secrets, mock_validate_user):
+    @patch('dudu_common.db_connection.get_secrets')
+    def test_get_secrets_openai_client_exception(self, mock_get_secrets, mock_validate_user, _):
         mock_get_secrets.return_value = {
             'username': 'admin',
             'password': 'admin',
@@ -299,20 +305,21 @@ class Test(unittest.TestCase):
 
         mock_validate_user.return_value = True
 
-        with patch('modules.missions.insert_mission.common.openai_connection.get_secret',
+        with patch('dudu_common.openai_connection.get_secret',
                    side_effect=Exception('Error getting secret')):
             response = app.lambda_handler(EVENT, None)
             self.assertEqual(response['body'], '"Error getting secret"')
 
-    @patch('modules.missions.insert_mission.common.openai_connection.get_secret')
+    @patch('dudu_common.description_cache.get_variants', return_value=[])
+    @patch('dudu_common.openai_connection.get_secret')
     @patch('modules.missions.insert_mission.app.validate_user')
-    def test_get_openai_client_exception(self, mock_validate_user, mock_openai_get_secret):
+    def test_get_openai_client_exception(self, mock_validate_user, mock_openai_get_secret, _):
         mock_validate_user.return_value = True
         mock_openai_get_secret.return_value = {
             'OPENAI_KEY': 'admin'
         }
 
-        with patch('modules.missions.insert_mission.common.openai_connection.get_openai_client',
+        with patch('dudu_common.openai_connection.get_openai_client',
                    side_effect=Exception('Error getting openai client')):
             response = app.lambda_handler(EVENT, None)
             self.assertEqual(response['body'], '"Error getting openai client"')
@@ -325,11 +332,11 @@ class Test(unittest.TestCase):
         self.assertEqual(response['body'], json.dumps("Error"))
 
     @patch('modules.missions.insert_mission.app.get_db_connection')
-    @patch('modules.missions.insert_mission.app.get_openai_client')
+    @patch('modules.missions.insert_mission.app.get_fantasy_description')
     @patch('modules.missions.insert_mission.app.validate_user')
-    def test_insert_mission_success(self, mock_validate_user, mock_get_openai_client, mock_get_db_connection):
+    def test_insert_mission_success(self, mock_validate_user, mock_get_fantasy_description, mock_get_db_connection):
         mock_validate_user.return_value = True
-        mock_get_openai_client.return_value = 'fantasy description'
+        mock_get_fantasy_description.return_value = 'fantasy description'
 
         mock_connection = MagicMock()
         mock_cursor = MagicMock()
@@ -340,6 +347,59 @@ class Test(unittest.TestCase):
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['body'], '"fantasy description"')
 
+    @patch('modules.missions.insert_mission.app.get_db_connection')
+    @patch('modules.missions.insert_mission.app.get_fantasy_description')
+    @patch('modules.missions.insert_mission.app.validate_user')
+    def test_insert_mission_async_description(self, mock_validate_user, mock_get_fantasy_description,
+                                              mock_get_db_connection):
+        mock_validate_user.return_value = True
+
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.lastrowid = 42
+
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+
+        body = json.loads(EVENT['body'])
+        body['async_description'] = True
+
+        response = app.lambda_handler({'body': json.dumps(body)}, None)
+
+        self.assertEqual(response['statusCode'], 202)
+        self.assertEqual(json.loads(response['body']), {'id_mission': 42, 'description_status': 'pending'})
+        mock_get_fantasy_description.assert_not_called()
+        _, values = mock_cursor.execute.call_args.args
+        self.assertEqual(values[1], '')
+        self.assertEqual(values[-1], 'pending')
+
+    def test_async_description_is_not_boolean(self):
+        body = json.loads(EVENT['body'])
+        body['async_description'] = 'yes'
+
+        response = app.lambda_handler({'body': json.dumps(body)}, None)
+        self.assertEqual(response['body'], '"async_description must be a boolean"')
+
+    @patch('dudu_common.idempotency.get_db_connection')
+    @patch('modules.missions.insert_mission.app.get_fantasy_description')
+    @patch('modules.missions.insert_mission.app.validate_user')
+    def test_idempotent_retry_skips_openai(self, mock_validate_user, mock_get_fantasy_description,
+                                           mock_get_db_connection):
+        stored = json.dumps({'statusCode': 200, 'headers': {}, 'body': '"fantasy description"'})
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = (idempotency.hash_value(EVENT['body']), 'completed', stored, 0)
+        # The key is already stored, INSERT IGNORE does not claim it
+        mock_cursor.execute.return_value = 0
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+
+        response = app.lambda_handler({'headers': {'Idempotency-Key': 'abc'}, 'body': EVENT['body']}, None)
+
+        self.assertEqual(response['body'], '"fantasy description"')
+        mock_validate_user.assert_not_called()
+        mock_get_fantasy_description.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,12 @@
 import json
+import base64
 import unittest
 from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
 from modules.users.login import app
+from dudu_common.aws_clients import clear_clients
+from dudu_common.cognito import get_secret_hash
+from dudu_common.secrets_cache import invalidate_secret
 
 EVENT = {
     'body': json.dumps({
@@ -10,6 +15,13 @@ EVENT = {
     })
 }
 
+
+def fake_id_token(claims):
+    return 'header.' + base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=') + '.signature'
+
+
+ID_TOKEN = fake_id_token({'email_verified': True})
+
 FAKE_SECRET = {'SecretString': json.dumps({
     'SECRET_CLIENT': 'client',
     'ID_CLIENT': 'id',
@@ -17,19 +29,6 @@ FAKE_SECRET = {'SecretString': json.dumps({
 })}
 
 
-# To test_lambda_handler
-class FakeSessionTestLambdaHandler:
-    """
-    FakeSession class to mock boto3 session
-    """
-
-    def __init__(self, *args, **kwargs):
-        pass
-
-    def client(self, *args, **kwargs):
-        return FakeBoto3ClientTestLambdaHandler()
-
-
 class FakeBoto3ClientTestLambdaHandler:
     def __init__(self, *args, **kwargs):
         pass
@@ -38,11 +37,11 @@ class FakeBoto3ClientTestLambdaHandler:
         return FAKE_SECRET
 
     def admin_get_user(self, *args, **kwargs):
-        return {'UserStatus': 'CONFIRMED', 'UserAttributes': [{}, {'Name': 'email_verified', 'Value': 'true'}]}
+        raise AssertionError('login must not call admin_get_user')
 
     def initiate_auth(self, *args, **kwargs):
         return {'AuthenticationResult': {
-            'IdToken': 'id_token',
+            'IdToken': ID_TOKEN,
             'AccessToken': 'access_token',
             'RefreshToken': 'refresh_token'
         }}
@@ -55,15 +54,18 @@ class FakeBoto3ClientTestLambdaHandlerMustChangePassword:
     def get_secret_value(self, *args, **kwargs):
         return FAKE_SECRET
 
-    def admin_get_user(self, *args, **kwargs):
-        return {'UserStatus': 'FORCE_CHANGE_PASSWORD', 'UserAttributes': [{}, {'Name': 'email_verified', 'Value': 'true'}]}
+    def initiate_auth(self, *args, **kwargs):
+        return {'ChallengeName': 'NEW_PASSWORD_REQUIRED', 'Session': 'session'}
 
 
 class Test(unittest.TestCase):
-    @patch('boto3.client')
-    @patch('boto3.session.Session')
-    def test_lambda_handler(self, mock_session, mock_client):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+
+    def setUp(self):
+        invalidate_secret()
+        clear_clients()
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_lambda_handler(self, mock_client):
         mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
 
         response = app.lambda_handler(EVENT, None)
@@ -161,25 +163,81 @@ class Test(unittest.TestCase):
         self.assertEqual(response['statusCode'], 400)
         self.assertEqual(response['body'], '"Password must be a string"')
 
-    @patch('modules.users.login.app.boto3.client')
-    @patch('boto3.session.Session')
-    def test_exception_client_initiate_auth(self, mock_session, mock_client):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_exception_client_initiate_auth(self, mock_client):
         mock_client.side_effect = Exception('An error occurred')
 
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['statusCode'], 401)
         self.assertEqual(response['body'], '"User or password incorrect"')
 
-    @patch('boto3.client')
-    @patch('boto3.session.Session')
-    def test_must_change_password(self, mock_session, mock_client):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_must_change_password(self, mock_client):
         mock_client.return_value = FakeBoto3ClientTestLambdaHandlerMustChangePassword()
 
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['body'], '"MUST CHANGE TEMPORARY PASSWORD"')
 
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_unverified_email_must_change_password(self, mock_client):
+        mock_client.return_value.get_secret_value.return_value = FAKE_SECRET
+        mock_client.return_value.initiate_auth.return_value = {'AuthenticationResult': {
+            'IdToken': fake_id_token({'email_verified': False}),
+            'AccessToken': 'access_token',
+            'RefreshToken': 'refresh_token'
+        }}
+
+        response = app.lambda_handler(EVENT, None)
+        self.assertEqual(response['body'], '"MUST CHANGE TEMPORARY PASSWORD"')
+        mock_client.return_value.admin_get_user.assert_not_called()
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_token_without_email_verified_must_change_password(self, mock_client):
+        mock_client.return_value.get_secret_value.return_value = FAKE_SECRET
+        mock_client.return_value.initiate_auth.return_value = {'AuthenticationResult': {
+            'IdToken': fake_id_token({'sub': 'abc-123'}),
+            'AccessToken': 'access_token',
+            'RefreshToken': 'refresh_token'
+        }}
+
+        response = app.lambda_handler(EVENT, None)
+        self.assertEqual(response['body'], '"MUST CHANGE TEMPORARY PASSWORD"')
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_cognito_errors(self, mock_client):
+        mock_client.return_value.get_secret_value.return_value = FAKE_SECRET
+
+        mock_client.return_value.initiate_auth.side_effect = ClientError(
+            {'Error': {'Code': 'UserNotConfirmedException'}}, 'InitiateAuth')
+        response = app.lambda_handler(EVENT, None)
+        self.assertEqual(response['body'], '"MUST CHANGE TEMPORARY PASSWORD"')
+
+        mock_client.return_value.initiate_auth.side_effect = ClientError(
+            {'Error': {'Code': 'NotAuthorizedException'}}, 'InitiateAuth')
+        response = app.lambda_handler(EVENT, None)
+        self.assertEqual(response['statusCode'], 401)
+        mock_client.return_value.admin_get_user.assert_not_called()
+        # A wrong password does not fetch the client secret again
+        mock_client.return_value.get_secret_value.assert_called_once()
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_rotated_client_secret_is_refreshed(self, mock_client):
+        rotated_secret = {'SecretString': json.dumps({'SECRET_CLIENT': 'rotated', 'ID_CLIENT': 'id'})}
+        mock_client.return_value.get_secret_value.side_effect = [FAKE_SECRET, rotated_secret]
+        mock_client.return_value.initiate_auth.side_effect = [
+            ClientError({'Error': {'Code': 'NotAuthorizedException',
+                                   'Message': 'Unable to verify secret hash for client id'}}, 'InitiateAuth'),
+            {'AuthenticationResult': {'IdToken': ID_TOKEN, 'AccessToken': 'access', 'RefreshToken': 'refresh'}}
+        ]
+
+        response = app.lambda_handler(EVENT, None)
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(mock_client.return_value.get_secret_value.call_count, 2)
+        secret_hashes = [call.kwargs['AuthParameters']['SECRET_HASH']
+                         for call in mock_client.return_value.initiate_auth.call_args_list]
+        self.assertEqual(secret_hashes[1], get_secret_hash('Atoferatofe', 'id', 'rotated'))
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
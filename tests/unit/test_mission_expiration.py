@@ -1,5 +1,4 @@
 import json
-import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.missions.mission_expiration import app
@@ -15,10 +14,36 @@ class TestMissionExpiration(TestCase):
 
         mock_get_db_connection.return_value = mock_connection
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchall.return_value = [{'id_mission': 1, 'due_date': '2021-12-12'}]
+        mock_cursor.fetchall.return_value = [(1, 'user')]
+        mock_cursor.execute.return_value = 0
 
         response = app.lambda_handler({}, None)
         self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['body'], json.dumps("Missions' expiration checking done, 1 missions expired"))
+
+    @patch('modules.missions.mission_expiration.app.get_db_connection')
+    def test_expires_in_chunks(self, mock_get_db_connection):
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+
+        mock_get_db_connection.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_cursor.fetchall.side_effect = [[(1, 'a'), (2, 'b')], [(3, 'a'), (4, 'a')], [(5, 'b')]]
+
+        with patch('modules.missions.mission_expiration.app.BATCH_SIZE', 2):
+            expired = app.check_and_update_expired_missions()
+
+        self.assertEqual(expired, 5)
+        self.assertEqual(mock_cursor.execute.call_count, 6)
+        self.assertEqual(mock_connection.commit.call_count, 3)
+        sql, values = mock_cursor.execute.call_args_list[0].args
+        self.assertIn("WHERE status = 'pending' AND due_date < CURRENT_DATE LIMIT %s FOR UPDATE", sql)
+        self.assertEqual(values, (2,))
+        sql, values = mock_cursor.execute.call_args.args
+        self.assertIn("SET status = 'failed' WHERE id_mission IN %s", sql)
+        self.assertEqual(values, ([5],))
+        _, rows = mock_cursor.executemany.call_args_list[1].args
+        self.assertEqual(rows, [('a', -2, 0, 0, 2, 0)])
 
     @patch('modules.missions.mission_expiration.app.get_db_connection')
     def test_lambda_exception(self, mock_get_db_connection):
@@ -27,11 +52,11 @@ class TestMissionExpiration(TestCase):
 
         mock_get_db_connection.return_value = mock_connection
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchall.side_effect = Exception('Error')
+        mock_cursor.execute.side_effect = Exception('Error')
 
         response = app.lambda_handler({}, None)
         self.assertEqual(response['statusCode'], 500)
 
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
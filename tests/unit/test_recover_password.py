@@ -5,8 +5,11 @@ import json
 import unittest
 from unittest.mock import patch, Mock
 from botocore.exceptions import ClientError, NoCredentialsError
-from modules.users.recover_password.app import lambda_handler, get_secret_hash
+from modules.users.recover_password.app import lambda_handler
+from dudu_common.cognito import get_secret_hash
 from modules.users.recover_password import app
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 
 
 class FakeSecretsManagerClient:
@@ -65,11 +68,15 @@ class FakeSession:
 class TestLambdaHandler(unittest.TestCase):
 
     def setUp(self):
-        self.patcher_boto_session = patch('boto3.session.Session', return_value=FakeSession())
-        self.mock_boto_session = self.patcher_boto_session.start()
+        invalidate_secret()
+        clear_clients()
+        self.patcher_boto_client = patch('dudu_common.aws_clients.boto3.client',
+                                         side_effect=lambda service_name, region_name=None, **_:
+                                         FakeSession().client(service_name, region_name))
+        self.mock_boto_client = self.patcher_boto_client.start()
 
     def tearDown(self):
-        self.patcher_boto_session.stop()
+        self.patcher_boto_client.stop()
 
     def test_username_not_in_body(self):
         event = {
@@ -107,7 +114,7 @@ class TestLambdaHandler(unittest.TestCase):
         response = app.lambda_handler(event, None)
         self.assertEqual(response['body'], '"(400, \'Username is required\')"')
 
-    @patch('modules.users.recover_password.app.boto3.client')
+    @patch('dudu_common.aws_clients.boto3.client')
     def test_get_secrets_client_error(self, mock_boto_client):
         mock_client_instance = mock_boto_client.return_value
         mock_client_instance.get_secret_value.side_effect = ClientError(
@@ -118,8 +125,8 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(context.exception.response['Error']['Code'], 'ResourceNotFoundException')
 
     def test_email_need_verification(self):
-        with patch('modules.users.recover_password.app.boto3.client',
-                   side_effect=lambda service_name, region_name=None: FakeSession().client(service_name, region_name)):
+        with patch('dudu_common.aws_clients.boto3.client',
+                   side_effect=lambda service_name, region_name=None, **_: FakeSession().client(service_name, region_name)):
             event = {
                 'body': json.dumps({'username': 'testuser'})
             }
@@ -153,16 +160,19 @@ class TestLambdaHandler(unittest.TestCase):
                 self.assertEqual(response['statusCode'], 500)
                 self.assertIn('Error getting secret ->', response['body'])
 
-    @patch('modules.users.recover_password.app.boto3.client')
+    @patch('dudu_common.aws_clients.boto3.client')
+    @patch('dudu_common.cognito.get_secret')
     @patch('modules.users.recover_password.app.get_secret')
     @patch('modules.users.recover_password.app.verify_user')
     @patch('modules.users.recover_password.app.validate_body')
-    def test_successful_password_reset(self, mock_validate_body, mock_verify_user, mock_get_secret, mock_boto_client):
+    def test_successful_password_reset(self, mock_validate_body, mock_verify_user, mock_get_secret,
+                                       mock_get_cognito_secret, mock_boto_client):
         mock_validate_body.return_value = None
         mock_get_secret.return_value = {
             'ID_CLIENT': 'fake_client_id',
             'SECRET_CLIENT': 'fake_secret'
         }
+        mock_get_cognito_secret.return_value = mock_get_secret.return_value
         mock_verify_user.return_value = None
         mock_client = Mock()
         mock_client.forgot_password.return_value = {
@@ -2,6 +2,7 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.users.register_alexa_user import app
+from dudu_common.progression import clear_reward_titles
 
 
 FAKE_SECRET = {'SecretString': json.dumps({
@@ -33,6 +34,10 @@ class FakeBoto3ClientTestLambdaHandler:
 
 
 class Test(unittest.TestCase):
+
+    def setUp(self):
+        clear_reward_titles()
+
     @patch('modules.users.register_alexa_user.app.get_db_connection')
     def test_lambda_handler(self, mock_get_db_connection):
         mock_connection = MagicMock()
@@ -40,7 +45,7 @@ class Test(unittest.TestCase):
 
         mock_get_db_connection.return_value = mock_connection
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.return_value = ['aprendiz de metodología magícaaa']
+        mock_cursor.fetchall.return_value = [(1, 'aprendiz de metodología magícaaa'), (2, 'hechicero')]
 
         event = {
             'body': json.dumps({
@@ -51,9 +56,13 @@ class Test(unittest.TestCase):
 
         response = app.lambda_handler(event, None)
         self.assertEqual(response['body'], 'aprendiz de metodología magícaaa')
+        # User, rewards and title share one connection and one transaction
+        mock_get_db_connection.assert_called_once()
+        mock_connection.commit.assert_called_once()
 
     @patch('modules.users.register_alexa_user.app.save_user_db')
-    def test_save_user_db_exception(self, mock_save_user_db):
+    @patch('modules.users.register_alexa_user.app.get_db_connection')
+    def test_save_user_db_exception(self, mock_get_db_connection, mock_save_user_db):
         mock_save_user_db.side_effect = Exception("Error inserting user")
 
         event = {
@@ -83,6 +92,9 @@ class Test(unittest.TestCase):
 
         response = app.lambda_handler(event, None)
         self.assertEqual(response['body'], '"Error giving basic rewards"')
+        # The user insert is rolled back with the failed reward insert
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
 
     """
     test_validate_body
@@ -147,7 +159,7 @@ class Test(unittest.TestCase):
 
         mock_get_db_connection.return_value = mock_connection
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
-        mock_cursor.fetchone.side_effect = Exception('Error getting first title')
+        mock_cursor.fetchall.side_effect = Exception('Error')
 
         event = {
             'body': json.dumps({
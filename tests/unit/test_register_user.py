@@ -2,6 +2,8 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.users.register_user import app
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 
 EVENT = {
     'body': json.dumps({
@@ -18,19 +20,6 @@ FAKE_SECRET = {'SecretString': json.dumps({
 })}
 
 
-# To test_lambda_handler
-class FakeSessionTestLambdaHandler:
-    """
-    FakeSession class to mock boto3 session
-    """
-
-    def __init__(self, *args, **kwargs):
-        pass
-
-    def client(self, *args, **kwargs):
-        return FakeBoto3ClientTestLambdaHandler()
-
-
 class FakeBoto3ClientTestLambdaHandler:
     def __init__(self, *args, **kwargs):
         pass
@@ -43,11 +32,14 @@ class FakeBoto3ClientTestLambdaHandler:
 
 
 class Test(unittest.TestCase):
+
+    def setUp(self):
+        invalidate_secret()
+        clear_clients()
+
     @patch('modules.users.register_user.app.get_db_connection')
-    @patch('boto3.client')
-    @patch('boto3.session.Session')
-    def test_lambda_handler(self, mock_session, mock_client, mock_get_db_connection):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_lambda_handler(self, mock_client, mock_get_db_connection):
         mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
 
         mock_connection = MagicMock()
@@ -61,35 +53,40 @@ class Test(unittest.TestCase):
 
     @patch('modules.users.register_user.app.get_db_connection')
     @patch('modules.users.register_user.app.save_user_cognito')
-    @patch('boto3.session.Session')
-    def test_insert_user_db_exception(self, mock_session, mock_save_user_cognito, mock_get_db_connection):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_insert_user_db_exception(self, mock_client, mock_save_user_cognito, mock_get_db_connection):
+        mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
         mock_save_user_cognito.return_value = 'id_user'
 
         mock_connection = MagicMock()
 
         mock_get_db_connection.return_value = mock_connection
-        mock_connection.cursor.side_effect = Exception('Error')
+        mock_connection.cursor.return_value.__enter__.return_value.execute.side_effect = Exception('Error')
 
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['body'], '"Error inserting user"')
+        mock_connection.rollback.assert_called_once()
 
     @patch('modules.users.register_user.app.get_db_connection')
     @patch('modules.users.register_user.app.save_user_db')
     @patch('modules.users.register_user.app.save_user_cognito')
-    @patch('boto3.session.Session')
-    def test_give_basic_rewards_exception(self, mock_session, mock_save_user_cognito, mock_save_user_db, mock_get_db_connection):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_give_basic_rewards_exception(self, mock_client, mock_save_user_cognito, mock_save_user_db, mock_get_db_connection):
+        mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
         mock_save_user_cognito.return_value = 'id_user'
         mock_save_user_db.return_value = True
 
         mock_connection = MagicMock()
 
         mock_get_db_connection.return_value = mock_connection
-        mock_connection.cursor.side_effect = Exception('Error')
+        mock_connection.cursor.return_value.__enter__.return_value.execute.side_effect = Exception('Error')
 
         response = app.lambda_handler(EVENT, None)
         self.assertEqual(response['body'], '"Error giving basic rewards"')
+        # The user insert is rolled back with the failed reward insert
+        mock_get_db_connection.assert_called_once()
+        mock_connection.rollback.assert_called_once()
+        mock_connection.commit.assert_not_called()
 
     """
     test_validate_body
@@ -1,19 +1,21 @@
+import base64
 import json
 import unittest
 from unittest import TestCase
 from unittest.mock import patch
 from modules.missions.search_mission import app
-from modules.missions.search_mission.common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
 
 
 class MockCursor:
     def __init__(self, fetchall_return_value, fetchone_return_value=None):
         self.fetchall_return_value = fetchall_return_value
         self.fetchone_return_value = fetchone_return_value
+        self.executed = []
 
     def execute(self, query, values):
-        # Execute query
-        pass
+        # Record the executed query
+        self.executed.append((query, values))
 
     def fetchall(self):
         return self.fetchall_return_value
@@ -92,6 +94,7 @@ class TestSearchMissions(TestCase):
                 'total': 1
             }
         ))
+        mock_validate_user.assert_not_called()
 
     # Test lambda_handler without id_user in the body
     def test_lambda_handler_no_id_user(self):
@@ -393,19 +396,19 @@ class TestSearchMissions(TestCase):
         # Setup
         fetchall_return_value = [
             {
+                'found_user': 1,
                 'id_mission': 1,
                 'original_description': 'original_description',
                 'fantasy_description': 'fantasy_description',
                 'id_user': 1,
                 'creation_date': '2022-01-01',
                 'status': 'pending',
+                'total': 1
             }
         ]
 
-        fetchone_return_value = ({'total': 1})
         mock_cursor = MockCursor(
-            fetchall_return_value=fetchall_return_value,
-            fetchone_return_value=fetchone_return_value
+            fetchall_return_value=fetchall_return_value
         )
         mock_connection = MockConnection(cursor_return_value=mock_cursor)
         mock_get_db_connection.return_value = mock_connection
@@ -424,18 +427,28 @@ class TestSearchMissions(TestCase):
         response, total = app.search_mission(mock_body)
 
         # Assert
-        self.assertEqual(response, fetchall_return_value)
+        self.assertEqual(response, [
+            {
+                'id_mission': 1,
+                'original_description': 'original_description',
+                'fantasy_description': 'fantasy_description',
+                'id_user': 1,
+                'creation_date': '2022-01-01',
+                'status': 'pending',
+            }
+        ])
         self.assertEqual(total, 1)
+        self.assertEqual(len(mock_cursor.executed), 1)
+        sql, _ = mock_cursor.executed[0]
+        self.assertIn('COUNT(*) OVER() AS total', sql)
 
     # Test search_mission with no missions found
     @patch("modules.missions.search_mission.app.get_db_connection")
     def test_search_mission_no_missions(self, mock_get_db_connection):
         # Setup
-        fetchall_return_value = []
-        fetchone_return_value = ({'total': 0})
+        fetchall_return_value = [{'found_user': 1, 'id_mission': None, 'total': None}]
         mock_cursor = MockCursor(
-            fetchall_return_value=fetchall_return_value,
-            fetchone_return_value=fetchone_return_value
+            fetchall_return_value=fetchall_return_value
         )
         mock_connection = MockConnection(cursor_return_value=mock_cursor)
         mock_get_db_connection.return_value = mock_connection
@@ -457,5 +470,294 @@ class TestSearchMissions(TestCase):
         self.assertEqual(response, [])
         self.assertEqual(total, 0)
 
+    # Test search_mission when the user does not exist
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_user_not_found(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(fetchall_return_value=[])
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'search_query',
+            'order_by': 'due_date',
+            'order': 'ASC',
+            'status': 'pending',
+            'page': 1,
+            'limit': 6
+        }
+
+        # Call
+        with self.assertRaises(HttpStatusCodeError) as context:
+            app.search_mission(mock_body)
+
+        # Assert
+        self.assertEqual(context.exception.status_code, 404)
+        self.assertEqual(context.exception.message, 'User not found')
+
+    # Test search_mission counts the missions when the page is past the end
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_page_past_the_end(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(
+            fetchall_return_value=[{'found_user': 1, 'id_mission': None, 'total': None}],
+            fetchone_return_value={'total': 4}
+        )
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'search_query',
+            'order_by': 'due_date',
+            'order': 'ASC',
+            'status': 'pending',
+            'page': 3,
+            'limit': 6
+        }
+
+        # Call
+        response, total = app.search_mission(mock_body)
+
+        # Assert
+        self.assertEqual(response, [])
+        self.assertEqual(total, 4)
+        self.assertIn('COUNT(*) as total', mock_cursor.executed[1][0])
+
+    # Test build_fulltext_query turns every word into a required prefix term
+    def test_build_fulltext_query(self):
+        self.assertEqual(app.build_fulltext_query('pay bills'), '+pay* +bills*')
+
+    # Test build_fulltext_query drops boolean operators and words too short for the index
+    def test_build_fulltext_query_sanitizes_words(self):
+        self.assertEqual(app.build_fulltext_query('-pay a "bills"*'), '+pay* +bills*')
+
+    # Test build_fulltext_query splits punctuated input like the FULLTEXT parser
+    def test_build_fulltext_query_punctuation(self):
+        self.assertEqual(app.build_fulltext_query('tarea.'), '+tarea*')
+        self.assertEqual(app.build_fulltext_query('casa/perro'), '+casa* +perro*')
+        self.assertEqual(app.build_fulltext_query("pagar: renta, luz'agua"), '+pagar* +renta* +luz* +agua*')
+        self.assertEqual(app.build_fulltext_query('misión.épica'), '+misión* +épica*')
+        self.assertIsNone(app.build_fulltext_query('a/b'))
+
+    # Test build_fulltext_query returns None when no word is long enough for the index
+    def test_build_fulltext_query_short_query(self):
+        self.assertIsNone(app.build_fulltext_query('ab'))
+        self.assertIsNone(app.build_fulltext_query('+*'))
+
+    # Test search_mission uses the FULLTEXT index and orders by relevance
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_fulltext_relevance(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(
+            fetchall_return_value=[{'found_user': 1, 'id_mission': 1, 'relevance': 1.5, 'total': 1}]
+        )
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'dragon',
+            'order_by': 'relevance',
+            'order': 'ASC',
+            'status': 'pending',
+            'page': 2,
+            'limit': 6
+        }
+
+        # Call
+        app.search_mission(mock_body)
+
+        # Assert
+        sql, values = mock_cursor.executed[0]
+        self.assertIn('MATCH(original_description, fantasy_description) AGAINST (%s IN BOOLEAN MODE)', sql)
+        self.assertNotIn('LIKE', sql)
+        self.assertIn('ORDER BY relevance DESC', sql)
+        self.assertEqual(values, ('+dragon*', 1, '+dragon*', 'pending', 6, 6, 1))
+
+    # Test search_mission falls back to LIKE for short queries
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_short_query_uses_like(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(
+            fetchall_return_value=[{'found_user': 1, 'id_mission': 1, 'total': 1}]
+        )
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'ab',
+            'order_by': 'relevance',
+            'order': 'DESC',
+            'status': 'pending',
+            'page': 1,
+            'limit': 6
+        }
+
+        # Call
+        app.search_mission(mock_body)
+
+        # Assert
+        sql, values = mock_cursor.executed[0]
+        self.assertIn('LIKE', sql)
+        self.assertNotIn('MATCH', sql)
+        self.assertIn('ORDER BY id_mission DESC', sql)
+        self.assertEqual(values, (1, '%ab%', '%ab%', 'pending', 6, 0, 1))
+
+
+    # Test lambda_handler paginating with a cursor
+    @patch("modules.missions.search_mission.app.validate_user")
+    @patch("modules.missions.search_mission.app.search_mission_by_cursor")
+    def test_lambda_handler_cursor(self, mock_search_mission_by_cursor, mock_validate_user):
+        # Setup
+        event = {
+            'body': json.dumps({
+                'id_user': 1,
+                'search_query': 'search_query',
+                'order_by': 'due_date',
+                'order': 'ASC',
+                'status': 'pending',
+                'cursor': None,
+                'limit': 6
+            })
+        }
+        mock_search_mission_by_cursor.return_value = [{'id_mission': 1}], None, 'next'
+        mock_validate_user.return_value = True
+
+        # Call
+        response = app.lambda_handler(event, None)
+
+        # Assert
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'missions': [{'id_mission': 1}], 'next_cursor': 'next'})
+
+    # Test lambda_handler with a cursor that is not a string
+    def test_lambda_handler_invalid_cursor(self):
+        # Setup
+        event = {
+            'body': json.dumps({
+                'id_user': 1,
+                'search_query': 'search_query',
+                'order_by': 'due_date',
+                'order': 'ASC',
+                'status': 'pending',
+                'cursor': 10,
+                'limit': 6
+            })
+        }
+
+        # Call
+        response = app.lambda_handler(event, None)
+
+        # Assert
+        self.assertEqual(response['statusCode'], 400)
+        self.assertEqual(response['body'], json.dumps('invalid cursor'))
+
+    # Test decode_cursor reads the position written by encode_cursor
+    def test_encode_decode_cursor(self):
+        cursor = app.encode_cursor('due_date', 'ASC', {'id_mission': 7, 'due_date': '2024-05-01'})
+
+        position = app.decode_cursor(cursor, 'due_date', 'ASC')
+
+        self.assertEqual(position, {'value': '2024-05-01', 'id_mission': 7})
+
+    # Test decode_cursor rejects malformed cursors
+    def test_decode_cursor_invalid(self):
+        with self.assertRaises(HttpStatusCodeError) as context:
+            app.decode_cursor('not a cursor', 'due_date', 'ASC')
+
+        self.assertEqual(context.exception.status_code, 400)
+        self.assertEqual(context.exception.message, 'invalid cursor')
+
+    # Test decode_cursor rejects cursors whose value cannot be bound to the keyset predicate
+    def test_decode_cursor_invalid_value(self):
+        for order_by, value in [('due_date', ['2024-05-01']), ('creation_date', {'a': 1}), ('relevance', '1'),
+                                ('relevance', True)]:
+            position = {'order_by': order_by, 'order': 'DESC', 'value': value, 'id_mission': 7}
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+            with self.assertRaises(HttpStatusCodeError) as context:
+                app.decode_cursor(cursor, order_by, 'DESC')
+
+            self.assertEqual(context.exception.status_code, 400)
+            self.assertEqual(context.exception.message, 'invalid cursor')
+
+        cursor = app.encode_cursor('relevance', 'DESC', {'id_mission': 7, 'relevance': 1.5})
+        self.assertEqual(app.decode_cursor(cursor, 'relevance', 'DESC')['value'], 1.5)
+
+    # Test decode_cursor rejects cursors created for another order
+    def test_decode_cursor_order_mismatch(self):
+        cursor = app.encode_cursor('due_date', 'ASC', {'id_mission': 7, 'due_date': '2024-05-01'})
+
+        with self.assertRaises(HttpStatusCodeError) as context:
+            app.decode_cursor(cursor, 'creation_date', 'ASC')
+
+        self.assertEqual(context.exception.status_code, 400)
+
+    # Test search_mission_by_cursor returns the first page and the cursor of the next one without counting
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_by_cursor_first_page(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(fetchall_return_value=[
+            {'id_mission': 1, 'due_date': '2024-05-01'},
+            {'id_mission': 2, 'due_date': '2024-05-02'},
+            {'id_mission': 3, 'due_date': '2024-05-03'}
+        ])
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'ab',
+            'order_by': 'due_date',
+            'order': 'ASC',
+            'status': 'pending',
+            'cursor': None,
+            'limit': 2
+        }
+
+        # Call
+        missions, total, next_cursor = app.search_mission_by_cursor(mock_body)
+
+        # Assert
+        self.assertEqual([mission['id_mission'] for mission in missions], [1, 2])
+        self.assertIsNone(total)
+        self.assertEqual(app.decode_cursor(next_cursor, 'due_date', 'ASC'), {'value': '2024-05-02', 'id_mission': 2})
+        self.assertEqual(len(mock_cursor.executed), 1)
+        sql, values = mock_cursor.executed[0]
+        self.assertNotIn('OFFSET', sql)
+        self.assertIn('ORDER BY due_date ASC, id_mission ASC', sql)
+        self.assertEqual(values, (1, '%ab%', '%ab%', 'pending', 3))
+
+    # Test search_mission_by_cursor starts after the cursor position and counts when asked
+    @patch("modules.missions.search_mission.app.get_db_connection")
+    def test_search_mission_by_cursor_next_page(self, mock_get_db_connection):
+        # Setup
+        mock_cursor = MockCursor(
+            fetchall_return_value=[{'id_mission': 3, 'due_date': '2024-05-01'}],
+            fetchone_return_value={'total': 3}
+        )
+        mock_get_db_connection.return_value = MockConnection(cursor_return_value=mock_cursor)
+
+        mock_body = {
+            'id_user': 1,
+            'search_query': 'ab',
+            'order_by': 'due_date',
+            'order': 'DESC',
+            'status': 'pending',
+            'cursor': app.encode_cursor('due_date', 'DESC', {'id_mission': 2, 'due_date': '2024-05-02'}),
+            'include_total': True,
+            'limit': 2
+        }
+
+        # Call
+        missions, total, next_cursor = app.search_mission_by_cursor(mock_body)
+
+        # Assert
+        self.assertEqual(missions, [{'id_mission': 3, 'due_date': '2024-05-01'}])
+        self.assertEqual(total, 3)
+        self.assertIsNone(next_cursor)
+        sql, values = mock_cursor.executed[1]
+        self.assertIn('AND (due_date < %s OR (due_date = %s AND id_mission < %s))', sql)
+        self.assertEqual(values, (1, '%ab%', '%ab%', 'pending', '2024-05-02', '2024-05-02', 2, 3))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -2,6 +2,8 @@ import json
 import unittest
 from unittest.mock import patch, MagicMock
 from modules.users.set_password import app
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 from unittest import TestCase
 import boto3
 
@@ -20,19 +22,6 @@ FAKE_SECRET = {'SecretString': json.dumps({
 })}
 
 
-# To test_lambda_handler
-class FakeSessionTestLambdaHandler:
-    """
-    FakeSession class to mock boto3 session
-    """
-
-    def __init__(self, *args, **kwargs):
-        pass
-
-    def client(self, *args, **kwargs):
-        return FakeBoto3ClientTestLambdaHandler()
-
-
 class FakeBoto3ClientTestLambdaHandler:
     def __init__(self, *args, **kwargs):
         pass
@@ -58,10 +47,13 @@ class FakeBoto3ClientTestLambdaHandler:
 
 
 class Test(TestCase):
-    @patch('boto3.client')
-    @patch('boto3.session.Session')
-    def test_lambda_handler(self, mock_session, mock_client):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+
+    def setUp(self):
+        invalidate_secret()
+        clear_clients()
+
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_lambda_handler(self, mock_client):
         mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
 
         response = app.lambda_handler(EVENT, None)
@@ -181,9 +173,9 @@ class Test(TestCase):
                          '"New password must contain at least 8 characters, one uppercase, one lowercase, one number and one special character"')
 
     @patch('modules.users.set_password.app.set_password')
-    @patch('boto3.session.Session')
-    def test_exception_set_password(self, mock_session, mock_set_password):
-        mock_session.return_value = FakeSessionTestLambdaHandler()
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_exception_set_password(self, mock_client, mock_set_password):
+        mock_client.return_value = FakeBoto3ClientTestLambdaHandler()
         mock_set_password.side_effect = Exception('Error')
 
         response = app.lambda_handler(EVENT, None)
@@ -6,7 +6,10 @@ from botocore.exceptions import ClientError, NoCredentialsError
 
 from modules.profile.update_profile.app import lambda_handler, validate_body, get_secret, get_username_from_sub, \
     update_cognito_user, update_user_db
-from modules.profile.update_profile.common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.cognito import forget_username
+from dudu_common.httpStatusCodeError import HttpStatusCodeError
+from dudu_common.aws_clients import clear_clients
+from dudu_common.secrets_cache import invalidate_secret
 
 
 class TestLambdaHandler(unittest.TestCase):
@@ -209,34 +212,37 @@ class TestLambdaHandler(unittest.TestCase):
         with self.assertRaises(HttpStatusCodeError):
             validate_body(body)
 
-    @patch('modules.profile.update_profile.app.boto3.session.Session')
-    def test_get_secret_success(self, mock_session):
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_success(self, mock_get_client):
         mock_secret = {'USER_POOL_ID': 'fake_user_pool_id'}
-        mock_client = mock_session.return_value.client.return_value
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.return_value = {'SecretString': json.dumps(mock_secret)}
 
         secret = get_secret()
         self.assertEqual(secret, mock_secret)
 
-    @patch('modules.profile.update_profile.app.boto3.session.Session')
-    def test_get_secret_client_error(self, mock_session):
-        mock_client = mock_session.return_value.client.return_value
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_client_error(self, mock_get_client):
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.side_effect = ClientError({'Error': {'Code': 'InvalidRequestException'}},
                                                                'GetSecretValue')
 
         with self.assertRaises(HttpStatusCodeError):
             get_secret()
 
-    @patch('modules.profile.update_profile.app.boto3.session.Session')
-    def test_get_secret_no_credentials_error(self, mock_session):
-        mock_client = mock_session.return_value.client.return_value
+    @patch('dudu_common.secrets_cache.get_client')
+    def test_get_secret_no_credentials_error(self, mock_get_client):
+        mock_client = mock_get_client.return_value
         mock_client.get_secret_value.side_effect = NoCredentialsError()
 
         with self.assertRaises(HttpStatusCodeError):
             get_secret()
 
-    @patch('modules.profile.update_profile.app.boto3.client')
-    def test_get_username_from_sub_success(self, mock_boto_client):
+    @patch('dudu_common.cognito.get_db_connection')
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_get_username_from_sub_success(self, mock_boto_client, mock_get_db_connection):
+        forget_username()
+        mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value.fetchone.return_value = None
         # Simular una respuesta exitosa de list_users
         mock_client = MagicMock()
         mock_client.list_users.return_value = {
@@ -255,9 +261,19 @@ class TestLambdaHandler(unittest.TestCase):
             UserPoolId=user_pool_id,
             Filter=f'sub="{sub}"'
         )
-
-    @patch('modules.profile.update_profile.app.boto3.client')
-    def test_get_username_from_sub_user_not_found(self, mock_boto_client):
+        # The username is stored so the next lookup skips ListUsers
+        mock_cursor = mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value
+        sql, values = mock_cursor.execute.call_args.args
+        self.assertIn('SET cognito_username = %s', sql)
+        self.assertEqual(values, ('testuser', sub))
+        self.assertEqual(get_username_from_sub(sub, user_pool_id), 'testuser')
+        mock_client.list_users.assert_called_once()
+
+    @patch('dudu_common.cognito.get_db_connection')
+    @patch('dudu_common.aws_clients.boto3.client')
+    def test_get_username_from_sub_user_not_found(self, mock_boto_client, mock_get_db_connection):
+        forget_username()
+        mock_get_db_connection.return_value.cursor.return_value.__enter__.return_value.fetchone.return_value = None
         # Simular una respuesta donde no se encuentra el usuario
         mock_client = MagicMock()
         mock_client.list_users.return_value = {
@@ -277,7 +293,7 @@ class TestLambdaHandler(unittest.TestCase):
             Filter=f'sub="{sub}"'
         )
 
-    @patch('modules.profile.update_profile.app.boto3.client')
+    @patch('dudu_common.aws_clients.boto3.client')
     @patch('modules.profile.update_profile.app.get_username_from_sub')
     def test_update_cognito_user_success(self, mock_get_username_from_sub, mock_boto_client):
         # Configura el mock para get_username_from_sub
@@ -307,7 +323,7 @@ class TestLambdaHandler(unittest.TestCase):
             ]
         )
 
-    @patch('modules.profile.update_profile.app.boto3.client')
+    @patch('dudu_common.aws_clients.boto3.client')
     @patch('modules.profile.update_profile.app.get_username_from_sub')
     def test_update_cognito_user_user_not_found(self, mock_get_username_from_sub, mock_boto_client):
         # Configura el mock para get_username_from_sub
@@ -329,6 +345,8 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertTrue("User not found" in str(context.exception))
 
     def setUp(self):
+        invalidate_secret()
+        clear_clients()
         self.valid_body = {
             'sub': 'valid-sub',
             'id_user': 'valid-id-user',